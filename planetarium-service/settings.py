@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "user.User"
 
 MIDDLEWARE = [
+    "planetarium.middleware.CompressionMiddleware",
+    "planetarium.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -93,9 +95,45 @@ DATABASES = {
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
         "PORT": os.environ["POSTGRES_PORT"],
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas, e.g. POSTGRES_REPLICA_HOSTS=replica-1,replica-2
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(
+    filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))
+):
+    replica_alias = f"replica_{index + 1}"
+    DATABASES[replica_alias] = {
+        **DATABASES["default"],
+        "HOST": replica_host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(replica_alias)
+
+DATABASE_ROUTERS = ["planetarium.db_router.ReplicaRouter"]
+
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_LAG_CHECK_INTERVAL = 2
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/ref/settings/#caches
+
+# Throttles, read-your-writes pins and waiting room counters must be
+# shared by every worker process, e.g. REDIS_URL=redis://redis:6379/0;
+# without it each process keeps its own local memory cache
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -144,7 +182,11 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "100/day",
+        "user": "1000/day",
+        "autocomplete": "120/minute",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
@@ -172,3 +214,73 @@ SIMPLE_JWT = {
 DEFAULT_PERMISSION_CLASSES = [
     "planetarium.permissions.IsAdminOrIfAuthenticatedReadOnly",
 ]
+
+SALES_ANALYTICS_BATCH_SIZE = 5000
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+SEAT_HOLD_TTL_SECONDS = 600
+SEAT_HOLD_SWEEP_INTERVAL = 5
+SEAT_HOLD_SWEEP_BATCH_SIZE = 1000
+
+IDEMPOTENCY_KEY_TTL_SECONDS = 86400
+IDEMPOTENCY_LEASE_SECONDS = 60
+
+ARCHIVE_HORIZON_DAYS = 365
+ARCHIVE_BATCH_SIZE = 100
+
+SEAT_EVENTS_QUEUE_SIZE = 100
+SEAT_EVENTS_HEARTBEAT_SECONDS = 15
+# Relays seat events between processes, so changes made by the job
+# workers reach the streams served by the web processes
+SEAT_EVENTS_REDIS_URL = os.environ.get("REDIS_URL")
+
+MULTI_GET_MAX_IDS = 100
+BATCH_MAX_REQUESTS = 20
+
+COMPRESSION_MIN_SIZE = 200
+BROTLI_QUALITY = 5
+
+OPENAPI_SCHEMA_DIR = BASE_DIR / "openapi"
+OPENAPI_SCHEMA_MAX_AGE = 3600
+
+TICKET_CODE_SECRET = os.environ.get("TICKET_CODE_SECRET")
+CHECK_IN_MAX_CODES = 500
+
+WAITLIST_CLAIM_TTL_SECONDS = 300
+WAITLIST_MAX_PARTY_SIZE = 10
+
+WHATS_ON_DAYS = 14
+WHATS_ON_CACHE_SECONDS = 60
+
+EXPORT_CHUNK_SIZE = 2000
+
+JOB_WORKER_THREADS = 4
+JOB_WORKER_PROCESSES = 1
+JOB_POLL_INTERVAL = 1
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 5
+JOB_RETRY_BACKOFF_MAX_SECONDS = 600
+JOB_LOCK_TIMEOUT_SECONDS = 300
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+AUTOCOMPLETE_REFRESH_SECONDS = 30
+AUTOCOMPLETE_MAX_RESULTS = 10
+
+WAITING_ROOM_BURST = 50
+WAITING_ROOM_ADMISSION_SECONDS = 900
+WAITING_ROOM_CONFIG_SECONDS = 30
+WAITING_ROOM_TOKEN_MAX_AGE = 24 * 3600
+
+SLOW_QUERY_THRESHOLD_MS = (
+    float(os.environ["SLOW_QUERY_THRESHOLD_MS"])
+    if os.environ.get("SLOW_QUERY_THRESHOLD_MS")
+    else None
+)
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_EXPLAIN_ANALYZE = False
+SLOW_QUERY_BUFFER_SIZE = 100
+SLOW_QUERY_LOG_PARAMS = False
+SLOW_QUERY_PARAM_MAX_LENGTH = 100
+
+WARMUP_IMPORTS_ON_READY = True
@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from .models import (
     ShowSession,
@@ -7,10 +11,114 @@ from .models import (
     AstronomyShow,
     PlanetariumDome,
     ShowTheme,
+    Job,
+    WaitingRoom,
 )
-admin.site.register(ShowSession)
-admin.site.register(Ticket)
-admin.site.register(Reservation)
-admin.site.register(AstronomyShow)
-admin.site.register(PlanetariumDome)
-admin.site.register(ShowTheme)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the planner's row estimate instead of COUNT(*) for
+    unfiltered changelists of large tables"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            threshold = getattr(
+                settings, "ADMIN_ESTIMATED_COUNT_THRESHOLD", 10000
+            )
+            if row and row[0] > threshold:
+                return int(row[0])
+        return super().count
+
+
+class TicketInline(admin.TabularInline):
+    model = Ticket
+    extra = 0
+    fields = ("show_session", "row", "seat")
+    readonly_fields = ("show_session",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "show_session__astronomy_show"
+        )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ShowSession)
+class ShowSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "astronomy_show", "planetarium_dome", "show_time")
+    list_select_related = ("astronomy_show", "planetarium_dome")
+    list_filter = ("show_time", "planetarium_dome")
+    autocomplete_fields = ("astronomy_show", "planetarium_dome")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Ticket)
+class TicketAdmin(admin.ModelAdmin):
+    list_display = ("id", "show_session", "row", "seat", "reservation")
+    list_select_related = (
+        "show_session__astronomy_show",
+        "reservation",
+    )
+    list_filter = ("show_session__planetarium_dome",)
+    raw_id_fields = ("show_session", "reservation")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    list_filter = ("created_at",)
+    raw_id_fields = ("user",)
+    inlines = (TicketInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(AstronomyShow)
+class AstronomyShowAdmin(admin.ModelAdmin):
+    list_display = ("id", "title")
+    search_fields = ("title",)
+    list_filter = ("show_theme",)
+    filter_horizontal = ("show_theme",)
+
+
+@admin.register(PlanetariumDome)
+class PlanetariumDomeAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "rows", "seats_in_row", "seat_count")
+    search_fields = ("name",)
+
+
+@admin.register(ShowTheme)
+class ShowThemeAdmin(admin.ModelAdmin):
+    list_display = ("id", "name")
+    search_fields = ("name",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "locked_by")
+    list_filter = ("status", "name")
+    readonly_fields = ("last_error",)
+
+
+@admin.register(WaitingRoom)
+class WaitingRoomAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "show_session", "opens_at", "admit_per_minute", "is_active"
+    )
+    list_filter = ("is_active",)
+    raw_id_fields = ("show_session",)
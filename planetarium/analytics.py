@@ -0,0 +1,341 @@
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from planetarium.jobs import enqueue, on_commit_batched, task
+from planetarium.layouts import capacity_expression
+from planetarium.models import (
+    ArchivedTicket,
+    AstronomyShow,
+    HourlySales,
+    PlanetariumDome,
+    Reservation,
+    SalesWatermark,
+    SessionSales,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+
+SESSIONS_WATERMARK = "show_sessions"
+TICKETS_WATERMARK = "tickets"
+
+
+def _batch_size():
+    return getattr(settings, "SALES_ANALYTICS_BATCH_SIZE", 5000)
+
+
+def _count_by(queryset, field):
+    return {
+        row[field]: row["sold"]
+        for row in queryset.order_by().values(field).annotate(
+            sold=Count("id")
+        )
+    }
+
+
+def sale_hour(created_at):
+    # Unsaved instances may still hold the string they were created with
+    created_at = Reservation._meta.get_field("created_at").to_python(
+        created_at
+    )
+    return timezone.localtime(created_at).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def ticket_change(ticket, sign):
+    """What a sold (sign 1) or removed (sign -1) ticket does to its hourly
+    bucket, captured while the ticket and its relations still exist"""
+    session = ticket.show_session
+    return (
+        ticket.id,
+        sign,
+        sale_hour(ticket.reservation.created_at).isoformat(),
+        session.astronomy_show_id,
+        session.planetarium_dome_id,
+    )
+
+
+@task("planetarium.apply_hourly_sales")
+def apply_hourly_sales(changes):
+    """Adds each change to its (hour, show, dome) bucket; only the
+    touched buckets are written and nothing is re-aggregated. Tickets
+    deleted because they were archived still count as sold."""
+    archived = set(
+        ArchivedTicket.objects.filter(
+            id__in=[change[0] for change in changes if change[1] < 0]
+        ).values_list("id", flat=True)
+    )
+    deltas = Counter()
+    for ticket_id, sign, hour, show_id, dome_id in changes:
+        if sign < 0 and ticket_id in archived:
+            continue
+        deltas[(hour, show_id, dome_id)] += sign
+    show_ids = set(
+        AstronomyShow.objects.filter(
+            id__in={show_id for _, show_id, _ in deltas}
+        ).values_list("id", flat=True)
+    )
+    dome_ids = set(
+        PlanetariumDome.objects.filter(
+            id__in={dome_id for _, _, dome_id in deltas}
+        ).values_list("id", flat=True)
+    )
+
+    with transaction.atomic():
+        for (hour, show_id, dome_id), delta in sorted(deltas.items()):
+            # Buckets of deleted shows and domes went with them
+            if not delta or show_id not in show_ids or dome_id not in dome_ids:
+                continue
+            bucket, created = HourlySales.objects.get_or_create(
+                hour=datetime.fromisoformat(hour),
+                astronomy_show_id=show_id,
+                planetarium_dome_id=dome_id,
+                defaults={"tickets_sold": delta},
+            )
+            if not created:
+                HourlySales.objects.filter(id=bucket.id).update(
+                    tickets_sold=F("tickets_sold") + delta
+                )
+
+
+def schedule_hourly_sales(changes):
+    """Applies the ticket changes of the current transaction in one job
+    once it commits"""
+    on_commit_batched(
+        "planetarium.apply_hourly_sales",
+        changes,
+        lambda batch: enqueue(
+            "planetarium.apply_hourly_sales", {"changes": sorted(batch)}
+        ),
+    )
+
+
+@task("planetarium.recompute_session_sales")
+def recompute_session_sales(show_session_ids):
+    """Recounts the sales of the given sessions from their tickets;
+    counting is absolute, so running it twice never double counts"""
+    show_session_ids = set(show_session_ids)
+    if not show_session_ids:
+        return
+    sold = _count_by(
+        Ticket.objects.filter(show_session_id__in=show_session_ids),
+        "show_session_id",
+    )
+    for key, count in _count_by(
+        ArchivedTicket.objects.filter(show_session_id__in=show_session_ids),
+        "show_session_id",
+    ).items():
+        sold[key] = sold.get(key, 0) + count
+
+    with transaction.atomic():
+        SessionSales.objects.bulk_create(
+            [
+                SessionSales(
+                    show_session_id=session["id"],
+                    astronomy_show_id=session["astronomy_show_id"],
+                    planetarium_dome_id=session["planetarium_dome_id"],
+                    show_time=session["show_time"],
+                    capacity=session["capacity"],
+                    tickets_sold=sold.get(session["id"], 0),
+                )
+                for session in ShowSession.objects
+                .filter(id__in=show_session_ids)
+                .values(
+                    "id",
+                    "astronomy_show_id",
+                    "planetarium_dome_id",
+                    "show_time",
+                    capacity=capacity_expression(),
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["show_session_id"],
+            update_fields=[
+                "astronomy_show",
+                "planetarium_dome",
+                "show_time",
+                "capacity",
+                "tickets_sold",
+            ],
+        )
+        # Archived sessions are gone from the hot table but keep a row
+        for sales in SessionSales.objects.filter(
+            show_session_id__in=show_session_ids
+        ).exclude(
+            show_session_id__in=ShowSession.objects.filter(
+                id__in=show_session_ids
+            ).values("id")
+        ):
+            sales.tickets_sold = sold.get(sales.show_session_id, 0)
+            sales.save(update_fields=["tickets_sold"])
+
+
+def schedule_recompute(show_session_ids):
+    """Recomputes the touched sessions once after the transaction that
+    sold, refunded or archived their tickets commits"""
+    on_commit_batched(
+        "planetarium.recompute_session_sales",
+        show_session_ids,
+        lambda ids: enqueue(
+            "planetarium.recompute_session_sales",
+            {"show_session_ids": sorted(ids)},
+            unique=True,
+        ),
+    )
+
+
+def _refresh_batch(model, watermark_name, batch_size, session_field):
+    with transaction.atomic():
+        watermark, _ = (
+            SalesWatermark.objects.select_for_update()
+            .get_or_create(name=watermark_name)
+        )
+        rows = list(
+            model.objects
+            .filter(id__gt=watermark.last_id)
+            .order_by("id")
+            .values_list("id", session_field)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        recompute_session_sales({session_id for _, session_id in rows})
+        watermark.last_id = rows[-1][0]
+        watermark.save(update_fields=["last_id", "updated_at"])
+        return len(rows)
+
+
+def _refresh_sessions_batch(batch_size):
+    return _refresh_batch(ShowSession, SESSIONS_WATERMARK, batch_size, "id")
+
+
+def _refresh_tickets_batch(batch_size):
+    return _refresh_batch(
+        Ticket, TICKETS_WATERMARK, batch_size, "show_session_id"
+    )
+
+
+def refresh_sales_rollups(batch_size=None):
+    """Folds sessions and tickets created since the last watermark
+    into the rollup tables. Each batch commits on its own, so an
+    interrupted refresh resumes where it stopped. Rows that commit
+    behind the watermark and deleted tickets are picked up by the
+    recompute job scheduled from the ticket signals."""
+    batch_size = batch_size or _batch_size()
+    counts = {"show_sessions": 0, "tickets": 0}
+
+    while True:
+        processed = _refresh_sessions_batch(batch_size)
+        counts["show_sessions"] += processed
+        if processed < batch_size:
+            break
+
+    while True:
+        processed = _refresh_tickets_batch(batch_size)
+        counts["tickets"] += processed
+        if processed < batch_size:
+            break
+
+    return counts
+
+
+def _session_sales_filter(prefix="", start=None, end=None):
+    conditions = Q()
+    if start:
+        conditions &= Q(**{f"{prefix}show_time__date__gte": start})
+    if end:
+        conditions &= Q(**{f"{prefix}show_time__date__lte": end})
+    return conditions
+
+
+def sales_by_show(start=None, end=None):
+    conditions = _session_sales_filter("session_sales__", start, end)
+    return (
+        AstronomyShow.objects
+        .annotate(
+            tickets_sold=Sum("session_sales__tickets_sold", filter=conditions),
+            capacity=Sum("session_sales__capacity", filter=conditions),
+        )
+        .filter(capacity__isnull=False)
+        .values("id", "title", "tickets_sold", "capacity")
+    )
+
+
+def sales_by_theme(start=None, end=None):
+    conditions = _session_sales_filter(
+        "astronomy_shows__session_sales__", start, end
+    )
+    return (
+        ShowTheme.objects
+        .annotate(
+            tickets_sold=Sum(
+                "astronomy_shows__session_sales__tickets_sold",
+                filter=conditions,
+            ),
+            capacity=Sum(
+                "astronomy_shows__session_sales__capacity",
+                filter=conditions,
+            ),
+        )
+        .filter(capacity__isnull=False)
+        .values("id", "name", "tickets_sold", "capacity")
+    )
+
+
+def sales_by_dome(start=None, end=None):
+    conditions = _session_sales_filter("session_sales__", start, end)
+    return (
+        PlanetariumDome.objects
+        .annotate(
+            tickets_sold=Sum("session_sales__tickets_sold", filter=conditions),
+            capacity=Sum("session_sales__capacity", filter=conditions),
+        )
+        .filter(capacity__isnull=False)
+        .values("id", "name", "tickets_sold", "capacity")
+    )
+
+
+def sales_by_period(granularity="day", start=None, end=None):
+    """Per day or hour: tickets sold in it, and the capacity and filled
+    seats of the sessions shown in it, from which occupancy follows"""
+    truncate = TruncDay if granularity == "day" else TruncHour
+    hourly = HourlySales.objects.all()
+    if start:
+        hourly = hourly.filter(hour__date__gte=start)
+    if end:
+        hourly = hourly.filter(hour__date__lte=end)
+    sold = dict(
+        hourly
+        .annotate(period=truncate("hour"))
+        .order_by()
+        .values("period")
+        .annotate(tickets_sold=Sum("tickets_sold"))
+        .values_list("period", "tickets_sold")
+    )
+    shown = {
+        row["period"]: row
+        for row in SessionSales.objects
+        .filter(_session_sales_filter("", start, end))
+        .annotate(period=truncate("show_time"))
+        .order_by()
+        .values("period")
+        .annotate(
+            capacity=Sum("capacity"), seats_filled=Sum("tickets_sold")
+        )
+    }
+    return [
+        {
+            "period": period,
+            "tickets_sold": sold.get(period, 0),
+            "capacity": shown.get(period, {}).get("capacity", 0),
+            "seats_filled": shown.get(period, {}).get("seats_filled", 0),
+        }
+        for period in sorted(set(sold) | set(shown))
+    ]
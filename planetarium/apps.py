@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PlanetariumConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "planetarium"
+
+    def ready(self):
+        from planetarium import checks, signals  # noqa: F401
+
+        if getattr(settings, "WARMUP_IMPORTS_ON_READY", False):
+            from planetarium.warmup import import_modules
+
+            import_modules()
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from planetarium.models import (
+    ArchivedReservation,
+    ArchivedShowSession,
+    ArchivedTicket,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+
+
+def archive_horizon(days=None):
+    days = days if days is not None else getattr(
+        settings, "ARCHIVE_HORIZON_DAYS", 365
+    )
+    return timezone.now() - timedelta(days=days)
+
+
+def _linked_sessions(session_ids):
+    """Sessions outside session_ids that share a reservation with them"""
+    return set(
+        Ticket.objects
+        .filter(reservation__tickets__show_session_id__in=session_ids)
+        .exclude(show_session_id__in=session_ids)
+        .values_list("show_session_id", flat=True)
+        .distinct()
+    )
+
+
+def _whole_reservations(session_ids, horizon):
+    """Grows session_ids by the past sessions that share a reservation
+    with them and drops those tied to a session that stays hot, so a
+    reservation is only ever archived in one piece. Returns the sessions
+    to archive and the ones deferred until their reservations age out."""
+    chosen = set(session_ids)
+    deferred = set()
+    while True:
+        linked = _linked_sessions(chosen)
+        if not linked:
+            return chosen, deferred
+        past = set(
+            ShowSession.objects
+            .select_for_update(skip_locked=True)
+            .filter(id__in=linked - deferred, show_time__lt=horizon)
+            .values_list("id", flat=True)
+        )
+        chosen |= past
+        deferred |= linked - past
+        tied = set(
+            Ticket.objects
+            .filter(
+                show_session_id__in=chosen,
+                reservation__tickets__show_session_id__in=deferred,
+            )
+            .values_list("show_session_id", flat=True)
+        )
+        chosen -= tied
+        deferred |= tied
+
+
+def _archive_batch(horizon, batch_size, skipped):
+    with transaction.atomic():
+        candidates = list(
+            ShowSession.objects
+            .select_for_update(skip_locked=True)
+            .filter(show_time__lt=horizon)
+            .exclude(id__in=skipped)
+            .order_by("show_time", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not candidates:
+            return None
+        session_ids, deferred = _whole_reservations(candidates, horizon)
+        skipped.update(deferred & set(candidates))
+        if not session_ids:
+            return 0, 0
+
+        ArchivedShowSession.objects.bulk_create(
+            [
+                ArchivedShowSession(**session)
+                for session in ShowSession.objects.filter(
+                    id__in=session_ids
+                ).values(
+                    "id",
+                    "astronomy_show_id",
+                    "planetarium_dome_id",
+                    "show_time",
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+        tickets = list(
+            Ticket.objects
+            .filter(show_session_id__in=session_ids)
+            .values("id", "row", "seat", "show_session_id", "reservation_id")
+        )
+        reservation_ids = {ticket["reservation_id"] for ticket in tickets}
+
+        ArchivedReservation.objects.bulk_create(
+            [
+                ArchivedReservation(**reservation)
+                for reservation in Reservation.objects.filter(
+                    id__in=reservation_ids
+                ).values("id", "created_at", "user_id")
+            ],
+            ignore_conflicts=True,
+        )
+        ArchivedTicket.objects.bulk_create(
+            [ArchivedTicket(**ticket) for ticket in tickets],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+        Ticket.objects.filter(show_session_id__in=session_ids).delete()
+        ShowSession.objects.filter(id__in=session_ids).delete()
+        Reservation.objects.filter(id__in=reservation_ids).delete()
+
+        return len(session_ids), len(tickets)
+
+
+def archive_past_sessions(
+    horizon_days=None, batch_size=None, max_batches=None
+):
+    """Moves sessions older than the horizon with their tickets and
+    reservations into the archive tables. A session waits while it
+    shares a reservation with a session that is still hot, so no
+    reservation is split between the tables. Every batch commits on its
+    own, so an interrupted run is resumed by running it again."""
+    horizon = archive_horizon(horizon_days)
+    batch_size = batch_size or getattr(settings, "ARCHIVE_BATCH_SIZE", 100)
+    counts = {"show_sessions": 0, "tickets": 0}
+    batches = 0
+    skipped = set()
+
+    while max_batches is None or batches < max_batches:
+        archived = _archive_batch(horizon, batch_size, skipped)
+        if archived is None:
+            break
+        sessions, tickets = archived
+        counts["show_sessions"] += sessions
+        counts["tickets"] += tickets
+        batches += 1
+
+    return counts
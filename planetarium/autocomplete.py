@@ -0,0 +1,144 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from planetarium.models import AstronomyShow, ChangeMarker, ShowTheme
+
+SHOW = "show"
+THEME = "theme"
+MARKERS = ("astronomyshow", "showtheme")
+
+
+def normalize(text):
+    return " ".join(text.casefold().split())
+
+
+def prefix_keys(label):
+    """Indexes a label under every word it contains, so "mar" finds both
+    "Mars" and "Journey to Mars" """
+    words = normalize(label).split(" ")
+    return {" ".join(words[start:]) for start in range(len(words))}
+
+
+def marker_versions():
+    return dict(
+        ChangeMarker.objects
+        .filter(key__in=MARKERS)
+        .values_list("key", "version")
+    )
+
+
+class PrefixIndex:
+    """A sorted array of (key, kind, id) searched with bisect; writers
+    swap in a new snapshot, so readers never take a lock"""
+
+    def __init__(self):
+        self._snapshot = ([], {})
+        self._versions = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return self._versions is not None
+
+    def build(self):
+        versions = marker_versions()
+        labels = {
+            (SHOW, show_id): title
+            for show_id, title in AstronomyShow.objects.values_list(
+                "id", "title"
+            )
+        }
+        labels.update(
+            {
+                (THEME, theme_id): name
+                for theme_id, name in ShowTheme.objects.values_list(
+                    "id", "name"
+                )
+            }
+        )
+        entries = sorted(
+            (key, kind, object_id)
+            for (kind, object_id), label in labels.items()
+            for key in prefix_keys(label)
+        )
+        with self._lock:
+            self._snapshot = (entries, labels)
+            self._versions = versions
+            self._checked_at = time.monotonic()
+
+    def update(self, kind, object_id, label=None):
+        """Replaces one object's keys in place of a rebuild; a label of
+        None removes the object"""
+        with self._lock:
+            if not self.built:
+                return
+            entries = list(self._snapshot[0])
+            labels = dict(self._snapshot[1])
+            old_label = labels.pop((kind, object_id), None)
+            if old_label is not None:
+                for key in prefix_keys(old_label):
+                    position = bisect_left(entries, (key, kind, object_id))
+                    if (
+                        position < len(entries)
+                        and entries[position] == (key, kind, object_id)
+                    ):
+                        del entries[position]
+            if label is not None:
+                labels[(kind, object_id)] = label
+                for key in prefix_keys(label):
+                    insort(entries, (key, kind, object_id))
+            self._snapshot = (entries, labels)
+
+    def ensure_fresh(self):
+        """Builds on first use and, at most every refresh interval, checks
+        the change markers for edits made by other processes"""
+        if not self.built:
+            self.build()
+            return
+
+        interval = getattr(settings, "AUTOCOMPLETE_REFRESH_SECONDS", 30)
+        if time.monotonic() - self._checked_at < interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            stale = marker_versions() != self._versions
+        finally:
+            self._lock.release()
+        if stale:
+            self.build()
+
+    def search(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        entries, labels = self._snapshot
+
+        results = []
+        seen = set()
+        for position in range(bisect_left(entries, (prefix,)), len(entries)):
+            key, kind, object_id = entries[position]
+            if not key.startswith(prefix):
+                break
+            if (kind, object_id) in seen:
+                continue
+            seen.add((kind, object_id))
+            results.append(
+                {
+                    "type": kind,
+                    "id": object_id,
+                    "label": labels[(kind, object_id)],
+                }
+            )
+            if len(results) >= limit:
+                break
+        return results
+
+
+index = PrefixIndex()
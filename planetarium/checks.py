@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_is_shared():
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """The what's on feed, throttles, replica pins and waiting rooms are
+    invalidated and counted through the default cache, which has to be
+    shared by every web and worker process"""
+    if not cache_is_shared():
+        return [
+            Warning(
+                "The default cache is local to each process, so cache "
+                "invalidations and counters do not reach other workers.",
+                hint="Set REDIS_URL to use a shared Redis cache.",
+                id="planetarium.W001",
+            )
+        ]
+    return []
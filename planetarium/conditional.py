@@ -0,0 +1,126 @@
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from planetarium.jobs import on_commit_batched
+from planetarium.models import ChangeMarker
+
+
+def seat_markers(show_session_id):
+    return "seats", f"seats:{show_session_id}"
+
+
+def _bump(keys):
+    for key in sorted(keys):
+        updated = ChangeMarker.objects.filter(key=key).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    ChangeMarker.objects.create(key=key, version=1)
+            except IntegrityError:
+                ChangeMarker.objects.filter(key=key).update(
+                    version=F("version") + 1, updated_at=timezone.now()
+                )
+
+
+def touch(*keys):
+    """Bumps change markers once the surrounding transaction commits, so
+    booking transactions never wait on a marker row lock; every marker
+    is bumped once per transaction however many rows touched it"""
+    on_commit_batched("planetarium.change_markers", keys, _bump)
+
+
+def read_markers(keys):
+    return {
+        key: (version, updated_at)
+        for key, version, updated_at in ChangeMarker.objects.filter(
+            key__in=keys
+        ).values_list("key", "version", "updated_at")
+    }
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """Answers list and retrieve with 304 when the change markers named by
+    get_change_markers() have not moved since the client's validators,
+    before the queryset is touched or the body rendered. List it before
+    ReplicaRoutingMixin: the markers are then read from the database the
+    body comes from, so a lagging replica never pairs an old body with
+    a new ETag."""
+
+    conditional_actions = ("list", "retrieve")
+
+    def get_change_markers(self):
+        return []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = self._last_modified = None
+        if (
+            request.method not in SAFE_METHODS
+            or self.action not in self.conditional_actions
+        ):
+            return
+
+        keys = self.get_change_markers()
+        markers = read_markers(keys)
+        fingerprint = "|".join(
+            [self.action, request.get_full_path(), request.accepted_media_type]
+            + [f"{key}={markers.get(key, (0,))[0]}" for key in keys]
+        )
+        self._etag = f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+        if markers:
+            self._last_modified = max(
+                updated_at for _, updated_at in markers.values()
+            )
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etags = [
+                etag.removeprefix("W/") for etag in parse_etags(if_none_match)
+            ]
+            if self._etag in etags or "*" in etags:
+                raise NotModified()
+            return
+
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        if (
+            if_modified_since
+            and self._last_modified
+            and int(self._last_modified.timestamp()) <= if_modified_since
+        ):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if getattr(self, "_etag", None) and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response["ETag"] = self._etag
+            if self._last_modified:
+                response["Last-Modified"] = http_date(
+                    self._last_modified.timestamp()
+                )
+        return response
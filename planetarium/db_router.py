@@ -0,0 +1,139 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_read_alias = ContextVar("planetarium_read_alias", default=None)
+
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+
+class ReplicaRouter:
+    """Sends reads to the database chosen for the current request and
+    everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_lag(alias):
+    """Returns the replication lag of a replica in seconds, measured at
+    most once per REPLICA_LAG_CHECK_INTERVAL; unreachable replicas are
+    reported as infinitely behind"""
+    interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 2)
+    now = time.monotonic()
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+        if cached and now - cached[0] < interval:
+            return cached[1]
+    try:
+        lag = _measure_lag(alias)
+    except Exception:
+        logger.warning("Could not measure lag of replica %s", alias)
+        lag = float("inf")
+    with _lag_lock:
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    max_lag = getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+    healthy = [
+        alias
+        for alias in getattr(settings, "DATABASE_REPLICAS", [])
+        if replica_lag(alias) <= max_lag
+    ]
+    if not healthy:
+        return None
+    return random.choice(healthy)
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def _pin_key(request):
+    return f"planetarium:db-pin:{request.user.pk}"
+
+
+def pin_to_primary(request):
+    if request.user.is_authenticated:
+        cache.set(
+            _pin_key(request),
+            True,
+            getattr(settings, "REPLICA_PIN_SECONDS", 10),
+        )
+
+
+def is_pinned_to_primary(request):
+    return request.user.is_authenticated and cache.get(_pin_key(request))
+
+
+class ReplicaRoutingMixin:
+    """Serves replica_actions from a replica unless the user wrote
+    recently; successful writes pin the user to the primary for
+    REPLICA_PIN_SECONDS so they read their own writes"""
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            self.action in self.replica_actions
+            and request.method in SAFE_METHODS
+            and not is_pinned_to_primary(request)
+        ):
+            alias = choose_replica()
+            if alias:
+                self._read_alias_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_alias_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return super().finalize_response(request, response, *args, **kwargs)
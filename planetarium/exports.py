@@ -0,0 +1,82 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from planetarium.db_router import choose_replica
+from planetarium.models import ArchivedTicket, Ticket
+
+EXPORT_FIELDS = (
+    ("ticket_id", "id"),
+    ("row", "row"),
+    ("seat", "seat"),
+    ("reservation_id", "reservation_id"),
+    ("reserved_at", "reservation__created_at"),
+    ("user_id", "reservation__user_id"),
+    ("user_email", "reservation__user__email"),
+    ("show_session_id", "show_session_id"),
+    ("show_time", "show_session__show_time"),
+    ("astronomy_show", "show_session__astronomy_show__title"),
+    ("planetarium_dome", "show_session__planetarium_dome__name"),
+)
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def day_bounds(start, end):
+    """Turns an inclusive range of dates into [start, end) datetimes so
+    the reservation created_at index can be used"""
+    end = end + timedelta(days=1)
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def export_rows(start, end, chunk_size=2000):
+    """Yields ticket rows reserved between the dates, hot and archived
+    alike, through a server-side cursor chunk_size rows at a time,
+    preferring a healthy replica"""
+    start, end = day_bounds(start, end)
+    alias = choose_replica() or DEFAULT_DB_ALIAS
+    hot, archived = (
+        model.objects
+        .using(alias)
+        .filter(
+            reservation__created_at__gte=start,
+            reservation__created_at__lt=end,
+        )
+        .order_by()
+        .values_list(*(lookup for _, lookup in EXPORT_FIELDS))
+        for model in (Ticket, ArchivedTicket)
+    )
+    queryset = hot.union(archived, all=True).order_by(
+        "reservation__created_at", "id"
+    )
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_jsonl(rows):
+    headers = [header for header, _ in EXPORT_FIELDS]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def render(rows, export_format):
+    if export_format == "csv":
+        return render_csv(rows)
+    return render_jsonl(rows)
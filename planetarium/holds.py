@@ -0,0 +1,202 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
+from django.dispatch import Signal
+from django.utils import timezone
+
+from planetarium.conditional import seat_markers, touch
+from planetarium.jobs import enqueue, task
+from planetarium.layouts import capacity_expression
+from planetarium.models import SeatHold, ShowSession, Ticket
+from planetarium.seat_events import RELEASED, TAKEN, publish_on_commit
+
+logger = logging.getLogger(__name__)
+
+SWEEP_TASK = "planetarium.release_expired_holds"
+
+seats_held = Signal()
+seats_released = Signal()
+
+
+class SeatsTaken(Exception):
+
+    def __init__(self, seats):
+        super().__init__(seats)
+        self.seats = seats
+
+
+def hold_expiry():
+    ttl = getattr(settings, "SEAT_HOLD_TTL_SECONDS", 600)
+    return timezone.now() + timedelta(seconds=ttl)
+
+
+def _count_per_session(queryset):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(show_session=OuterRef("pk"))
+            .order_by()
+            .values("show_session")
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def tickets_available_expression():
+    """Seats left per session; tickets and live holds are counted in
+    correlated subqueries, so neither multiplies the other's rows"""
+    return (
+        capacity_expression()
+        - _count_per_session(Ticket.objects.all())
+        - _count_per_session(SeatHold.objects.filter(expires_at__gt=Now()))
+    )
+
+
+def _seats_filter(seats):
+    conditions = Q()
+    for row, seat in seats:
+        conditions |= Q(row=row, seat=seat)
+    return conditions
+
+
+def taken_seats(show_session, seats, user=None):
+    """Returns the (row, seat) pairs that are sold or actively held by
+    someone other than the user"""
+    seats = list(seats)
+    if not seats:
+        return set()
+    seats_filter = _seats_filter(seats)
+    taken = set(
+        Ticket.objects
+        .filter(seats_filter, show_session=show_session)
+        .values_list("row", "seat")
+    )
+    holds = SeatHold.objects.active().filter(
+        seats_filter, show_session=show_session
+    )
+    if user is not None and user.is_authenticated:
+        holds = holds.exclude(user=user)
+    taken.update(holds.values_list("row", "seat"))
+    return taken
+
+
+def lock_sessions(show_session_ids):
+    """Locks the session rows, in id order to avoid deadlocks, so holds
+    and tickets for the same seats are checked and written one at a
+    time; must be called inside a transaction"""
+    list(
+        ShowSession.objects
+        .select_for_update()
+        .filter(id__in=set(show_session_ids))
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def consume_holds(user, show_session, seats):
+    seats = list(seats)
+    if seats:
+        SeatHold.objects.filter(
+            _seats_filter(seats), show_session=show_session, user=user
+        ).delete()
+
+
+def hold_seats(user, show_session, seats, expires_at=None):
+    """Holds (row, seat) pairs of a session for the user, replacing
+    expired holds and refreshing the user's own ones"""
+    expires_at = expires_at or hold_expiry()
+    with transaction.atomic():
+        lock_sessions([show_session.id])
+        taken = taken_seats(show_session, seats, user)
+        if taken:
+            raise SeatsTaken(taken)
+        for row, seat in seats:
+            (
+                SeatHold.objects
+                .filter(show_session=show_session, row=row, seat=seat)
+                .filter(expires_at__lte=timezone.now())
+                .delete()
+            )
+        holds = []
+        for row, seat in seats:
+            hold, _ = SeatHold.objects.update_or_create(
+                show_session=show_session,
+                row=row,
+                seat=seat,
+                user=user,
+                defaults={"expires_at": expires_at},
+            )
+            holds.append(hold)
+        touch(*seat_markers(show_session.id))
+        publish_on_commit(show_session.id, TAKEN, seats)
+        seats_held.send(
+            sender=SeatHold, show_session_id=show_session.id, seats=seats
+        )
+        return holds
+
+
+def release_holds(holds):
+    seats_by_session = defaultdict(list)
+    for hold in holds:
+        seats_by_session[hold["show_session_id"]].append(
+            (hold["row"], hold["seat"])
+        )
+    SeatHold.objects.filter(id__in=[hold["id"] for hold in holds]).delete()
+    for show_session_id, seats in seats_by_session.items():
+        touch(*seat_markers(show_session_id))
+        publish_on_commit(show_session_id, RELEASED, seats)
+        seats_released.send(
+            sender=SeatHold, show_session_id=show_session_id, seats=seats
+        )
+
+
+def release_expired_holds(batch_size=None):
+    """Deletes expired holds in batches walking the expires_at index,
+    so a mass expiry never turns into one long-running delete"""
+    batch_size = batch_size or getattr(
+        settings, "SEAT_HOLD_SWEEP_BATCH_SIZE", 1000
+    )
+    released = 0
+    while True:
+        holds = list(
+            SeatHold.objects.expired()
+            .order_by("expires_at")
+            .values("id", "show_session_id", "row", "seat")[:batch_size]
+        )
+        if not holds:
+            break
+        release_holds(holds)
+        released += len(holds)
+        if len(holds) < batch_size:
+            break
+    return released
+
+
+def schedule_hold_sweep():
+    """Queues the next sweep unless one is already queued; the job
+    worker pool seeds the first one when it starts"""
+    interval = getattr(settings, "SEAT_HOLD_SWEEP_INTERVAL", 5)
+    if not interval:
+        return None
+    return enqueue(
+        SWEEP_TASK,
+        run_at=timezone.now() + timedelta(seconds=interval),
+        unique=True,
+    )
+
+
+@task(SWEEP_TASK)
+def sweep_expired_holds():
+    try:
+        released = release_expired_holds()
+        if released:
+            logger.info("Released %s expired seat holds", released)
+    finally:
+        schedule_hold_sweep()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from planetarium.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def _fingerprint(request):
+    payload = json.dumps(
+        request.data, sort_keys=True, cls=DjangoJSONEncoder
+    ).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    now = timezone.now()
+    IdempotencyKey.objects.filter(
+        user=user, key=key, expires_at__lte=now
+    ).delete()
+    ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL_SECONDS", 86400)
+    record, created = IdempotencyKey.objects.get_or_create(
+        user=user,
+        key=key,
+        defaults={
+            "request_fingerprint": fingerprint,
+            "expires_at": now + timedelta(seconds=ttl),
+            "locked_until": now + _lease(),
+        },
+    )
+    if not created and _reclaim(record, fingerprint, now):
+        created = True
+    return record, created
+
+
+def _lease():
+    return timedelta(
+        seconds=getattr(settings, "IDEMPOTENCY_LEASE_SECONDS", 60)
+    )
+
+
+def _reclaim(record, fingerprint, now):
+    """Takes over a record whose request never finished once its lease
+    has run out, e.g. after the worker handling it died"""
+    if record.status_code is not None:
+        return False
+    if record.request_fingerprint != fingerprint:
+        return False
+    locked_until = now + _lease()
+    reclaimed = IdempotencyKey.objects.filter(
+        Q(locked_until__lte=now) | Q(locked_until__isnull=True),
+        id=record.id,
+        status_code__isnull=True,
+    ).update(locked_until=locked_until)
+    if reclaimed:
+        record.locked_until = locked_until
+    return bool(reclaimed)
+
+
+def purge_expired_keys(batch_size=1000):
+    purged = 0
+    while True:
+        key_ids = list(
+            IdempotencyKey.objects
+            .filter(expires_at__lte=timezone.now())
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not key_ids:
+            return purged
+        IdempotencyKey.objects.filter(id__in=key_ids).delete()
+        purged += len(key_ids)
+
+
+class IdempotentCreateMixin:
+    """Stores the first outcome of a create per user and Idempotency-Key
+    header and replays it for retries instead of running create again"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} is too long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = _fingerprint(request)
+        record, created = _claim(request.user, key, fingerprint)
+
+        if not created:
+            if record.request_fingerprint != fingerprint:
+                return Response(
+                    {"detail": f"{IDEMPOTENCY_HEADER} was used "
+                               f"with a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is None:
+                return Response(
+                    {"detail": "A request with this "
+                               f"{IDEMPOTENCY_HEADER} is in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            response = Response(
+                record.response_body, status=record.status_code
+            )
+            response["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.handle_exception(exc)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=["status_code", "response_body"])
+        return response
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import (
+    IntegrityError,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from planetarium.models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name):
+    """Registers a function as a job handler; the job payload is passed
+    to it as keyword arguments"""
+
+    def register(function):
+        _tasks[name] = function
+        return function
+
+    return register
+
+
+def dedupe_key(name, payload):
+    return hashlib.sha256(
+        json.dumps([name, payload], sort_keys=True, cls=DjangoJSONEncoder)
+        .encode()
+    ).hexdigest()
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None, unique=False):
+    """Queues a job inside the caller's transaction, so it only becomes
+    visible to workers if that transaction commits; unique jobs are
+    deduplicated by a constraint on queued jobs, so concurrent callers
+    cannot both queue one"""
+    payload = payload or {}
+    fields = {
+        "name": name,
+        "payload": payload,
+        "run_at": run_at or timezone.now(),
+        "max_attempts": (
+            max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 5)
+        ),
+    }
+    if not unique:
+        return Job.objects.create(**fields)
+    job, _ = Job.objects.get_or_create(
+        dedupe_key=dedupe_key(name, payload),
+        status=Job.QUEUED,
+        defaults=fields,
+    )
+    return job
+
+
+def on_commit_batched(key, values, callback, using=None):
+    """Gathers values under key for the current transaction and calls
+    callback once with all of them when it commits, so a transaction
+    that touches thousands of rows schedules its follow-up work once"""
+    connection = connections[using or "default"]
+    if not connection.in_atomic_block:
+        callback(set(values))
+        return
+    batches = connection.__dict__.setdefault("planetarium_batches", {})
+    hooks, collected = batches.get(key, (None, None))
+    # Commit and rollback both replace run_on_commit with a new list, so
+    # a different list means the batch belonged to a finished transaction
+    if hooks is not connection.run_on_commit:
+        collected = set()
+        batches[key] = (connection.run_on_commit, collected)
+    collected.update(values)
+
+    def flush():
+        # The first hook to run takes the whole batch, the rest are no-ops
+        if collected:
+            batch = set(collected)
+            collected.clear()
+            callback(batch)
+
+    transaction.on_commit(flush, using=using)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 5)
+    cap = getattr(settings, "JOB_RETRY_BACKOFF_MAX_SECONDS", 600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def claim_jobs(worker_id, limit=1):
+    """Locks due jobs with SKIP LOCKED, so concurrent workers never wait
+    on each other or pick up the same job"""
+    with transaction.atomic():
+        jobs = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=timezone.now())
+            .order_by("run_at", "id")[:limit]
+        )
+        locked_at = timezone.now()
+        for job in jobs:
+            job.status = Job.RUNNING
+            job.locked_at = locked_at
+            job.locked_by = worker_id
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=Job.RUNNING,
+                locked_at=locked_at,
+                locked_by=worker_id,
+            )
+    return jobs
+
+
+def _finish(job, worker_id):
+    """Records the outcome only while the worker still holds the job, so
+    a run that outlived its lock cannot overwrite the job's next run"""
+    fields = {
+        field: getattr(job, field)
+        for field in (
+            "attempts", "status", "run_at", "last_error", "finished_at"
+        )
+    }
+    owned = Job.objects.filter(
+        id=job.id, status=Job.RUNNING, locked_by=worker_id
+    )
+    try:
+        with transaction.atomic():
+            return owned.update(locked_at=None, locked_by="", **fields)
+    except IntegrityError:
+        # A duplicate was queued while this one ran and takes its place
+        job.status = fields["status"] = Job.FAILED
+        job.finished_at = fields["finished_at"] = timezone.now()
+        logger.warning("Job %s is superseded by a queued duplicate", job)
+        return owned.update(locked_at=None, locked_by="", **fields)
+
+
+def run_job(job):
+    job.attempts += 1
+    try:
+        handler = _tasks[job.name]
+        handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.exception("Job %s failed for good", job)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning("Job %s failed, retrying at %s", job, job.run_at)
+    else:
+        job.status = Job.SUCCEEDED
+        job.finished_at = timezone.now()
+    worker_id = job.locked_by
+    job.locked_at = None
+    job.locked_by = ""
+    if not _finish(job, worker_id):
+        logger.warning(
+            "Job %s was taken from %s while running, dropping its result",
+            job,
+            worker_id,
+        )
+    return job
+
+
+def requeue_stale_jobs():
+    """Returns jobs of workers that died mid-run to the queue, unless a
+    duplicate has been queued in the meantime"""
+    timeout = getattr(settings, "JOB_LOCK_TIMEOUT_SECONDS", 300)
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout),
+    )
+    requeued = 0
+    for job_id in stale.values_list("id", flat=True):
+        try:
+            with transaction.atomic():
+                requeued += stale.filter(id=job_id).update(
+                    status=Job.QUEUED, locked_at=None, locked_by=""
+                )
+        except IntegrityError:
+            stale.filter(id=job_id).update(
+                status=Job.FAILED,
+                finished_at=timezone.now(),
+                locked_at=None,
+                locked_by="",
+            )
+    return requeued
+
+
+def run_pending(worker_id="inline", limit=None):
+    """Runs due jobs in the current thread until the queue is drained"""
+    processed = 0
+    while limit is None or processed < limit:
+        jobs = claim_jobs(worker_id)
+        if not jobs:
+            break
+        run_job(jobs[0])
+        processed += 1
+    return processed
+
+
+def purge_finished_jobs(batch_size=1000):
+    horizon = timezone.now() - timedelta(
+        seconds=getattr(settings, "JOB_RETENTION_SECONDS", 7 * 24 * 3600)
+    )
+    purged = 0
+    while True:
+        ids = list(
+            Job.objects
+            .filter(status=Job.SUCCEEDED, finished_at__lt=horizon)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += Job.objects.filter(id__in=ids).delete()[0]
+
+
+def job_metrics():
+    now = timezone.now()
+    by_status = dict(
+        Job.objects.values_list("status").annotate(count=Count("id"))
+    )
+    by_name = {
+        row["name"]: {
+            "queued": row["queued"],
+            "running": row["running"],
+            "failed": row["failed"],
+            "retrying": row["retrying"],
+        }
+        for row in Job.objects.values("name").annotate(
+            queued=Count("id", filter=Q(status=Job.QUEUED)),
+            running=Count("id", filter=Q(status=Job.RUNNING)),
+            failed=Count("id", filter=Q(status=Job.FAILED)),
+            retrying=Count(
+                "id", filter=Q(status=Job.QUEUED, attempts__gt=0)
+            ),
+        )
+    }
+    oldest_due = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min("run_at"))["oldest"]
+    return {
+        "statuses": {
+            status: by_status.get(status, 0)
+            for status, _ in Job.STATUS_CHOICES
+        },
+        "tasks": by_name,
+        "queue_lag_seconds": (
+            (now - oldest_due).total_seconds() if oldest_due else 0
+        ),
+    }
+
+
+class JobWorker(threading.Thread):
+
+    def __init__(self, index, poll_interval, stopped):
+        super().__init__(name=f"job-worker-{index}", daemon=True)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+        self.poll_interval = poll_interval
+        self.stopped = stopped
+
+    def run(self):
+        while not self.stopped.is_set():
+            close_old_connections()
+            try:
+                jobs = claim_jobs(self.worker_id)
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                jobs = []
+            if not jobs:
+                self.stopped.wait(self.poll_interval)
+                continue
+            try:
+                run_job(jobs[0])
+            except Exception:
+                logger.exception("Recording the result of %s failed", jobs[0])
+        close_old_connections()
+
+
+def run_workers(threads, poll_interval=None, stopped=None):
+    """Runs a pool of worker threads until stopped is set"""
+    poll_interval = poll_interval or getattr(
+        settings, "JOB_POLL_INTERVAL", 1
+    )
+    stopped = stopped or threading.Event()
+    workers = [
+        JobWorker(index, poll_interval, stopped) for index in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    while not stopped.wait(poll_interval * 30):
+        close_old_connections()
+        requeued = requeue_stale_jobs()
+        if requeued:
+            logger.warning("Requeued %s stale jobs", requeued)
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,188 @@
+from functools import lru_cache
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+STANDARD = "standard"
+SEAT_CODES = {"S": STANDARD, "W": "wheelchair", "C": "companion"}
+CATEGORY_CODES = {category: code for code, category in SEAT_CODES.items()}
+NO_SEAT = "."
+MAX_ROWS = 200
+MAX_SEATS_IN_ROW = 500
+
+
+class SeatLayout:
+    """A dome compiled to one integer bitmask per row, where bit n - 1 is
+    seat n, plus a mask per row for every non-standard seat category"""
+
+    __slots__ = ("row_masks", "category_masks", "capacity", "seats_in_row")
+
+    def __init__(self, row_masks, category_masks):
+        self.row_masks = row_masks
+        self.category_masks = category_masks
+        self.capacity = sum(mask.bit_count() for mask in row_masks)
+        self.seats_in_row = max(
+            (mask.bit_length() for mask in row_masks), default=0
+        )
+
+    @property
+    def rows(self):
+        return len(self.row_masks)
+
+    def has_seat(self, row, seat):
+        return (
+            1 <= row <= len(self.row_masks)
+            and seat >= 1
+            and bool(self.row_masks[row - 1] >> (seat - 1) & 1)
+        )
+
+    def category(self, row, seat):
+        for category, masks in self.category_masks:
+            if masks[row - 1] >> (seat - 1) & 1:
+                return category
+        return STANDARD
+
+    def seats(self):
+        for row, mask in enumerate(self.row_masks, start=1):
+            seat = 1
+            while mask:
+                if mask & 1:
+                    yield row, seat
+                mask >>= 1
+                seat += 1
+
+    def seat_map(self):
+        """Rows padded with gaps to the width of the widest row"""
+        width = self.seats_in_row
+        return [
+            "".join(
+                CATEGORY_CODES[self.category(row, seat)]
+                if self.has_seat(row, seat)
+                else NO_SEAT
+                for seat in range(1, width + 1)
+            )
+            for row in range(1, self.rows + 1)
+        ]
+
+
+@lru_cache(maxsize=256)
+def compile_layout(row_masks, category_masks=()):
+    return SeatLayout(row_masks, category_masks)
+
+
+def check_rectangle(rows, seats_in_row):
+    if not _is_mask(rows) or not 1 <= rows <= MAX_ROWS:
+        raise ValueError(f"A dome needs between 1 and {MAX_ROWS} rows")
+    if not _is_mask(seats_in_row) or not 1 <= seats_in_row <= MAX_SEATS_IN_ROW:
+        raise ValueError(
+            f"A row needs between 1 and {MAX_SEATS_IN_ROW} seats"
+        )
+
+
+def rectangle(rows, seats_in_row):
+    check_rectangle(rows, seats_in_row)
+    return compile_layout(((1 << seats_in_row) - 1,) * rows)
+
+
+def _is_mask(value):
+    return isinstance(value, int) and not isinstance(value, bool) and (
+        value >= 0
+    )
+
+
+def check_layout(layout):
+    """Raises ValueError unless layout is one layout_for can compile: a
+    non-empty list of positive row masks and, per non-standard category,
+    one mask per row covering only seats the row has"""
+    rows = layout.get("rows") if isinstance(layout, dict) else None
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("A layout needs a non-empty list of rows")
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f"A dome needs between 1 and {MAX_ROWS} rows")
+    for row, mask in enumerate(rows, start=1):
+        if not _is_mask(mask) or not mask:
+            raise ValueError(f"Row {row} must be a positive integer bitmask")
+        if mask.bit_length() > MAX_SEATS_IN_ROW:
+            raise ValueError(
+                f"Row {row} is longer than {MAX_SEATS_IN_ROW} seats"
+            )
+    categories = layout.get("categories", {})
+    if not isinstance(categories, dict):
+        raise ValueError("Layout categories must map names to row masks")
+    for category, masks in categories.items():
+        if category not in CATEGORY_CODES or category == STANDARD:
+            raise ValueError(f"Unknown seat category {category!r}")
+        if not isinstance(masks, list) or len(masks) != len(rows):
+            raise ValueError(
+                f"Category {category} needs one mask for each of the "
+                f"{len(rows)} rows"
+            )
+        for row, (mask, row_mask) in enumerate(zip(masks, rows), start=1):
+            if not _is_mask(mask) or mask & ~row_mask:
+                raise ValueError(
+                    f"Category {category} marks seats row {row} does not "
+                    f"have"
+                )
+
+
+def layout_for(dome):
+    """Compiled layout of a dome; domes without a stored layout are full
+    rectangles of rows * seats_in_row"""
+    if not dome.layout:
+        return rectangle(dome.rows, dome.seats_in_row)
+    rows = tuple(dome.layout["rows"])
+    return compile_layout(
+        rows,
+        tuple(
+            sorted(
+                (category, tuple(masks))
+                for category, masks in dome.layout.get(
+                    "categories", {}
+                ).items()
+            )
+        ),
+    )
+
+
+def parse_seat_map(lines):
+    """Turns rows such as "SS.WCSS" into the stored layout; "." marks a
+    gap and every other character a seat of the category it codes for"""
+    if not lines:
+        raise ValueError("A seat map needs at least one row")
+    if len(lines) > MAX_ROWS:
+        raise ValueError(f"A dome needs between 1 and {MAX_ROWS} rows")
+    rows = []
+    categories = {}
+    for row, line in enumerate(lines, start=1):
+        if len(line) > MAX_SEATS_IN_ROW:
+            raise ValueError(
+                f"Row {row} is longer than {MAX_SEATS_IN_ROW} seats"
+            )
+        mask = 0
+        for seat, code in enumerate(line, start=1):
+            if code == NO_SEAT:
+                continue
+            if code not in SEAT_CODES:
+                raise ValueError(
+                    f"Unknown seat code {code!r} in row {row}, use "
+                    f"{', '.join(SEAT_CODES)} or {NO_SEAT!r}"
+                )
+            mask |= 1 << (seat - 1)
+            if SEAT_CODES[code] != STANDARD:
+                categories.setdefault(SEAT_CODES[code], [0] * len(lines))
+                categories[SEAT_CODES[code]][row - 1] |= 1 << (seat - 1)
+        if not mask:
+            raise ValueError(f"Row {row} has no seats")
+        rows.append(mask)
+    layout = {"rows": rows, "categories": categories}
+    check_layout(layout)
+    return layout
+
+
+def capacity_expression(prefix="planetarium_dome__"):
+    """Dome capacity in SQL; seat_count is filled in on save, the product
+    covers rectangular domes that have not been saved since"""
+    return Coalesce(
+        F(f"{prefix}seat_count"),
+        F(f"{prefix}rows") * F(f"{prefix}seats_in_row"),
+    )
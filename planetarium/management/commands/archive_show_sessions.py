@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.archival import archive_past_sessions
+
+
+class Command(BaseCommand):
+    help = "Move past show sessions and their tickets to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horizon-days", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        counts = archive_past_sessions(
+            horizon_days=options["horizon_days"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {counts['show_sessions']} show sessions "
+                f"and {counts['tickets']} tickets"
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema artifact for the current code"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true")
+
+    def handle(self, *args, **options):
+        for path in build_schema(force=options["force"]):
+            self.stdout.write(self.style.SUCCESS(f"Schema written to {path}"))
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from planetarium.exports import EXPORT_FORMATS, export_rows, render
+
+
+class Command(BaseCommand):
+    help = "Stream tickets reserved in a date range as CSV or JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", type=date.fromisoformat)
+        parser.add_argument("end", type=date.fromisoformat)
+        parser.add_argument(
+            "--format", choices=EXPORT_FORMATS, default="csv"
+        )
+        parser.add_argument("--output", help="File to write, stdout if unset")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=getattr(settings, "EXPORT_CHUNK_SIZE", 2000),
+        )
+
+    def handle(self, *args, **options):
+        lines = render(
+            export_rows(
+                options["start"], options["end"], options["chunk_size"]
+            ),
+            options["format"],
+        )
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", newline="") as output:
+            output.writelines(lines)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.jobs import purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = "Delete succeeded jobs older than JOB_RETENTION_SECONDS"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = purge_finished_jobs(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} finished jobs"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_keys(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {purged} expired idempotency keys")
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.analytics import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new show sessions and tickets into the sales rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        counts = refresh_sales_rollups(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {counts['show_sessions']} show sessions "
+                f"and {counts['tickets']} tickets"
+            )
+        )
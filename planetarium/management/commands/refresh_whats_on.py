@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.whats_on import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the upcoming sessions feed and drop started sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        refreshed = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} upcoming sessions")
+        )
@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from planetarium.holds import schedule_hold_sweep
+from planetarium.jobs import run_pending, run_workers
+
+
+def serve(threads):
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stopped.set())
+    run_workers(threads, stopped=stopped)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=getattr(settings, "JOB_WORKER_THREADS", 4),
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=getattr(settings, "JOB_WORKER_PROCESSES", 1),
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are due and exit",
+        )
+
+    def handle(self, *args, **options):
+        schedule_hold_sweep()
+        if options["once"]:
+            processed = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs"))
+            return
+
+        self.stdout.write(
+            f"Starting {options['processes']} worker processes with "
+            f"{options['threads']} threads each"
+        )
+        if options["processes"] == 1:
+            serve(options["threads"])
+            return
+
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=serve, args=(options["threads"],))
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        # Installed after forking, so the children keep their own handlers
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+        for process in processes:
+            process.join()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from planetarium.warmup import warm
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-import modules, compile URLs, build serializers, open "
+        "database connections and prime caches, reporting timings"
+    )
+
+    def handle(self, *args, **options):
+        report = warm()
+        for name, duration in report["imports"].items():
+            self.stdout.write(
+                f"import {name}: "
+                + ("already loaded" if duration is None else f"{duration} ms")
+            )
+        for name, duration in report["steps"].items():
+            self.stdout.write(f"{name}: {duration} ms")
+        if report["errors"]:
+            raise CommandError(f"Warm-up failed: {report['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Warmed up in {report['total_ms']} ms")
+        )
@@ -0,0 +1,68 @@
+import re
+
+import brotli
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from planetarium import slow_queries
+
+accepts_brotli = re.compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compresses responses with brotli when the client accepts it and
+    falls back to gzip otherwise; event streams are left alone so every
+    event is flushed as soon as it is produced"""
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < getattr(
+                settings, "COMPRESSION_MIN_SIZE", 200
+            )
+            or not accepts_brotli.search(
+                request.META.get("HTTP_ACCEPT_ENCODING", "")
+            )
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(
+            response.content,
+            quality=getattr(settings, "BROTLI_QUALITY", 5),
+        )
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
+
+
+class SlowQueryMiddleware:
+    """Records statements slower than SLOW_QUERY_THRESHOLD_MS together
+    with their plan and the view that ran them, including those run while
+    a streamed body is consumed; off while it is None"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None) is None:
+            return self.get_response(request)
+        with slow_queries.capture(request):
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = slow_queries.capture_iterator(
+                response.streaming_content, request
+            )
+        return response
@@ -3,20 +3,108 @@ import uuid
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 
+from planetarium.layouts import (
+    MAX_ROWS,
+    MAX_SEATS_IN_ROW,
+    check_layout,
+    check_rectangle,
+    layout_for,
+)
+
 
 class PlanetariumDome(models.Model):
 
     name = models.CharField(max_length=255)
-    rows = models.IntegerField()
-    seats_in_row = models.IntegerField()
+    rows = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(MAX_ROWS)]
+    )
+    seats_in_row = models.IntegerField(
+        validators=[
+            MinValueValidator(1),
+            MaxValueValidator(MAX_SEATS_IN_ROW),
+        ]
+    )
+    layout = models.JSONField(null=True, blank=True)
+    seat_count = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+
+    @cached_property
+    def seat_layout(self):
+        return layout_for(self)
 
     @property
     def capacity(self):
-        return self.seats_in_row * self.rows
+        return self.seat_layout.capacity
+
+    def clean_layout(self):
+        """Checks the stored layout, or the rows and seats_in_row of a
+        rectangular dome, before anything compiles it"""
+        try:
+            if self.layout:
+                check_layout(self.layout)
+            else:
+                check_rectangle(self.rows, self.seats_in_row)
+        except ValueError as error:
+            raise ValidationError(
+                {"layout": str(error)} if self.layout else str(error)
+            )
+
+    def displaced_seats(self):
+        """Seats with tickets for upcoming sessions that the dome's
+        current rows, seats_in_row and layout no longer have"""
+        layout = layout_for(self)
+        return [
+            (row, seat)
+            for row, seat in (
+                Ticket.objects
+                .filter(
+                    show_session__planetarium_dome_id=self.id,
+                    show_session__show_time__gte=timezone.now(),
+                )
+                .values_list("row", "seat")
+                .distinct()
+                .order_by("row", "seat")
+            )
+            if not layout.has_seat(row, seat)
+        ]
+
+    def clean(self):
+        self.clean_layout()
+        if self.id is None:
+            return
+        displaced = self.displaced_seats()
+        if displaced:
+            seats = ", ".join(
+                f"row {row} seat {seat}" for row, seat in displaced[:10]
+            )
+            if len(displaced) > 10:
+                seats += f" and {len(displaced) - 10} more"
+            raise ValidationError(
+                f"Tickets for upcoming sessions hold seats this change "
+                f"removes: {seats}"
+            )
+
+    def save(self, *args, **kwargs):
+        self.__dict__.pop("seat_layout", None)
+        self.clean_layout()
+        if self.layout:
+            self.rows = self.seat_layout.rows
+            self.seats_in_row = self.seat_layout.seats_in_row
+        self.seat_count = self.seat_layout.capacity
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"], "rows", "seats_in_row", "seat_count"
+            }
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -66,7 +154,7 @@ class ShowSession(models.Model):
         on_delete=models.CASCADE,
         related_name="show_sessions"
     )
-    show_time = models.DateTimeField()
+    show_time = models.DateTimeField(db_index=True)
 
     def __str__(self):
         return f"{self.astronomy_show.title} {str(self.show_time)}"
@@ -77,7 +165,7 @@ class ShowSession(models.Model):
 
 class Reservation(models.Model):
 
-    created_at = models.DateTimeField()
+    created_at = models.DateTimeField(db_index=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -108,16 +196,15 @@ class Ticket(models.Model):
 
     @staticmethod
     def validate_ticket(row, seat, planetarium_dome, error_message):
-        for ticket_attr_value, ticket_attr_name, planetarium_dome_name in [
-            (row, "row", "rows"),
-            (seat, "seat", "seats"),
-
-        ]:
-            count_attrs = getattr(planetarium_dome, planetarium_dome_name)
-            if not (1 <= ticket_attr_value <= count_attrs):
+        layout = planetarium_dome.seat_layout
+        if not (1 <= row <= layout.rows):
+            raise error_message(f"row must be between 1 and {layout.rows}")
+        if not layout.has_seat(row, seat):
+            if not (1 <= seat <= layout.seats_in_row):
                 raise error_message(
-                    f"{ticket_attr_name} must be between 1 and {count_attrs}"
+                    f"seat must be between 1 and {layout.seats_in_row}"
                 )
+            raise error_message(f"row {row} has no seat {seat}")
 
     def clean(self):
         Ticket.validate_ticket(
@@ -151,3 +238,371 @@ class Ticket(models.Model):
                 name='unique_ticket'
             )
         ]
+
+
+class SeatHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    show_session = models.ForeignKey(
+        ShowSession,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    def __str__(self):
+        return (
+            f"{str(self.show_session)} (row: {self.row}, seat: {self.seat}) "
+            f"until {self.expires_at}"
+        )
+
+    class Meta:
+        ordering = ["expires_at"]
+        constraints = [
+            UniqueConstraint(
+                fields=["show_session", "row", "seat"],
+                name="unique_seat_hold"
+            )
+        ]
+
+
+class IdempotencyKey(models.Model):
+
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    request_fingerprint = models.CharField(max_length=64)
+    status_code = models.IntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_until = models.DateTimeField(null=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["user", "key"],
+                name="unique_idempotency_key"
+            )
+        ]
+
+
+class ArchivedShowSession(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    astronomy_show = models.ForeignKey(
+        AstronomyShow,
+        on_delete=models.CASCADE,
+        related_name="archived_show_sessions"
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome,
+        on_delete=models.CASCADE,
+        related_name="archived_show_sessions"
+    )
+    show_time = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.astronomy_show.title} {str(self.show_time)}"
+
+    class Meta:
+        ordering = ["-show_time"]
+
+
+class ArchivedReservation(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_reservations"
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return str(self.created_at)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+class ArchivedTicket(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    show_session = models.ForeignKey(
+        ArchivedShowSession,
+        on_delete=models.CASCADE,
+        related_name="tickets"
+    )
+    reservation = models.ForeignKey(
+        ArchivedReservation,
+        on_delete=models.CASCADE,
+        related_name="tickets"
+    )
+
+    def __str__(self):
+        return (
+            f"{str(self.show_session)} (row: {self.row}, seat: {self.seat})"
+        )
+
+
+class ChangeMarker(models.Model):
+
+    key = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
+
+
+class TicketCheckIn(models.Model):
+
+    ticket_id = models.BigIntegerField(unique=True)
+    show_session_id = models.BigIntegerField(db_index=True)
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    scanner = models.CharField(max_length=100, blank=True)
+    batch = models.UUIDField(db_index=True)
+    checked_in_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return (
+            f"{self.ticket_id} (row: {self.row}, seat: {self.seat}) "
+            f"at {self.checked_in_at}"
+        )
+
+    class Meta:
+        ordering = ["-checked_in_at"]
+
+
+class WaitlistEntryQuerySet(models.QuerySet):
+    def waiting(self):
+        return self.filter(matched_at__isnull=True)
+
+
+class WaitlistEntry(models.Model):
+
+    show_session = models.ForeignKey(
+        ShowSession,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries"
+    )
+    party_size = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    matched_at = models.DateTimeField(null=True, blank=True)
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WaitlistEntryQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{str(self.show_session)} (party of {self.party_size})"
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["show_session", "created_at"],
+                condition=models.Q(matched_at__isnull=True),
+                name="waitlist_fifo_idx"
+            )
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=["show_session", "user"],
+                condition=models.Q(matched_at__isnull=True),
+                name="unique_waiting_entry"
+            )
+        ]
+
+
+class UpcomingSession(models.Model):
+
+    show_session = models.OneToOneField(
+        ShowSession,
+        on_delete=models.CASCADE,
+        related_name="upcoming"
+    )
+    astronomy_show = models.ForeignKey(
+        AstronomyShow,
+        on_delete=models.CASCADE,
+        related_name="upcoming_sessions"
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome,
+        on_delete=models.CASCADE,
+        related_name="upcoming_sessions"
+    )
+    day = models.DateField()
+    show_time = models.DateTimeField(db_index=True)
+    show_title = models.CharField(max_length=255)
+    show_image = models.CharField(max_length=255, blank=True)
+    dome_name = models.CharField(max_length=255)
+    tickets_available = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.show_title} {str(self.show_time)}"
+
+    class Meta:
+        ordering = ["show_time"]
+
+
+class Job(models.Model):
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    dedupe_key = models.CharField(
+        max_length=64, null=True, blank=True, editable=False
+    )
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+    class Meta:
+        ordering = ["run_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"],
+                name="job_queue_idx"
+            )
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="queued"),
+                name="unique_queued_job"
+            )
+        ]
+
+
+class WaitingRoom(models.Model):
+    """Puts the sales of one session behind a queue that admits
+    admit_per_minute buyers from opens_at on"""
+
+    show_session = models.OneToOneField(
+        ShowSession, on_delete=models.CASCADE, related_name="waiting_room"
+    )
+    opens_at = models.DateTimeField()
+    admit_per_minute = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)]
+    )
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"Waiting room for session {self.show_session_id}"
+
+
+class SalesWatermark(models.Model):
+
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+class SessionSales(models.Model):
+
+    show_session_id = models.BigIntegerField(unique=True)
+    astronomy_show = models.ForeignKey(
+        AstronomyShow,
+        on_delete=models.CASCADE,
+        related_name="session_sales"
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome,
+        on_delete=models.CASCADE,
+        related_name="session_sales"
+    )
+    show_time = models.DateTimeField(db_index=True)
+    capacity = models.IntegerField()
+    tickets_sold = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.show_session_id} ({self.tickets_sold}/{self.capacity})"
+
+    class Meta:
+        ordering = ["-show_time"]
+
+
+class HourlySales(models.Model):
+
+    hour = models.DateTimeField()
+    astronomy_show = models.ForeignKey(
+        AstronomyShow,
+        on_delete=models.CASCADE,
+        related_name="hourly_sales"
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome,
+        on_delete=models.CASCADE,
+        related_name="hourly_sales"
+    )
+    tickets_sold = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hour} ({self.tickets_sold})"
+
+    class Meta:
+        ordering = ["-hour"]
+        constraints = [
+            UniqueConstraint(
+                fields=["hour", "astronomy_show", "planetarium_dome"],
+                name="unique_hourly_sales"
+            )
+        ]
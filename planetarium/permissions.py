@@ -1,5 +1,7 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
+from planetarium.waiting_room import check_admission
+
 
 class IsAdminOrIfAuthenticatedReadOnly(BasePermission):
     def has_permission(self, request, view):
@@ -7,3 +9,13 @@ class IsAdminOrIfAuthenticatedReadOnly(BasePermission):
             request.method in SAFE_METHODS
             and request.user.is_authenticated
         ) or request.user.is_staff
+
+
+class HasWaitingRoomAdmission(BasePermission):
+    """Lets writes to sessions behind a waiting room through only with an
+    admitted queue token; the view names the sessions a request touches"""
+
+    def has_permission(self, request, view):
+        if request.method not in SAFE_METHODS:
+            check_admission(request, view.get_admission_session_ids(request))
+        return True
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+import drf_spectacular
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views import View
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+SCHEMA_FORMATS = {
+    "yaml": (OpenApiYamlRenderer, "application/vnd.oai.openapi"),
+    "json": (OpenApiJsonRenderer, "application/vnd.oai.openapi+json"),
+}
+
+_loaded = {}
+_build_lock = threading.Lock()
+
+
+def _source_dirs():
+    base_dir = Path(settings.BASE_DIR).resolve()
+    dirs = {
+        Path(config.path).resolve()
+        for config in apps.get_app_configs()
+        if Path(config.path).resolve().is_relative_to(base_dir)
+    }
+    urlconf = import_module(settings.ROOT_URLCONF)
+    dirs.add(Path(urlconf.__file__).resolve().parent)
+    return sorted(dirs)
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint():
+    """Hashes the project's source and schema settings, so the artifact
+    name changes exactly when the generated schema could"""
+    digest = hashlib.sha256()
+    digest.update(drf_spectacular.__version__.encode())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    for directory in _source_dirs():
+        for path in sorted(directory.rglob("*.py")):
+            if "tests" in path.parts or "migrations" in path.parts:
+                continue
+            digest.update(str(path.relative_to(directory)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(schema_format):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / (
+        f"openapi-{code_fingerprint()}.{schema_format}"
+    )
+
+
+def build_schema(force=False):
+    """Generates the schema once and writes it in every served format,
+    removing artifacts left behind by older code"""
+    paths = [artifact_path(schema_format) for schema_format in SCHEMA_FORMATS]
+    if not force and all(path.exists() for path in paths):
+        return paths
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for schema_format, path in zip(SCHEMA_FORMATS, paths):
+        renderer_class, _ = SCHEMA_FORMATS[schema_format]
+        # Every builder writes its own temporary file, so concurrent
+        # builds never interleave and the rename publishes whole files
+        with tempfile.NamedTemporaryFile(
+            dir=directory, prefix=f"{path.name}.", suffix=".tmp", delete=False
+        ) as tmp_file:
+            tmp_file.write(
+                renderer_class().render(schema, renderer_context={})
+            )
+        try:
+            os.chmod(tmp_file.name, 0o644)
+            os.replace(tmp_file.name, path)
+        except OSError:
+            Path(tmp_file.name).unlink(missing_ok=True)
+            raise
+        for stale in directory.glob(f"openapi-*.{schema_format}"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+    return paths
+
+
+def load_schema(schema_format):
+    path = artifact_path(schema_format)
+    if path not in _loaded:
+        with _build_lock:
+            if path not in _loaded:
+                if not path.exists():
+                    build_schema()
+                body = path.read_bytes()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                _loaded[path] = body, etag
+    return _loaded[path]
+
+
+class CachedSchemaView(View):
+    """Serves the prebuilt schema from memory, so a schema request costs
+    no more than a static file"""
+
+    def get_format(self, request):
+        schema_format = request.GET.get("format")
+        if schema_format in SCHEMA_FORMATS:
+            return schema_format
+        if "json" in request.headers.get("Accept", ""):
+            return "json"
+        return "yaml"
+
+    def get(self, request, *args, **kwargs):
+        schema_format = self.get_format(request)
+        body, etag = load_schema(schema_format)
+        max_age = getattr(settings, "OPENAPI_SCHEMA_MAX_AGE", 3600)
+        cache_control = f"public, max-age={max_age}"
+
+        etags = [
+            tag.removeprefix("W/")
+            for tag in parse_etags(request.headers.get("If-None-Match", ""))
+        ]
+        if etag in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                body, content_type=SCHEMA_FORMATS[schema_format][1]
+            )
+            response["Content-Disposition"] = (
+                f'inline; filename="{spectacular_settings.TITLE or "schema"}'
+                f'.{schema_format}"'
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        response["Vary"] = "Accept"
+        return response
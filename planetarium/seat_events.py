@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TAKEN = "taken"
+RELEASED = "released"
+RELAY_CHANNEL = "planetarium:seat_events"
+
+
+class SeatEventHub:
+    """Fans seat changes of a show session out to every stream subscribed
+    to it in this process. A change is encoded once and handed to each
+    subscriber's queue on its own event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, show_session_id):
+        queue = asyncio.Queue(
+            maxsize=getattr(settings, "SEAT_EVENTS_QUEUE_SIZE", 100)
+        )
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[show_session_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, show_session_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(show_session_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[show_session_id]
+
+    def subscriber_count(self, show_session_id):
+        with self._lock:
+            return len(self._subscribers.get(show_session_id, ()))
+
+    def publish(self, show_session_id, event, seats):
+        with self._lock:
+            subscribers = list(self._subscribers.get(show_session_id, ()))
+        if not subscribers:
+            return
+
+        message = f"event: {event}\ndata: {json.dumps(seats)}\n\n"
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                self.unsubscribe(show_session_id, subscriber)
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Dropping seat event for a slow subscriber")
+
+
+hub = SeatEventHub()
+
+
+def relay_url():
+    return getattr(settings, "SEAT_EVENTS_REDIS_URL", None)
+
+
+class SeatEventRelay:
+    """Carries seat changes between processes over Redis pub/sub. Every
+    process publishes to one channel, and processes with stream
+    subscribers feed what they hear into their hub, so holds released or
+    claimed by the job workers reach the web processes' streams."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._lock = threading.Lock()
+        self._client = None
+        self._listener = None
+        self._pid = None
+
+    def client(self):
+        with self._lock:
+            # Connections are not shared with a process forked from here
+            if self._client is None or self._pid != os.getpid():
+                import redis
+
+                self._client = redis.Redis.from_url(relay_url())
+                self._listener = None
+                self._pid = os.getpid()
+            return self._client
+
+    def publish(self, show_session_id, event, seats):
+        message = json.dumps(
+            {"session": show_session_id, "event": event, "seats": seats}
+        )
+        try:
+            self.client().publish(RELAY_CHANNEL, message)
+        except Exception:
+            logger.exception("Relaying a seat event failed")
+            self.hub.publish(show_session_id, event, seats)
+
+    def receive(self, data):
+        message = json.loads(data)
+        self.hub.publish(
+            message["session"], message["event"], message["seats"]
+        )
+
+    def listen(self):
+        client = self.client()
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen,
+                args=(client,),
+                name="seat-event-relay",
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(RELAY_CHANNEL)
+                for message in pubsub.listen():
+                    self.receive(message["data"])
+            except Exception:
+                logger.exception("Seat event relay lost its connection")
+            time.sleep(1)
+
+
+relay = SeatEventRelay(hub)
+
+
+def broadcast(show_session_id, event, seats):
+    """Publishes to the streams of every process when a relay is set up,
+    otherwise to this process only"""
+    if relay_url():
+        relay.publish(show_session_id, event, seats)
+    else:
+        hub.publish(show_session_id, event, seats)
+
+
+def start_relay():
+    if relay_url():
+        relay.listen()
+
+
+def publish_on_commit(show_session_id, event, seats):
+    seats = [{"row": row, "seat": seat} for row, seat in seats]
+    if seats:
+        transaction.on_commit(
+            lambda: broadcast(show_session_id, event, seats)
+        )
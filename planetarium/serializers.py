@@ -1,7 +1,18 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-
+from rest_framework.permissions import SAFE_METHODS
+
+from .holds import (
+    SeatsTaken,
+    consume_holds,
+    hold_seats,
+    lock_sessions,
+    taken_seats,
+)
+from .layouts import parse_seat_map
+from .ticket_codes import ticket_code
 from .models import (
     PlanetariumDome,
     Ticket,
@@ -9,16 +20,114 @@ from .models import (
     ShowTheme,
     Reservation,
     AstronomyShow,
+    SeatHold,
+    ArchivedReservation,
+    ArchivedTicket,
+    WaitlistEntry,
 )
 
 
-class PlanetariumDomeSerializer(serializers.ModelSerializer):
+def query_param_set(request, name):
+    value = request.query_params.get(name) if request else None
+    if not value:
+        return set()
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """Trims the top-level output to ?fields= and swaps the fields listed
+    in Meta.expandable_fields for nested serializers on ?expand="""
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if (
+            request is None
+            or request.method not in SAFE_METHODS
+            or not self._is_root()
+        ):
+            return fields
+
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in query_param_set(request, "expand"):
+            if name in expandable:
+                serializer_class, kwargs = expandable[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        requested = query_param_set(request, "fields")
+        if requested:
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if name in requested
+            }
+        return fields
+
+
+class SeatMapField(serializers.ListField):
+    """A dome layout as one string per row, e.g. "SS.WCSS" """
+
+    child = serializers.CharField(trim_whitespace=False)
+
+    def get_attribute(self, instance):
+        return instance.seat_layout.seat_map()
+
+    def to_internal_value(self, data):
+        try:
+            return parse_seat_map(super().to_internal_value(data))
+        except ValueError as error:
+            raise ValidationError(str(error))
+
+
+class PlanetariumDomeSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
+    seat_map = SeatMapField(source="layout", required=False, write_only=True)
+
+    class Meta:
+        model = PlanetariumDome
+        fields = (
+            "id",
+            "name",
+            "seats_in_row",
+            "rows",
+            "capacity",
+            "seat_map",
+        )
+        extra_kwargs = {
+            "rows": {"required": False},
+            "seats_in_row": {"required": False},
+        }
+
+    def validate(self, attrs):
+        if "layout" in attrs:
+            return attrs
+        if "rows" in attrs or "seats_in_row" in attrs:
+            attrs["layout"] = None
+        if self.instance is None and not (
+            "rows" in attrs and "seats_in_row" in attrs
+        ):
+            raise ValidationError(
+                "Provide either rows and seats_in_row or a seat_map"
+            )
+        return attrs
+
+
+class PlanetariumDomeLayoutSerializer(serializers.ModelSerializer):
+    seat_map = SeatMapField(source="layout", read_only=True)
+
     class Meta:
         model = PlanetariumDome
-        fields = ("id", "name", "seats_in_row", "rows", "capacity")
+        fields = ("id", "rows", "seats_in_row", "capacity", "seat_map")
 
 
-class ShowSessionSerializer(serializers.ModelSerializer):
+class ShowSessionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShowSession
         fields = (
@@ -29,13 +138,18 @@ class ShowSessionSerializer(serializers.ModelSerializer):
         )
 
 
-class ShowThemeSerializer(serializers.ModelSerializer):
+class ShowThemeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShowTheme
         fields = ("id", "name")
 
 
 class TicketSerializer(serializers.ModelSerializer):
+    code = serializers.SerializerMethodField()
+
+    def get_code(self, obj):
+        return ticket_code(obj)
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -44,6 +158,15 @@ class TicketSerializer(serializers.ModelSerializer):
             data["show_session"].planetarium_dome,
             ValidationError
         )
+        request = self.context.get("request")
+        if taken_seats(
+            data["show_session"],
+            [(attrs["row"], attrs["seat"])],
+            request.user if request else None,
+        ):
+            raise ValidationError(
+                f"row {attrs['row']}, seat {attrs['seat']} is already taken"
+            )
         return data
 
     class Meta:
@@ -53,8 +176,10 @@ class TicketSerializer(serializers.ModelSerializer):
             "row",
             "seat",
             "show_session",
-            "reservation"
+            "reservation",
+            "code",
         )
+        read_only_fields = ("reservation",)
 
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -71,9 +196,26 @@ class ReservationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
+            lock_sessions(
+                ticket_data["show_session"].id for ticket_data in tickets_data
+            )
             reservation = Reservation.objects.create(**validated_data)
             for ticket_data in tickets_data:
+                if taken_seats(
+                    ticket_data["show_session"],
+                    [(ticket_data["row"], ticket_data["seat"])],
+                    reservation.user,
+                ):
+                    raise ValidationError(
+                        f"row {ticket_data['row']}, seat "
+                        f"{ticket_data['seat']} was taken meanwhile"
+                    )
                 Ticket.objects.create(reservation=reservation, **ticket_data)
+                consume_holds(
+                    reservation.user,
+                    ticket_data["show_session"],
+                    [(ticket_data["row"], ticket_data["seat"])],
+                )
             return reservation
 
 
@@ -81,7 +223,7 @@ class ReservationListSerializer(ReservationSerializer):
     tickets = TicketSerializer(many=True, read_only=True)
 
 
-class AstronomyShowSerializer(serializers.ModelSerializer):
+class AstronomyShowSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AstronomyShow
         fields = (
@@ -106,6 +248,9 @@ class AstronomyShowListSerializer(AstronomyShowSerializer):
             "show_theme",
             "image"
         )
+        expandable_fields = {
+            "show_theme": (ShowThemeSerializer, {"many": True}),
+        }
 
 
 class AstronomyShowDetailsSerializer(AstronomyShowSerializer):
@@ -158,6 +303,10 @@ class ShowSessionListSerializer(ShowSessionSerializer):
             "planetarium_dome_capacity",
             "tickets_available",
         )
+        expandable_fields = {
+            "astronomy_show": (AstronomyShowListSerializer, {}),
+            "planetarium_dome": (PlanetariumDomeSerializer, {}),
+        }
 
 
 class TicketListSerializer(TicketSerializer):
@@ -178,9 +327,7 @@ class TicketSeatsSerializer(TicketSerializer):
 class ShowSessionDetailSerializer(ShowSessionSerializer):
     astronomy_show = AstronomyShowSerializer(read_only=True)
     planetarium_dome = PlanetariumDomeSerializer(read_only=True)
-    taken_places = TicketSeatsSerializer(
-        source="tickets", many=True, read_only=True
-    )
+    taken_places = serializers.SerializerMethodField()
 
     class Meta:
         model = ShowSession
@@ -191,3 +338,220 @@ class ShowSessionDetailSerializer(ShowSessionSerializer):
             "planetarium_dome",
             "taken_places",
         )
+
+    def get_taken_places(self, obj):
+        places = TicketSeatsSerializer(obj.tickets.all(), many=True).data
+        places.extend(
+            {"row": hold.row, "seat": hold.seat}
+            for hold in getattr(obj, "active_holds", obj.seat_holds.active())
+        )
+        return places
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = (
+            "id",
+            "row",
+            "seat",
+            "show_session",
+            "expires_at",
+        )
+        read_only_fields = fields
+
+
+class SeatHoldCreateSerializer(serializers.Serializer):
+    show_session = serializers.PrimaryKeyRelatedField(
+        queryset=ShowSession.objects.select_related("planetarium_dome")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        show_session = attrs["show_session"]
+        seats = [(seat["row"], seat["seat"]) for seat in attrs["seats"]]
+        for row, seat in seats:
+            Ticket.validate_ticket(
+                row, seat, show_session.planetarium_dome, ValidationError
+            )
+        taken = taken_seats(show_session, seats, self.context["request"].user)
+        if taken:
+            raise ValidationError(
+                {"seats": [
+                    f"row {row}, seat {seat} is already taken"
+                    for row, seat in sorted(taken)
+                ]}
+            )
+        attrs["seats"] = seats
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                self.context["request"].user,
+                validated_data["show_session"],
+                validated_data["seats"],
+            )
+        except (IntegrityError, SeatsTaken):
+            raise ValidationError({"seats": ["Seats were taken meanwhile"]})
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = (
+            "id",
+            "show_session",
+            "party_size",
+            "created_at",
+            "matched_at",
+            "claim_expires_at",
+        )
+        read_only_fields = ("created_at", "matched_at", "claim_expires_at")
+
+    def validate(self, attrs):
+        show_session = attrs["show_session"]
+        max_party_size = min(
+            getattr(settings, "WAITLIST_MAX_PARTY_SIZE", 10),
+            show_session.planetarium_dome.capacity,
+        )
+        if not 1 <= attrs["party_size"] <= max_party_size:
+            raise ValidationError(
+                {"party_size": [f"Party size must be 1 to {max_party_size}"]}
+            )
+        if WaitlistEntry.objects.waiting().filter(
+            show_session=show_session, user=self.context["request"].user
+        ).exists():
+            raise ValidationError("You are already waiting for this session")
+        return attrs
+
+
+class ArchivedTicketSerializer(serializers.ModelSerializer):
+    astronomy_show = serializers.CharField(
+        source="show_session.astronomy_show.title",
+        read_only=True
+    )
+    show_time = serializers.DateTimeField(
+        source="show_session.show_time",
+        read_only=True
+    )
+
+    class Meta:
+        model = ArchivedTicket
+        fields = (
+            "id",
+            "row",
+            "seat",
+            "astronomy_show",
+            "show_time",
+        )
+
+
+class ArchivedReservationSerializer(serializers.ModelSerializer):
+    tickets = ArchivedTicketSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedReservation
+        fields = (
+            "id",
+            "tickets",
+            "created_at",
+        )
+
+
+class ReservationHistorySerializer(ArchivedReservationSerializer):
+    archived = serializers.BooleanField(read_only=True)
+
+    class Meta(ArchivedReservationSerializer.Meta):
+        fields = ArchivedReservationSerializer.Meta.fields + ("archived",)
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET"], default="GET")
+    path = serializers.CharField(max_length=2048)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        max_requests = self.context.get("max_requests")
+        if max_requests and len(value) > max_requests:
+            raise ValidationError(
+                f"At most {max_requests} requests are allowed per batch"
+            )
+        return value
+
+
+class CheckInSerializer(serializers.Serializer):
+    show_session = serializers.IntegerField(required=False)
+    scanner = serializers.CharField(
+        max_length=100, required=False, allow_blank=True
+    )
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=64), allow_empty=False
+    )
+
+    def validate_codes(self, value):
+        max_codes = self.context.get("max_codes")
+        if max_codes and len(value) > max_codes:
+            raise ValidationError(
+                f"At most {max_codes} codes are allowed per check-in"
+            )
+        return value
+
+
+class CheckInResultSerializer(serializers.Serializer):
+    code = serializers.CharField()
+    status = serializers.CharField()
+    ticket = serializers.IntegerField(required=False)
+    show_session = serializers.IntegerField(required=False)
+    row = serializers.IntegerField(required=False)
+    seat = serializers.IntegerField(required=False)
+    checked_in_at = serializers.DateTimeField(required=False)
+
+
+class ExportRangeSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs["start"] > attrs["end"]:
+            raise ValidationError({"end": ["End must not precede start"]})
+        return attrs
+
+
+class SalesSummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    tickets_sold = serializers.IntegerField(read_only=True)
+    capacity = serializers.IntegerField(read_only=True)
+    occupancy = serializers.SerializerMethodField()
+
+    def get_occupancy(self, obj):
+        if not obj["capacity"]:
+            return 0
+        return round(obj["tickets_sold"] / obj["capacity"], 4)
+
+    def to_representation(self, instance):
+        if "name" not in instance:
+            instance = {**instance, "name": instance.get("title")}
+        return super().to_representation(instance)
+
+
+class SalesPeriodSerializer(serializers.Serializer):
+    period = serializers.DateTimeField(read_only=True)
+    tickets_sold = serializers.IntegerField(read_only=True)
+    capacity = serializers.IntegerField(read_only=True)
+    seats_filled = serializers.IntegerField(read_only=True)
+    occupancy = serializers.SerializerMethodField()
+
+    def get_occupancy(self, obj):
+        if not obj["capacity"]:
+            return 0
+        return round(obj["seats_filled"] / obj["capacity"], 4)
@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from planetarium import analytics, waiting_room, whats_on
+from planetarium.autocomplete import SHOW, THEME, index
+from planetarium.conditional import seat_markers, touch
+from planetarium.holds import seats_held, seats_released
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+    WaitingRoom,
+)
+from planetarium.seat_events import RELEASED, TAKEN, publish_on_commit
+from planetarium.waitlist import schedule_matching
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, **kwargs):
+    touch(*seat_markers(instance.show_session_id))
+    if created:
+        analytics.schedule_recompute([instance.show_session_id])
+        analytics.schedule_hourly_sales(
+            [analytics.ticket_change(instance, 1)]
+        )
+    whats_on.schedule_refresh([instance.show_session_id])
+    if created:
+        publish_on_commit(
+            instance.show_session_id, TAKEN, [(instance.row, instance.seat)]
+        )
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    touch(*seat_markers(instance.show_session_id))
+    analytics.schedule_recompute([instance.show_session_id])
+    analytics.schedule_hourly_sales([analytics.ticket_change(instance, -1)])
+    publish_on_commit(
+        instance.show_session_id, RELEASED, [(instance.row, instance.seat)]
+    )
+    schedule_matching([instance.show_session_id])
+    whats_on.schedule_refresh([instance.show_session_id])
+
+
+@receiver(seats_held)
+def seats_were_held(sender, show_session_id, **kwargs):
+    whats_on.schedule_refresh([show_session_id])
+
+
+@receiver(seats_released)
+def held_seats_released(sender, show_session_id, **kwargs):
+    schedule_matching([show_session_id])
+    whats_on.schedule_refresh([show_session_id])
+
+
+@receiver(post_save, sender=PlanetariumDome)
+@receiver(post_delete, sender=PlanetariumDome)
+@receiver(post_save, sender=ShowTheme)
+@receiver(post_delete, sender=ShowTheme)
+@receiver(post_save, sender=AstronomyShow)
+@receiver(post_delete, sender=AstronomyShow)
+@receiver(post_save, sender=ShowSession)
+@receiver(post_delete, sender=ShowSession)
+def catalog_changed(sender, **kwargs):
+    touch(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=AstronomyShow.show_theme.through)
+def show_themes_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        touch(AstronomyShow._meta.model_name)
+
+
+@receiver(post_save, sender=ShowSession)
+def show_session_saved(sender, instance, **kwargs):
+    whats_on.schedule_refresh([instance.id])
+
+
+@receiver(post_delete, sender=ShowSession)
+def show_session_deleted(sender, instance, **kwargs):
+    transaction.on_commit(whats_on.invalidate)
+
+
+@receiver(post_save, sender=AstronomyShow)
+def astronomy_show_saved(sender, instance, **kwargs):
+    whats_on.schedule_refresh(
+        whats_on.upcoming_session_ids(astronomy_show=instance)
+    )
+
+
+@receiver(post_save, sender=PlanetariumDome)
+def planetarium_dome_saved(sender, instance, **kwargs):
+    whats_on.schedule_refresh(
+        whats_on.upcoming_session_ids(planetarium_dome=instance)
+    )
+
+
+@receiver(post_save, sender=AstronomyShow)
+def astronomy_show_indexed(sender, instance, **kwargs):
+    show_id, title = instance.id, instance.title
+    transaction.on_commit(lambda: index.update(SHOW, show_id, title))
+
+
+@receiver(post_delete, sender=AstronomyShow)
+def astronomy_show_unindexed(sender, instance, **kwargs):
+    show_id = instance.id
+    transaction.on_commit(lambda: index.update(SHOW, show_id))
+
+
+@receiver(post_save, sender=ShowTheme)
+def show_theme_indexed(sender, instance, **kwargs):
+    theme_id, name = instance.id, instance.name
+    transaction.on_commit(lambda: index.update(THEME, theme_id, name))
+
+
+@receiver(post_delete, sender=ShowTheme)
+def show_theme_unindexed(sender, instance, **kwargs):
+    theme_id = instance.id
+    transaction.on_commit(lambda: index.update(THEME, theme_id))
+
+
+@receiver(post_save, sender=WaitingRoom)
+@receiver(post_delete, sender=WaitingRoom)
+def waiting_room_changed(sender, **kwargs):
+    transaction.on_commit(waiting_room.invalidate)
+
+
+@receiver(post_save, sender=ShowSession)
+def show_session_created(sender, instance, created, **kwargs):
+    if created:
+        analytics.schedule_recompute([instance.id])
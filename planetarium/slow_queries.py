@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_origin = ContextVar("slow_query_origin", default=None)
+_explaining = ContextVar("slow_query_explaining", default=False)
+
+
+class SlowQueryLog:
+    """Keeps the last SLOW_QUERY_BUFFER_SIZE slow statements in memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=self.size())
+
+    @staticmethod
+    def size():
+        return getattr(settings, "SLOW_QUERY_BUFFER_SIZE", 100)
+
+    def add(self, record):
+        with self._lock:
+            if self._records.maxlen != self.size():
+                self._records = deque(self._records, maxlen=self.size())
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(reversed(self._records))
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+log = SlowQueryLog()
+
+
+def request_origin(request):
+    """View and action that handled a request, e.g.
+    ShowSessionViewSet.list"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name
+    action = (getattr(match.func, "actions", None) or {}).get(
+        request.method.lower(), request.method.lower()
+    )
+    return f"{view_class.__name__}.{action}"
+
+
+def explainable(sql):
+    return sql.lstrip().upper().startswith(("SELECT", "WITH"))
+
+
+def explain(connection, sql, params):
+    analyze = getattr(settings, "SLOW_QUERY_EXPLAIN_ANALYZE", False)
+    try:
+        prefix = connection.ops.explain_query_prefix(analyze=analyze)
+    except ValueError:
+        prefix = connection.ops.explain_query_prefix()
+    token = _explaining.set(True)
+    try:
+        # A failed EXPLAIN only rolls back its own savepoint, never the
+        # transaction of the request being diagnosed
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                return "\n".join(
+                    " ".join(str(column) for column in row)
+                    for row in cursor.fetchall()
+                )
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+    finally:
+        _explaining.reset(token)
+
+
+def describe_param(param):
+    """Only the type of a parameter unless SLOW_QUERY_LOG_PARAMS is on,
+    then its repr cut to SLOW_QUERY_PARAM_MAX_LENGTH characters"""
+    if not getattr(settings, "SLOW_QUERY_LOG_PARAMS", False):
+        return f"<{type(param).__name__}>"
+    text = repr(param)
+    limit = getattr(settings, "SLOW_QUERY_PARAM_MAX_LENGTH", 100)
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    """execute_wrapper that times each statement and records the ones
+    above SLOW_QUERY_THRESHOLD_MS, with their plan, for a sample of them"""
+    if _explaining.get():
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+    if threshold is None or duration_ms < threshold:
+        return result
+    if random.random() >= getattr(settings, "SLOW_QUERY_SAMPLE_RATE", 1.0):
+        return result
+
+    connection = context["connection"]
+    label, request = _origin.get() or (None, None)
+    view = label or (request_origin(request) if request else None)
+    log.add(
+        {
+            "recorded_at": timezone.now(),
+            "duration_ms": round(duration_ms, 3),
+            "view": view,
+            "method": request.method if request else None,
+            "path": request.path if request else None,
+            "database": connection.alias,
+            "sql": sql,
+            "params": (
+                [describe_param(param) for param in params or ()]
+                if not many
+                else []
+            ),
+            "plan": (
+                explain(connection, sql, params)
+                if not many and explainable(sql)
+                else None
+            ),
+        }
+    )
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s",
+        duration_ms,
+        view,
+        sql,
+    )
+    return result
+
+
+@contextmanager
+def capture(request=None, label=None):
+    """Records slow statements on every database alias inside the block;
+    the view is looked up from the request once it has been resolved"""
+    token = _origin.set((label, request))
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(record_slow_queries)
+                )
+            yield
+    finally:
+        _origin.reset(token)
+
+
+def capture_iterator(iterator, request=None, label=None):
+    """Captures while each chunk of a streamed body is produced, which
+    happens after the view has returned; nothing is held across yields"""
+    iterator = iter(iterator)
+    while True:
+        with capture(request, label):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from planetarium.admin import EstimatedCountPaginator
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+TICKET_CHANGELIST_URL = reverse("admin:planetarium_ticket_changelist")
+
+
+def postgres_estimate(reltuples):
+    """Connections whose planner estimate for any table is reltuples"""
+    estimated = mock.MagicMock(vendor="postgresql")
+    cursor = estimated.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (reltuples,)
+    return mock.patch(
+        "planetarium.admin.connections",
+        {"default": estimated},
+    )
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description=""
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=5
+            ),
+            show_time=timezone.now() + timedelta(days=1),
+        )
+        self.admin = User.objects.create_superuser(
+            "admin@test.com", "pass12345"
+        )
+        self.session = session
+        self.add_tickets(3)
+
+    def add_tickets(self, count):
+        reservation = Reservation.objects.create(
+            user=self.admin, created_at=timezone.now()
+        )
+        start = Ticket.objects.count()
+        Ticket.objects.bulk_create(
+            Ticket(
+                show_session=self.session,
+                reservation=reservation,
+                row=1 + (start + number) // 5,
+                seat=1 + (start + number) % 5,
+            )
+            for number in range(count)
+        )
+
+    def test_large_unfiltered_tables_use_the_estimate(self):
+        """Test the planner estimate replaces COUNT(*) past the threshold"""
+        with postgres_estimate(50000.0):
+            paginator = EstimatedCountPaginator(
+                Ticket.objects.order_by("id"), 10
+            )
+            self.assertEqual(paginator.count, 50000)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100000)
+    def test_small_tables_are_counted_exactly(self):
+        """Test estimates under the threshold fall back to COUNT(*)"""
+        with postgres_estimate(50000.0):
+            paginator = EstimatedCountPaginator(
+                Ticket.objects.order_by("id"), 10
+            )
+            self.assertEqual(paginator.count, 3)
+
+    def test_filtered_and_other_databases_are_counted_exactly(self):
+        """Test filtered querysets and non-PostgreSQL use COUNT(*)"""
+        with postgres_estimate(50000.0):
+            paginator = EstimatedCountPaginator(
+                Ticket.objects.filter(row=1).order_by("id"), 10
+            )
+            self.assertEqual(paginator.count, 3)
+        paginator = EstimatedCountPaginator(Ticket.objects.order_by("id"), 10)
+        self.assertEqual(paginator.count, 3)
+
+    def test_ticket_changelist_queries_do_not_grow(self):
+        """Test the changelist skips COUNT(*) and avoids N+1 queries"""
+        self.client.force_login(self.admin)
+        with postgres_estimate(50000.0):
+            with CaptureQueriesContext(connection) as few:
+                response = self.client.get(TICKET_CHANGELIST_URL)
+            self.assertEqual(response.status_code, 200)
+            self.add_tickets(12)
+            with CaptureQueriesContext(connection) as many:
+                response = self.client.get(TICKET_CHANGELIST_URL)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(few), len(many))
+        self.assertFalse(
+            any(
+                "COUNT(" in query["sql"]
+                and "planetarium_ticket" in query["sql"]
+                for query in many.captured_queries
+            )
+        )
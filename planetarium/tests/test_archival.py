@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from planetarium.archival import archive_past_sessions
+from planetarium.models import (
+    ArchivedReservation,
+    ArchivedTicket,
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+
+class ArchivalTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        now = timezone.now()
+        self.past = [
+            ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=now - timedelta(days=400 + days),
+            )
+            for days in range(3)
+        ]
+        self.upcoming = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time=now + timedelta(days=1),
+        )
+        self.old_reservation = self._reserve(self.past[0], self.past[1])
+        self.mixed_reservation = self._reserve(self.past[2], self.upcoming)
+
+    def _reserve(self, *sessions):
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=self.user
+        )
+        for seat, session in enumerate(sessions, start=1):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=session,
+                reservation=reservation,
+            )
+        return reservation
+
+    def test_past_sessions_are_moved_in_batches(self):
+        """Test past sessions and their tickets leave the hot tables"""
+        counts = archive_past_sessions(
+            horizon_days=365, batch_size=2, max_batches=1
+        )
+        self.assertEqual(counts, {"show_sessions": 2, "tickets": 2})
+
+        counts = archive_past_sessions(horizon_days=365, batch_size=2)
+        self.assertEqual(counts, {"show_sessions": 0, "tickets": 0})
+
+        self.assertEqual(
+            set(ShowSession.objects.all()), {self.past[2], self.upcoming}
+        )
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(ArchivedTicket.objects.count(), 2)
+        self.assertEqual(
+            list(Reservation.objects.all()), [self.mixed_reservation]
+        )
+        self.assertEqual(
+            list(ArchivedReservation.objects.values_list("id", flat=True)),
+            [self.old_reservation.id],
+        )
+
+    def test_reservations_are_archived_whole(self):
+        """Test a reservation waits until all its sessions are past"""
+        self.upcoming.show_time = timezone.now() - timedelta(days=366)
+        self.upcoming.save()
+
+        counts = archive_past_sessions(horizon_days=365, batch_size=1)
+        self.assertEqual(counts, {"show_sessions": 4, "tickets": 4})
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(
+            ArchivedTicket.objects.filter(
+                reservation=self.mixed_reservation.id
+            ).count(),
+            2,
+        )
+
+    def test_archived_history_is_readable(self):
+        """Test users can still list their archived reservations"""
+        archive_past_sessions(horizon_days=365)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(
+            reverse("planetarium:reservation-archived")
+        )
+        self.assertEqual(response.status_code, 200)
+        tickets = {
+            reservation["id"]: len(reservation["tickets"])
+            for reservation in response.data["results"]
+        }
+        self.assertEqual(tickets, {self.old_reservation.id: 2})
+
+    def test_history_lists_hot_and_archived_reservations(self):
+        """Test the history endpoint pages over both tables"""
+        archive_past_sessions(horizon_days=365)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(reverse("planetarium:reservation-history"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [
+                (reservation["id"], reservation["archived"])
+                for reservation in response.data["results"]
+            ],
+            [
+                (self.mixed_reservation.id, False),
+                (self.old_reservation.id, True),
+            ],
+        )
+        self.assertEqual(
+            response.data["results"][0]["tickets"][0]["astronomy_show"],
+            "Mars",
+        )
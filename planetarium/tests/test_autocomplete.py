@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.autocomplete import index
+from planetarium.models import AstronomyShow, ChangeMarker, ShowTheme
+from user.models import User
+
+AUTOCOMPLETE_URL = reverse("planetarium:autocomplete")
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.mars = AstronomyShow.objects.create(title="Mars", description="")
+        self.journey = AstronomyShow.objects.create(
+            title="Journey to Mars", description=""
+        )
+        AstronomyShow.objects.create(title="Moon", description="")
+        self.theme = ShowTheme.objects.create(name="Marine Stars")
+        index.build()
+
+    def suggest(self, query, **params):
+        return self.client.get(AUTOCOMPLETE_URL, {"q": query, **params}).data
+
+    def test_prefix_matches_any_word_without_queries(self):
+        """Test suggestions match word prefixes and skip the database"""
+        with CaptureQueriesContext(connection) as queries:
+            suggestions = self.suggest("  MAR")
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(
+            [(item["type"], item["label"]) for item in suggestions],
+            [
+                ("theme", "Marine Stars"),
+                ("show", "Mars"),
+                ("show", "Journey to Mars"),
+            ],
+        )
+        self.assertEqual(len(self.suggest("mar", limit=1)), 1)
+        self.assertEqual(self.suggest(""), [])
+
+    def test_local_changes_update_index_incrementally(self):
+        """Test saved and deleted shows are reflected without a rebuild"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mars.title = "Red Planet"
+            self.mars.save()
+            self.mars.title = "Unsaved"
+            self.theme.delete()
+
+        self.assertEqual(
+            [item["label"] for item in self.suggest("mar")],
+            ["Journey to Mars"],
+        )
+        self.assertEqual(
+            [item["id"] for item in self.suggest("red")], [self.mars.id]
+        )
+
+    @override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0)
+    def test_changes_from_other_processes_trigger_rebuild(self):
+        """Test a moved change marker rebuilds the index"""
+        AstronomyShow.objects.filter(id=self.mars.id).update(title="Venus")
+        ChangeMarker.objects.create(key="astronomyshow", version=99)
+
+        self.assertEqual(
+            [item["label"] for item in self.suggest("ven")], ["Venus"]
+        )
+
+    def test_signed_in_suggestions_skip_the_database(self):
+        """Test tokens are trusted without loading the user row"""
+        user = User.objects.create_user("user@test.com", "pass12345")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(AUTOCOMPLETE_URL, {"q": "moon"})
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.wsgi_request.user.id, user.id)
+        self.assertEqual([item["label"] for item in response.data], ["Moon"])
+
+    def test_keystrokes_do_not_spend_the_daily_quota(self):
+        """Test autocomplete has its own per-minute throttle and leaves
+        the anonymous daily quota of the other endpoints alone"""
+        rates = {"anon": "1/day", "autocomplete": "3/minute"}
+        with mock.patch.object(
+            AnonRateThrottle, "THROTTLE_RATES", rates
+        ), mock.patch.object(ScopedRateThrottle, "THROTTLE_RATES", rates):
+            statuses = [
+                self.client.get(AUTOCOMPLETE_URL, {"q": "m"}).status_code
+                for _ in range(4)
+            ]
+            self.assertEqual(
+                self.client.get(
+                    reverse("planetarium:astronomyshow-list")
+                ).status_code,
+                status.HTTP_200_OK,
+            )
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(set(statuses[:3]), {status.HTTP_200_OK})
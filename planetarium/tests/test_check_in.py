@@ -0,0 +1,155 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+    TicketCheckIn,
+)
+from planetarium.ticket_codes import (
+    InvalidTicketCode,
+    sign_ticket,
+    ticket_code,
+    verify_code,
+)
+from user.models import User
+
+CHECK_IN_URL = reverse("planetarium:check-in")
+
+
+class TicketCodeTests(TestCase):
+    def test_code_round_trips_without_database(self):
+        """Test a signed code verifies back to its ticket and seat"""
+        code = sign_ticket(12, 3, 4, 5)
+        with CaptureQueriesContext(connection) as queries:
+            ticket = verify_code(code)
+
+        self.assertEqual(
+            ticket, {"ticket": 12, "show_session": 3, "row": 4, "seat": 5}
+        )
+        self.assertEqual(len(queries), 0)
+        self.assertLessEqual(len(code), 48)
+
+    def test_large_ids_and_seats_round_trip(self):
+        """Test ids and seat numbers past 16 and 32 bits are packed"""
+        ticket = {
+            "ticket": 2**40,
+            "show_session": 2**33,
+            "row": 70000,
+            "seat": 2**31 - 1,
+        }
+        self.assertEqual(verify_code(sign_ticket(*ticket.values())), ticket)
+
+    @override_settings(TICKET_CODE_SECRET="scanner secret")
+    def test_codes_are_signed_with_the_ticket_code_secret(self):
+        """Test codes signed under another secret do not verify"""
+        code = sign_ticket(12, 3, 4, 5)
+        with override_settings(TICKET_CODE_SECRET="other secret"):
+            with self.assertRaises(InvalidTicketCode):
+                verify_code(code)
+        self.assertEqual(verify_code(code)["ticket"], 12)
+
+    def test_tampered_code_is_rejected(self):
+        """Test changing any byte of a code breaks its signature"""
+        code = sign_ticket(12, 3, 4, 5)
+        tampered = ("A" if code[0] != "A" else "B") + code[1:]
+        for bad_code in (tampered, code[:-2], "not a code"):
+            with self.assertRaises(InvalidTicketCode):
+                verify_code(bad_code)
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                "staff@test.com", "pass12345", is_staff=True
+            )
+        )
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=5, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(),
+            user=User.objects.create_user("user@test.com", "pass12345"),
+        )
+        self.tickets = [
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=self.session,
+                reservation=reservation,
+            )
+            for seat in range(1, 6)
+        ]
+
+    def post(self, codes):
+        return self.client.post(
+            CHECK_IN_URL,
+            {"show_session": self.session.id, "codes": codes},
+            format="json",
+        )
+
+    def test_batch_is_recorded_with_fixed_queries(self):
+        """Test a whole batch is admitted without per-ticket queries"""
+        codes = [ticket_code(ticket) for ticket in self.tickets]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(codes)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["admitted"] * 5,
+        )
+        self.assertEqual(TicketCheckIn.objects.count(), 5)
+        self.assertLessEqual(len(queries), 5)
+
+    def test_reused_and_foreign_codes_are_flagged(self):
+        """Test duplicates, forgeries and other sessions are refused"""
+        first, second = self.tickets[:2]
+        self.post([ticket_code(first)])
+
+        response = self.post(
+            [
+                ticket_code(first),
+                ticket_code(second),
+                ticket_code(second),
+                sign_ticket(999, self.session.id, 1, 1),
+                sign_ticket(second.id, self.session.id + 1, 1, 2),
+                "forged",
+            ]
+        )
+
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [
+                "duplicate",
+                "admitted",
+                "duplicate",
+                "unknown",
+                "wrong_session",
+                "invalid",
+            ],
+        )
+
+    def test_check_in_requires_staff(self):
+        """Test customers cannot admit tickets"""
+        self.client.force_authenticate(
+            User.objects.get(email="user@test.com")
+        )
+        response = self.post([ticket_code(self.tickets[0])])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,130 @@
+import gzip
+from unittest import mock
+
+import brotli
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import conditional, db_router
+from planetarium.models import (
+    AstronomyShow,
+    ChangeMarker,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            show = AstronomyShow.objects.create(
+                title="Mars", description="Red planet " * 50
+            )
+            dome = PlanetariumDome.objects.create(
+                name="Main", rows=2, seats_in_row=5
+            )
+            self.session = ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time="2024-03-30T10:00:00Z",
+            )
+        self.url = reverse(
+            "planetarium:showsession-detail", args=[self.session.id]
+        )
+
+    def test_unchanged_resource_returns_not_modified(self):
+        """Test a matching If-None-Match is answered from markers alone"""
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(len(queries), 1)
+        self.assertIn("planetarium_changemarker", queries[0]["sql"])
+
+    def test_seat_change_invalidates_etag(self):
+        """Test selling a seat changes the session's validator"""
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=1,
+                seat=1,
+                show_session=self.session,
+                reservation=Reservation.objects.create(
+                    created_at=timezone.now(), user=self.user
+                ),
+            )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_markers_are_bumped_once_per_transaction(self):
+        """Test a multi-ticket booking updates each marker row once"""
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=self.user
+        )
+        versions = dict(ChangeMarker.objects.values_list("key", "version"))
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                for seat in range(1, 4):
+                    Ticket.objects.create(
+                        row=1,
+                        seat=seat,
+                        show_session=self.session,
+                        reservation=reservation,
+                    )
+
+        marker_updates = [
+            query for query in queries
+            if query["sql"].startswith('UPDATE "planetarium_changemarker"')
+        ]
+        self.assertEqual(len(marker_updates), 2)
+        for key in ("seats", f"seats:{self.session.id}"):
+            self.assertEqual(
+                ChangeMarker.objects.get(key=key).version,
+                versions.get(key, 0) + 1,
+            )
+
+    def test_markers_are_read_from_the_body_database(self):
+        """Test markers are read after the replica for the body is chosen"""
+        aliases = []
+
+        def read_markers(keys):
+            aliases.append(db_router._read_alias.get())
+            return {}
+
+        with mock.patch.object(
+            db_router, "choose_replica", return_value="default"
+        ), mock.patch.object(
+            conditional, "read_markers", side_effect=read_markers
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(aliases, ["default"])
+
+    def test_responses_are_compressed_as_negotiated(self):
+        """Test brotli is preferred and gzip is the fallback"""
+        plain = self.client.get(self.url).content
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain)
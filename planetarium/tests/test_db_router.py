@@ -0,0 +1,173 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from planetarium import db_router
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+)
+from user.models import User
+
+REPLICAS = getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def first_alias(aliases):
+    return aliases[0]
+
+
+@skipUnless(REPLICAS, "Set POSTGRES_REPLICA_HOSTS to test replica routing")
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {"default", *REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        db_router._lag_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def _query_counts(self, url):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections[REPLICAS[0]]) as replica:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    @mock.patch("planetarium.db_router.random.choice", first_alias)
+    def test_safe_reads_go_to_replica(self):
+        """Test list and retrieve are served from a replica"""
+        primary, replica = self._query_counts(
+            reverse("planetarium:showsession-list")
+        )
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @mock.patch("planetarium.db_router.random.choice", first_alias)
+    def test_reads_after_write_stay_on_primary(self):
+        """Test a reservation pins the user to the primary"""
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse("planetarium:reservation-list"),
+            {
+                "created_at": "2024-03-30T12:00:00Z",
+                "tickets": [
+                    {"row": 1, "seat": 1, "show_session": self.session.id}
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        primary, replica = self._query_counts(
+            reverse("planetarium:showsession-detail", args=[self.session.id])
+        )
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    @mock.patch("planetarium.db_router._measure_lag", return_value=60)
+    def test_lagging_replica_falls_back_to_primary(self, _):
+        """Test reads go to the primary while replicas lag"""
+        primary, replica = self._query_counts(
+            reverse("planetarium:showsession-list")
+        )
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica_1", "replica_2"],
+    REPLICA_MAX_LAG_SECONDS=5,
+    REPLICA_LAG_CHECK_INTERVAL=60,
+)
+class ReplicaChoiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        db_router._lag_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description=""
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=2, seats_in_row=5
+            ),
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def tearDown(self):
+        db_router._lag_cache.clear()
+
+    def test_lagging_and_unreachable_replicas_are_skipped(self):
+        """Test only replicas within the lag limit are chosen"""
+        lags = {"replica_1": 60, "replica_2": 1}
+        with mock.patch.object(
+            db_router, "_measure_lag", side_effect=lags.get
+        ) as measure:
+            self.assertEqual(db_router.choose_replica(), "replica_2")
+            self.assertEqual(db_router.choose_replica(), "replica_2")
+        self.assertEqual(measure.call_count, 2)
+
+        db_router._lag_cache.clear()
+        with mock.patch.object(
+            db_router, "_measure_lag", side_effect=OSError("down")
+        ):
+            self.assertEqual(db_router.replica_lag("replica_1"), float("inf"))
+            self.assertIsNone(db_router.choose_replica())
+
+    def test_reads_use_the_chosen_alias(self):
+        """Test the router reads from the request's alias, writes primary"""
+        router = db_router.ReplicaRouter()
+        with db_router.read_from("replica_1"):
+            self.assertEqual(router.db_for_read(ShowSession), "replica_1")
+            self.assertEqual(router.db_for_write(ShowSession), "default")
+        self.assertEqual(router.db_for_read(ShowSession), "default")
+
+    def _read_sessions(self):
+        response = self.client.get(reverse("planetarium:showsession-list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        """Test seat holds and waitlist entries pin later reads"""
+        self.client.force_authenticate(self.user)
+        writes = (
+            (
+                reverse("planetarium:seathold-list"),
+                {
+                    "show_session": self.session.id,
+                    "seats": [{"row": 1, "seat": 1}],
+                },
+            ),
+            (
+                reverse("planetarium:waitlistentry-list"),
+                {"show_session": self.session.id, "party_size": 1},
+            ),
+        )
+        for url, payload in writes:
+            cache.clear()
+            with mock.patch.object(
+                db_router, "choose_replica", return_value=None
+            ) as choose:
+                self._read_sessions()
+                self.assertEqual(choose.call_count, 1)
+
+                response = self.client.post(url, payload, format="json")
+                self.assertEqual(response.status_code, 201, response.data)
+                self._read_sessions()
+                self.assertEqual(choose.call_count, 1)
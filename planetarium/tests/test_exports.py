@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.archival import archive_past_sessions
+from planetarium.models import (
+    ArchivedTicket,
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+
+class TicketExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                "staff@test.com", "pass12345", is_staff=True
+            )
+        )
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.session = session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description=""
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=2, seats_in_row=5
+            ),
+            show_time="2024-03-30T10:00:00Z",
+        )
+        for day, seat in ((1, 1), (2, 2), (5, 3)):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=session,
+                reservation=Reservation.objects.create(
+                    created_at=datetime(
+                        2024, 3, day, 12, tzinfo=dt_timezone.utc
+                    ),
+                    user=self.user,
+                ),
+            )
+
+    def export(self, export_format, **params):
+        return self.client.get(
+            reverse("planetarium:ticket-export", args=[export_format]),
+            params,
+        )
+
+    def test_csv_export_streams_tickets_in_range(self):
+        """Test the CSV export covers the inclusive date range"""
+        response = self.export("csv", start="2024-03-01", end="2024-03-02")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(
+            csv.DictReader(
+                io.StringIO(b"".join(response.streaming_content).decode())
+            )
+        )
+        self.assertEqual([row["seat"] for row in rows], ["1", "2"])
+        self.assertEqual(rows[0]["user_email"], "user@test.com")
+        self.assertEqual(rows[0]["astronomy_show"], "Mars")
+        self.assertEqual(rows[0]["planetarium_dome"], "Main")
+
+    def test_jsonl_export_writes_one_object_per_line(self):
+        """Test the JSON lines export emits one ticket per line"""
+        response = self.export("jsonl", start="2024-03-01", end="2024-03-31")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(
+            [json.loads(line)["seat"] for line in lines], [1, 2, 3]
+        )
+
+    def test_export_includes_archived_tickets(self):
+        """Test archived tickets are exported in order with hot ones"""
+        archive_past_sessions()
+        self.assertEqual(ArchivedTicket.objects.count(), 3)
+        Ticket.objects.create(
+            row=1,
+            seat=4,
+            show_session=ShowSession.objects.create(
+                astronomy_show=self.session.astronomy_show,
+                planetarium_dome=self.session.planetarium_dome,
+                show_time=timezone.now() + timedelta(days=1),
+            ),
+            reservation=Reservation.objects.create(
+                created_at=datetime(2024, 3, 3, 12, tzinfo=dt_timezone.utc),
+                user=self.user,
+            ),
+        )
+
+        response = self.export("jsonl", start="2024-03-01", end="2024-03-31")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content)
+            .decode()
+            .splitlines()
+        ]
+        self.assertEqual([row["seat"] for row in rows], [1, 2, 4, 3])
+        self.assertEqual(rows[0]["user_email"], "user@test.com")
+        self.assertEqual(rows[0]["astronomy_show"], "Mars")
+
+    def test_export_is_admin_only_and_validated(self):
+        """Test customers and bad ranges are refused"""
+        self.assertEqual(
+            self.export("csv", start="2024-03-05", end="2024-03-01")
+            .status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.export("xml", start="2024-03-01", end="2024-03-05")
+            .status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.client.force_authenticate(self.user)
+        self.assertEqual(
+            self.export("csv", start="2024-03-01", end="2024-03-05")
+            .status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_command_writes_export(self):
+        """Test the management command streams the same rows"""
+        out = io.StringIO()
+        call_command(
+            "export_tickets", "2024-03-02", "2024-03-05", "--format=jsonl",
+            stdout=out,
+        )
+        self.assertEqual(
+            [json.loads(line)["seat"] for line in out.getvalue().splitlines()],
+            [2, 3],
+        )
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    AstronomyShow,
+    IdempotencyKey,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+)
+from user.models import User
+
+RESERVATIONS_URL = reverse("planetarium:reservation-list")
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.client.force_authenticate(self.user)
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def _reserve(self, seat, key):
+        return self.client.post(
+            RESERVATIONS_URL,
+            {
+                "created_at": "2024-03-30T12:00:00Z",
+                "tickets": [
+                    {"row": 1, "seat": seat, "show_session": self.session.id}
+                ],
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_outcome(self):
+        """Test a retried create is replayed without touching tickets"""
+        first = self._reserve(1, "retry-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self._reserve(1, "retry-1")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertFalse(
+            any("planetarium_ticket" in query["sql"] for query in queries)
+        )
+
+    def test_key_reused_with_different_request(self):
+        """Test a key reused for another payload is rejected"""
+        self._reserve(1, "retry-2")
+        response = self._reserve(2, "retry-2")
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_retry_while_first_request_runs(self):
+        """Test a retry of an unfinished request gets 409 and no writes"""
+        self._reserve(1, "retry-3")
+        IdempotencyKey.objects.filter(key="retry-3").update(
+            status_code=None, response_body=None
+        )
+
+        response = self._reserve(1, "retry-3")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_retry_reclaims_abandoned_request(self):
+        """Test a retry takes over a request whose lease has run out"""
+        self._reserve(1, "retry-4")
+        Reservation.objects.all().delete()
+        IdempotencyKey.objects.filter(key="retry-4").update(
+            status_code=None,
+            response_body=None,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+
+        response = self._reserve(1, "retry-4")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.count(), 1)
+        record = IdempotencyKey.objects.get(key="retry-4")
+        self.assertEqual(record.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(record.locked_until, timezone.now())
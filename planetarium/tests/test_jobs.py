@@ -0,0 +1,203 @@
+import signal
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import jobs
+from planetarium.models import Job
+from user.models import User
+
+calls = []
+
+
+@jobs.task("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@jobs.task("tests.fail")
+def fail():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_once_in_order(self):
+        """Test due jobs are run in run_at order and marked done"""
+        jobs.enqueue("tests.record", {"value": 2})
+        jobs.enqueue(
+            "tests.record",
+            {"value": 1},
+            run_at=timezone.now() - timedelta(seconds=1),
+        )
+        jobs.enqueue(
+            "tests.record",
+            {"value": 3},
+            run_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 2
+        )
+
+    def test_unique_jobs_are_not_queued_twice(self):
+        """Test identical queued jobs collapse into one"""
+        first = jobs.enqueue("tests.record", {"value": 1}, unique=True)
+        second = jobs.enqueue("tests.record", {"value": 1}, unique=True)
+        self.assertEqual(first, second)
+        self.assertEqual(Job.objects.count(), 1)
+
+        jobs.claim_jobs("worker")
+        third = jobs.enqueue("tests.record", {"value": 1}, unique=True)
+        self.assertNotEqual(third, first)
+        self.assertEqual(third.status, Job.QUEUED)
+
+    def test_retry_of_a_unique_job_yields_to_a_queued_duplicate(self):
+        """Test a failing unique job does not requeue over a duplicate"""
+        jobs.enqueue("tests.fail", unique=True)
+        running = jobs.claim_jobs("worker")[0]
+        queued = jobs.enqueue("tests.fail", unique=True)
+
+        jobs.run_job(running)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.FAILED)
+        self.assertEqual(
+            list(Job.objects.filter(status=Job.QUEUED)), [queued]
+        )
+
+    def test_results_are_dropped_once_the_lock_is_lost(self):
+        """Test a run that outlived its lock leaves the requeued job be"""
+        job = jobs.enqueue("tests.record", {"value": 1})
+        claimed = jobs.claim_jobs("slow-worker")[0]
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        jobs.requeue_stale_jobs()
+        jobs.claim_jobs("other-worker")
+
+        jobs.run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(calls, [1])
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_by, "other-worker")
+        self.assertEqual(job.attempts, 0)
+
+    def test_failures_back_off_then_give_up(self):
+        """Test failing jobs are retried later and finally marked failed"""
+        job = jobs.enqueue("tests.fail", max_attempts=2)
+
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_running_jobs_are_requeued(self):
+        """Test jobs of a dead worker return to the queue"""
+        job = jobs.enqueue("tests.record", {"value": 1})
+        jobs.claim_jobs("dead-worker")
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        self.assertEqual(jobs.run_pending(), 1)
+
+    def test_metrics_are_admin_only(self):
+        """Test job metrics report queue depth per status and task"""
+        jobs.enqueue("tests.record", {"value": 1})
+        client = APIClient()
+        url = reverse("planetarium:job-metrics")
+        client.force_authenticate(
+            User.objects.create_user("user@test.com", "pass12345")
+        )
+        self.assertEqual(
+            client.get(url).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        client.force_authenticate(
+            User.objects.create_user(
+                "staff@test.com", "pass12345", is_staff=True
+            )
+        )
+        metrics = client.get(url).data
+        self.assertEqual(metrics["statuses"]["queued"], 1)
+        self.assertEqual(metrics["tasks"]["tests.record"]["queued"], 1)
+
+
+class JobWorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_pool_drains_the_queue(self):
+        """Test a pool of worker threads runs every queued job"""
+        for value in range(10):
+            jobs.enqueue("tests.record", {"value": value})
+        stopped = threading.Event()
+
+        with mock.patch.object(
+            jobs, "requeue_stale_jobs", return_value=0
+        ):
+            pool = threading.Thread(
+                target=jobs.run_workers,
+                args=(3,),
+                kwargs={"poll_interval": 0.05, "stopped": stopped},
+            )
+            pool.start()
+            deadline = timezone.now() + timedelta(seconds=10)
+            while (
+                Job.objects.exclude(status=Job.SUCCEEDED).exists()
+                and timezone.now() < deadline
+            ):
+                stopped.wait(0.05)
+            stopped.set()
+            pool.join()
+
+        self.assertEqual(sorted(calls), list(range(10)))
+
+
+class JobWorkerCommandTests(TestCase):
+    def test_parent_forwards_termination_to_its_processes(self):
+        """Test SIGTERM to the parent stops and joins every child"""
+        command = "planetarium.management.commands.run_job_workers"
+        handlers = {}
+        processes = [mock.Mock(), mock.Mock()]
+        for process in processes:
+            process.is_alive.return_value = True
+        processes[0].join.side_effect = (
+            lambda: handlers[signal.SIGTERM](signal.SIGTERM, None)
+        )
+
+        with mock.patch(f"{command}.connections"), mock.patch(
+            f"{command}.multiprocessing.get_context"
+        ) as get_context, mock.patch(
+            f"{command}.signal.signal",
+            side_effect=lambda signum, handler: handlers.update(
+                {signum: handler}
+            ),
+        ):
+            get_context.return_value.Process.side_effect = processes
+            call_command("run_job_workers", "--processes=2", stdout=StringIO())
+
+        for process in processes:
+            process.start.assert_called_once_with()
+            process.terminate.assert_called_once_with()
+            process.join.assert_called_once_with()
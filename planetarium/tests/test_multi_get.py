@@ -0,0 +1,129 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+)
+from user.models import User
+
+BATCH_URL = reverse("planetarium:batch")
+
+
+class MultiGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.shows = [
+            AstronomyShow.objects.create(title=f"Show {index}", description="")
+            for index in range(3)
+        ]
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.sessions = [
+            ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=self.dome,
+                show_time="2024-03-30T10:00:00Z",
+            )
+            for show in self.shows
+        ]
+
+    def test_ids_return_requested_objects_in_one_query(self):
+        """Test ?ids= loads only the requested sessions with one query"""
+        ids = f"{self.sessions[0].id},{self.sessions[2].id}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("planetarium:showsession-list"), {"ids": ids}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(session["id"] for session in response.data),
+            [self.sessions[0].id, self.sessions[2].id],
+        )
+        self.assertEqual(
+            len([
+                query for query in queries
+                if "planetarium_changemarker" not in query["sql"]
+            ]),
+            1,
+        )
+
+    def test_invalid_ids_are_rejected(self):
+        """Test malformed ids give a 400 instead of a server error"""
+        response = self.client.get(
+            reverse("planetarium:astronomyshow-list"), {"ids": "1,a"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_runs_sub_requests_as_calling_user(self):
+        """Test one batch call returns every sub-response"""
+        user = User.objects.create_user("user@test.com", "pass12345")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+        show_url = reverse(
+            "planetarium:astronomyshow-detail", args=[self.shows[1].id]
+        )
+        response = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {"path": show_url},
+                    {"path": reverse("planetarium:reservation-list")},
+                    {"path": "/admin/"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        show, reservations, outside = response.data["responses"]
+        self.assertEqual(show["status"], 200)
+        self.assertEqual(show["body"]["title"], "Show 1")
+        self.assertEqual(reservations["status"], 200)
+        self.assertEqual(reservations["body"]["count"], 0)
+        self.assertEqual(outside["status"], 400)
+
+    @override_settings(ALLOWED_HOSTS=["api.example.com"])
+    def test_batch_sub_requests_keep_host_and_query(self):
+        """Test sub-requests keep the caller's host, token and query"""
+        user = User.objects.create_user("user@test.com", "pass12345")
+        Reservation.objects.bulk_create(
+            Reservation(user=user, created_at=timezone.now())
+            for _ in range(12)
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+        response = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [
+                    {
+                        "path": reverse("planetarium:reservation-list")
+                        + "?page=2"
+                    }
+                ]
+            },
+            format="json",
+            HTTP_HOST="api.example.com",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.data["responses"][0]
+        self.assertEqual(page["status"], 200)
+        self.assertEqual(page["body"]["count"], 12)
+        self.assertEqual(len(page["body"]["results"]), 2)
+        self.assertTrue(
+            page["body"]["previous"].startswith("http://api.example.com/")
+        )
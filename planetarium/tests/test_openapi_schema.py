@@ -0,0 +1,88 @@
+import json
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from planetarium import schema
+
+SCHEMA_URL = reverse("schema")
+
+
+class CachedSchemaTests(TestCase):
+    def setUp(self):
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_DIR=schema_dir.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema._loaded.clear()
+        self.addCleanup(schema._loaded.clear)
+
+        generator_patch = mock.patch.object(
+            schema.spectacular_settings, "DEFAULT_GENERATOR_CLASS"
+        )
+        self.generator_class = generator_patch.start()
+        self.addCleanup(generator_patch.stop)
+        self.generator_class.return_value.get_schema.return_value = {
+            "openapi": "3.0.3",
+            "paths": {},
+        }
+
+    def test_schema_is_generated_once_and_served_from_memory(self):
+        """Test schema requests never run the generator again"""
+        yaml_response = self.client.get(SCHEMA_URL)
+        json_response = self.client.get(SCHEMA_URL, {"format": "json"})
+        self.client.get(SCHEMA_URL)
+
+        self.assertEqual(self.generator_class.call_count, 1)
+        self.assertEqual(yaml_response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"openapi: 3.0.3", yaml_response.content)
+        self.assertEqual(
+            json.loads(json_response.content),
+            {"openapi": "3.0.3", "paths": {}},
+        )
+        self.assertIn("max-age", yaml_response["Cache-Control"])
+
+    def test_matching_etag_returns_not_modified(self):
+        """Test clients revalidating the schema get an empty 304"""
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_build_replaces_artifacts_of_older_code(self):
+        """Test rebuilding removes schemas of previous fingerprints"""
+        stale = schema.artifact_path("yaml").with_name("openapi-old.yaml")
+        stale.parent.mkdir(parents=True, exist_ok=True)
+        stale.write_text("stale")
+
+        paths = schema.build_schema()
+
+        self.assertFalse(stale.exists())
+        self.assertTrue(all(path.exists() for path in paths))
+        self.assertEqual(schema.build_schema(), paths)
+        self.assertEqual(self.generator_class.call_count, 1)
+
+    def test_builders_write_separate_temporary_files(self):
+        """Test each build renames its own temporary file into place"""
+        replace = schema.os.replace
+        sources = []
+
+        def record(source, target):
+            sources.append(source)
+            replace(source, target)
+
+        with mock.patch.object(schema.os, "replace", side_effect=record):
+            paths = schema.build_schema(force=True)
+            schema.build_schema(force=True)
+
+        self.assertEqual(len(set(sources)), 4)
+        directory = paths[0].parent
+        self.assertEqual(list(directory.glob("*.tmp")), [])
+        self.assertEqual(sorted(directory.iterdir()), sorted(paths))
@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    ArchivedReservation,
+    ArchivedShowSession,
+    ArchivedTicket,
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    SeatHold,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from user.models import User
+
+# Cumulative number of generated rows of every kind at each measurement
+DATA_SIZES = (1, 5, 20)
+
+# (url name, detail object attribute, max queries, max milliseconds)
+ENDPOINT_BUDGETS = (
+    ("planetarium:planetariumdome-list", None, 2, 300),
+    ("planetarium:showtheme-list", None, 2, 300),
+    ("planetarium:astronomyshow-list", None, 3, 300),
+    ("planetarium:astronomyshow-detail", "show", 3, 300),
+    ("planetarium:showsession-list", None, 2, 300),
+    ("planetarium:showsession-detail", "session", 5, 300),
+    ("planetarium:reservation-list", None, 3, 300),
+    ("planetarium:reservation-archived", None, 5, 300),
+    ("planetarium:reservation-history", None, 10, 300),
+    ("planetarium:seathold-list", None, 1, 300),
+)
+
+
+class QueryBudgetTests(TestCase):
+    """Runs every budgeted endpoint against growing data and fails when
+    it exceeds its query or latency budget, or when its query count
+    grows with the number of rows returned"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.client.force_authenticate(self.user)
+        self.theme = ShowTheme.objects.create(name="Planets")
+        self.show = AstronomyShow.objects.create(title="Mars", description="")
+        self.show.show_theme.add(self.theme)
+        self.session = ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=20, seats_in_row=10
+            ),
+            show_time=timezone.now() + timedelta(days=1),
+        )
+        self.created = 0
+
+    def grow(self, size):
+        now = timezone.now()
+        while self.created < size:
+            index = self.created
+            theme = ShowTheme.objects.create(name=f"Theme {index}")
+            show = AstronomyShow.objects.create(
+                title=f"Show {index}", description="Description"
+            )
+            show.show_theme.add(theme, self.theme)
+            self.show.show_theme.add(theme)
+            session = ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=PlanetariumDome.objects.create(
+                    name=f"Dome {index}", rows=5, seats_in_row=5
+                ),
+                show_time=now + timedelta(days=1),
+            )
+            reservation = Reservation.objects.create(
+                created_at=now, user=self.user
+            )
+            Ticket.objects.create(
+                row=index // 10 + 1,
+                seat=index % 10 + 1,
+                show_session=self.session,
+                reservation=reservation,
+            )
+            Ticket.objects.create(
+                row=5, seat=5, show_session=session, reservation=reservation
+            )
+            SeatHold.objects.create(
+                row=2,
+                seat=2,
+                show_session=session,
+                user=self.user,
+                expires_at=now + timedelta(hours=1),
+            )
+            archived_session = ArchivedShowSession.objects.create(
+                id=index + 1,
+                astronomy_show=show,
+                planetarium_dome=session.planetarium_dome,
+                show_time=now - timedelta(days=400),
+            )
+            ArchivedTicket.objects.create(
+                id=index + 1,
+                row=1,
+                seat=1,
+                show_session=archived_session,
+                reservation=ArchivedReservation.objects.create(
+                    id=index + 1, created_at=now, user=self.user
+                ),
+            )
+            self.created += 1
+
+    def measure(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), elapsed
+
+    def test_endpoints_stay_within_budget(self):
+        """Test query counts are bounded and independent of data size"""
+        counts = {url_name: [] for url_name, *_ in ENDPOINT_BUDGETS}
+        for size in DATA_SIZES:
+            self.grow(size)
+            for url_name, detail, max_queries, max_ms in ENDPOINT_BUDGETS:
+                args = [getattr(self, detail).id] if detail else None
+                queries, elapsed = self.measure(reverse(url_name, args=args))
+                counts[url_name].append(queries)
+                with self.subTest(endpoint=url_name, size=size):
+                    self.assertLessEqual(queries, max_queries)
+                    self.assertLessEqual(elapsed, max_ms)
+
+        for url_name, sizes in counts.items():
+            with self.subTest(endpoint=url_name):
+                self.assertEqual(
+                    len(set(sizes)),
+                    1,
+                    f"query count grows with data size: {sizes}",
+                )
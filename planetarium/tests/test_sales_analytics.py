@@ -0,0 +1,173 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.analytics import apply_hourly_sales, refresh_sales_rollups
+from planetarium.archival import archive_past_sessions
+from planetarium.jobs import run_pending
+from planetarium.models import (
+    AstronomyShow,
+    HourlySales,
+    Job,
+    PlanetariumDome,
+    Reservation,
+    SessionSales,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from user.models import User
+
+
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            "admin@test.com", "pass12345"
+        )
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.theme = ShowTheme.objects.create(name="Planets")
+        self.show = AstronomyShow.objects.create(title="Mars", description="")
+        self.show.show_theme.add(self.theme)
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def _sell(self, *seats, created_at="2024-03-20T12:30:00Z", **fields):
+        reservation = Reservation.objects.create(
+            created_at=created_at, user=self.user
+        )
+        return [
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=self.session,
+                reservation=reservation,
+                **fields,
+            )
+            for seat in seats
+        ]
+
+    def _sold(self):
+        return (
+            SessionSales.objects.get(
+                show_session_id=self.session.id
+            ).tickets_sold,
+            HourlySales.objects.get().tickets_sold,
+        )
+
+    def test_refresh_is_incremental(self):
+        """Test only tickets past the watermark are folded in"""
+        self._sell(1, 2)
+        self.assertEqual(
+            refresh_sales_rollups(), {"show_sessions": 1, "tickets": 2}
+        )
+        self._sell(3)
+        self.assertEqual(
+            refresh_sales_rollups(), {"show_sessions": 0, "tickets": 1}
+        )
+
+        sales = SessionSales.objects.get(show_session_id=self.session.id)
+        self.assertEqual(sales.tickets_sold, 3)
+        self.assertEqual(sales.capacity, 10)
+
+    def test_hourly_buckets_take_deltas(self):
+        """Test sales and refunds adjust only their own hour's bucket,
+        without counting the rest of the show's tickets"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sell(1, 2)
+            self._sell(3, created_at="2024-03-20T14:10:00Z")
+        run_pending()
+        self.assertEqual(
+            dict(
+                HourlySales.objects.values_list("hour__hour", "tickets_sold")
+            ),
+            {12: 2, 14: 1},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(seat=3).delete()
+        job = Job.objects.get(
+            name="planetarium.apply_hourly_sales", status=Job.QUEUED
+        )
+        with CaptureQueriesContext(connection) as queries:
+            apply_hourly_sales(**job.payload)
+        self.assertEqual(
+            dict(
+                HourlySales.objects.values_list("hour__hour", "tickets_sold")
+            ),
+            {12: 2, 14: 0},
+        )
+        self.assertFalse(
+            any(
+                "planetarium_ticket" in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+    def test_late_commits_and_refunds_are_recomputed(self):
+        """Test tickets behind the watermark and deletions are counted"""
+        self._sell(4, id=100)
+        self._sell(5, id=101)
+        refresh_sales_rollups()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sell(1, id=1)
+            self._sell(2, id=2)
+        run_pending()
+        self.assertEqual(self._sold(), (4, 4))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(seat__in=(1, 5)).delete()
+        run_pending()
+        self.assertEqual(self._sold(), (2, 2))
+
+    def test_archived_tickets_stay_counted(self):
+        """Test archiving a session keeps its sales in the rollups"""
+        self._sell(1, 2)
+        refresh_sales_rollups()
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_past_sessions(horizon_days=0)
+        run_pending()
+        self.assertEqual(self._sold(), (2, 2))
+
+    def test_periods_report_occupancy(self):
+        """Test days report sales and the occupancy of sessions shown"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sell(1, 2)
+        run_pending()
+        self.client.force_authenticate(self.admin)
+
+        days = self.client.get(
+            reverse("planetarium:sales-analytics-days")
+        ).data
+        self.assertEqual(
+            [
+                (day["period"][:10], day["tickets_sold"], day["occupancy"])
+                for day in days
+            ],
+            [("2024-03-20", 2, 0), ("2024-03-30", 0, 0.2)],
+        )
+        hours = self.client.get(
+            reverse("planetarium:sales-analytics-hours"),
+            {"start": "2024-03-30"},
+        ).data
+        self.assertEqual(len(hours), 1)
+        self.assertEqual(hours[0]["capacity"], 10)
+        self.assertEqual(hours[0]["seats_filled"], 2)
+
+    def test_invalid_dates_are_rejected(self):
+        """Test malformed date filters return 400 instead of failing"""
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            reverse("planetarium:sales-analytics-shows"), {"start": "bad"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("start", response.data)
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.throttling import AnonRateThrottle
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from planetarium.seat_events import (
+    RELAY_CHANNEL,
+    SeatEventHub,
+    hub,
+    relay,
+)
+from user.models import User
+
+
+class SeatEventHubTests(TestCase):
+    def test_publish_reaches_every_subscriber(self):
+        """Test one change is delivered to all subscribers of a session"""
+        event_hub = SeatEventHub()
+
+        async def listen():
+            first = event_hub.subscribe(1)
+            second = event_hub.subscribe(1)
+            other_session = event_hub.subscribe(2)
+            publisher = threading.Thread(
+                target=event_hub.publish,
+                args=(1, "taken", [{"row": 1, "seat": 2}]),
+            )
+            publisher.start()
+            messages = [
+                await asyncio.wait_for(subscriber[1].get(), 1)
+                for subscriber in (first, second)
+            ]
+            publisher.join()
+            return messages, other_session[1].empty()
+
+        messages, other_empty = asyncio.run(listen())
+
+        self.assertEqual(
+            messages,
+            ['event: taken\ndata: [{"row": 1, "seat": 2}]\n\n'] * 2,
+        )
+        self.assertTrue(other_empty)
+
+
+class SeatEventSignalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user("user@test.com", "pass12345")
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+        self.reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=user
+        )
+
+    @mock.patch.object(hub, "publish")
+    def test_ticket_changes_are_published_after_commit(self, publish):
+        """Test created and deleted tickets are pushed as seat deltas"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(
+                row=2,
+                seat=3,
+                show_session=self.session,
+                reservation=self.reservation,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+
+        self.assertEqual(
+            publish.call_args_list,
+            [
+                mock.call(self.session.id, "taken", [{"row": 2, "seat": 3}]),
+                mock.call(
+                    self.session.id, "released", [{"row": 2, "seat": 3}]
+                ),
+            ],
+        )
+
+    @override_settings(SEAT_EVENTS_REDIS_URL="redis://relay:6379/0")
+    def test_changes_are_relayed_to_other_processes(self):
+        """Test committed changes go to the relay channel, and messages
+        heard on it reach this process's subscribers"""
+        client = mock.Mock()
+        with mock.patch.object(
+            relay, "client", return_value=client
+        ), mock.patch.object(hub, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Ticket.objects.create(
+                    row=2,
+                    seat=3,
+                    show_session=self.session,
+                    reservation=self.reservation,
+                )
+            publish.assert_not_called()
+            channel, message = client.publish.call_args.args
+            self.assertEqual(channel, RELAY_CHANNEL)
+
+            relay.receive(message)
+        publish.assert_called_once_with(
+            self.session.id, "taken", [{"row": 2, "seat": 3}]
+        )
+
+    @override_settings(SEAT_EVENTS_REDIS_URL="redis://relay:6379/0")
+    def test_relay_listener_feeds_the_hub(self):
+        """Test the listener thread delivers channel messages to the hub
+        and falls back to local delivery when publishing fails"""
+        heard = threading.Event()
+
+        def listen():
+            yield {"data": '{"session": 1, "event": "released", "seats": []}'}
+            threading.Event().wait()
+
+        client = mock.Mock()
+        client.pubsub.return_value.listen.side_effect = listen
+        client.publish.side_effect = OSError("relay down")
+        with mock.patch.object(
+            relay, "client", return_value=client
+        ), mock.patch.object(
+            hub, "publish", side_effect=lambda *args: heard.set()
+        ) as publish, mock.patch.object(relay, "_listener", None):
+            relay.listen()
+            self.assertTrue(heard.wait(1))
+            publish.assert_called_with(1, "released", [])
+
+            relay.publish(2, "taken", [])
+            publish.assert_called_with(2, "taken", [])
+
+    def test_stream_requires_asgi(self):
+        """Test the stream refuses to block a WSGI worker"""
+        response = self.client.get(
+            reverse(
+                "planetarium:showsession-seat-events", args=[self.session.id]
+            )
+        )
+        self.assertEqual(response.status_code, 501)
+
+    def test_stream_is_gated_like_the_api(self):
+        """Test unknown sessions, bad tokens and throttled clients are
+        refused before a stream is opened"""
+        response = self.client.get(
+            reverse("planetarium:showsession-seat-events", args=[0])
+        )
+        self.assertEqual(response.status_code, 404)
+
+        url = reverse(
+            "planetarium:showsession-seat-events", args=[self.session.id]
+        )
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer junk")
+        self.assertEqual(response.status_code, 401)
+
+        with mock.patch.object(
+            AnonRateThrottle, "THROTTLE_RATES", {"anon": "1/day"}
+        ):
+            cache.clear()
+            self.assertEqual(self.client.get(url).status_code, 501)
+            self.assertEqual(self.client.get(url).status_code, 429)
+
+    async def test_stream_pushes_published_events(self):
+        """Test subscribers of the stream receive published events"""
+        response = await self.async_client.get(
+            reverse(
+                "planetarium:showsession-seat-events", args=[self.session.id]
+            )
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        hub.publish(self.session.id, "released", [{"row": 1, "seat": 1}])
+        self.assertEqual(
+            await asyncio.wait_for(anext(stream), 1),
+            b'event: released\ndata: [{"row": 1, "seat": 1}]\n\n',
+        )
+        await stream.aclose()
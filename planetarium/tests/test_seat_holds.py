@@ -0,0 +1,227 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import holds
+from planetarium.holds import (
+    SWEEP_TASK,
+    SeatsTaken,
+    hold_seats,
+    release_expired_holds,
+    schedule_hold_sweep,
+)
+from planetarium.jobs import run_pending
+from planetarium.models import (
+    AstronomyShow,
+    Job,
+    PlanetariumDome,
+    Reservation,
+    SeatHold,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+SEAT_HOLDS_URL = reverse("planetarium:seathold-list")
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("user@test.com", "pass12345")
+        self.other = User.objects.create_user("other@test.com", "pass12345")
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def _hold(self, user, *seats):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            SEAT_HOLDS_URL,
+            {
+                "show_session": self.session.id,
+                "seats": [{"row": 1, "seat": seat} for seat in seats],
+            },
+            format="json",
+        )
+
+    def test_held_seats_count_as_taken(self):
+        """Test held seats show up in availability and the seat map"""
+        response = self._hold(self.user, 1, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        sessions = self.client.get(reverse("planetarium:showsession-list"))
+        self.assertEqual(sessions.data[0]["tickets_available"], 8)
+
+        detail = self.client.get(
+            reverse("planetarium:showsession-detail", args=[self.session.id])
+        )
+        self.assertEqual(
+            detail.data["taken_places"],
+            [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}],
+        )
+
+    def test_availability_counts_tickets_and_holds_separately(self):
+        """Test tickets, live holds and expired holds are each counted
+        once, without joining tickets to holds"""
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=self.user
+        )
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=self.session,
+                reservation=reservation,
+            )
+        for seat, minutes in ((4, 10), (5, 10), (1, -10)):
+            SeatHold.objects.create(
+                row=2,
+                seat=seat,
+                show_session=self.session,
+                user=self.other,
+                expires_at=timezone.now() + timedelta(minutes=minutes),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            sessions = self.client.get(
+                reverse("planetarium:showsession-list")
+            )
+        self.assertEqual(sessions.data[0]["tickets_available"], 5)
+        self.assertFalse(
+            any(
+                "COUNT(DISTINCT" in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+    def test_seat_held_by_other_user_is_rejected(self):
+        """Test a seat held by someone else cannot be held or reserved"""
+        self._hold(self.other, 3)
+
+        self.assertEqual(
+            self._hold(self.user, 3).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        response = self.client.post(
+            reverse("planetarium:reservation-list"),
+            {
+                "created_at": "2024-03-30T12:00:00Z",
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": 3,
+                        "show_session": self.session.id,
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already taken", str(response.data))
+
+    def test_reservation_consumes_own_hold(self):
+        """Test reserving a held seat turns the hold into a ticket"""
+        self._hold(self.user, 4)
+        response = self.client.post(
+            reverse("planetarium:reservation-list"),
+            {
+                "created_at": "2024-03-30T12:00:00Z",
+                "tickets": [
+                    {"row": 1, "seat": 4, "show_session": self.session.id}
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(Reservation.objects.get().tickets.count(), 1)
+
+    def test_sweeper_releases_expired_holds_in_batches(self):
+        """Test expired holds are released and active ones are kept"""
+        self._hold(self.user, 1, 2, 3)
+        SeatHold.objects.filter(seat__in=[1, 2]).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(release_expired_holds(batch_size=1), 2)
+        self.assertEqual(
+            list(SeatHold.objects.values_list("seat", flat=True)), [3]
+        )
+
+    def test_sweep_job_releases_holds_and_queues_the_next_sweep(self):
+        """Test the sweep runs as a job that keeps a single successor"""
+        self._hold(self.user, 1)
+        SeatHold.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        schedule_hold_sweep()
+        schedule_hold_sweep()
+        self.assertEqual(Job.objects.filter(name=SWEEP_TASK).count(), 1)
+
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(
+            list(
+                Job.objects.filter(name=SWEEP_TASK)
+                .order_by("id")
+                .values_list("status", flat=True)
+            ),
+            [Job.SUCCEEDED, Job.QUEUED],
+        )
+
+    def test_holds_recheck_seats_under_the_session_lock(self):
+        """Test a hold is refused for a seat sold after validation"""
+        reservation = Reservation.objects.create(
+            user=self.other, created_at=timezone.now()
+        )
+        Ticket.objects.create(
+            show_session=self.session, reservation=reservation, row=1, seat=1
+        )
+        with self.assertRaises(SeatsTaken):
+            hold_seats(self.user, self.session, [(1, 1), (1, 2)])
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_reservations_recheck_seats_under_the_session_lock(self):
+        """Test a ticket is refused for a seat held after validation"""
+        checks = []
+
+        def held_after_validation(*args):
+            checks.append(args)
+            if len(checks) == 1:
+                return set()
+            return holds.taken_seats(*args)
+
+        hold_seats(self.other, self.session, [(1, 1)])
+        self.client.force_authenticate(self.user)
+        with mock.patch(
+            "planetarium.serializers.taken_seats",
+            side_effect=held_after_validation,
+        ):
+            response = self.client.post(
+                reverse("planetarium:reservation-list"),
+                {
+                    "created_at": "2024-03-30T12:00:00Z",
+                    "tickets": [
+                        {"row": 1, "seat": 1, "show_session": self.session.id}
+                    ],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(checks), 2)
+        self.assertFalse(Reservation.objects.filter(user=self.user).exists())
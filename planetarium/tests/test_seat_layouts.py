@@ -0,0 +1,179 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.layouts import MAX_SEATS_IN_ROW, parse_seat_map
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from planetarium.waitlist import free_seats
+from user.models import User
+
+DOME_URL = reverse("planetarium:planetariumdome-list")
+SEAT_MAP = ["SS.SS", "WC.SS", ".SSS."]
+
+
+class SeatLayoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dome = PlanetariumDome.objects.create(
+            name="Curved", rows=1, seats_in_row=1,
+            layout=parse_seat_map(SEAT_MAP),
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description=""
+            ),
+            planetarium_dome=self.dome,
+            show_time=timezone.now(),
+        )
+
+    def test_layout_drives_capacity_and_bounds(self):
+        """Test capacity counts seats and rows/seats_in_row follow the map"""
+        self.assertEqual(self.dome.capacity, 11)
+        self.assertEqual(self.dome.seat_count, 11)
+        self.assertEqual((self.dome.rows, self.dome.seats_in_row), (3, 5))
+        self.assertEqual(self.dome.seat_layout.category(2, 1), "wheelchair")
+        self.assertEqual(self.dome.seat_layout.category(2, 5), "standard")
+        self.assertEqual(self.dome.seat_layout.seat_map(), SEAT_MAP)
+
+    def test_tickets_for_gaps_are_rejected(self):
+        """Test aisle positions and seats past a row's end are invalid"""
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(),
+            user=User.objects.create_user("user@test.com", "pass12345"),
+        )
+        for row, seat, message in (
+            (1, 3, "row 1 has no seat 3"),
+            (3, 5, "row 3 has no seat 5"),
+            (4, 1, "row must be between 1 and 3"),
+        ):
+            with self.assertRaisesMessage(ValidationError, message):
+                Ticket.objects.create(
+                    row=row,
+                    seat=seat,
+                    show_session=self.session,
+                    reservation=reservation,
+                )
+        Ticket.objects.create(
+            row=3, seat=2, show_session=self.session, reservation=reservation
+        )
+        self.assertNotIn((3, 2), free_seats(self.session))
+        self.assertEqual(len(free_seats(self.session)), 10)
+
+    def test_availability_uses_layout_capacity(self):
+        """Test session listings count only real seats as available"""
+        response = self.client.get(
+            reverse("planetarium:showsession-list"),
+            {"fields": "id,tickets_available"},
+        )
+        self.assertEqual(response.data[0]["tickets_available"], 11)
+
+    def test_create_dome_from_seat_map(self):
+        """Test domes can be created from a seat map and read back"""
+        self.client.force_authenticate(
+            User.objects.create_user(
+                "staff@test.com", "pass12345", is_staff=True
+            )
+        )
+        response = self.client.post(
+            DOME_URL, {"name": "Small", "seat_map": ["S.S", "WW"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["capacity"], 4)
+
+        seat_map = self.client.get(
+            reverse(
+                "planetarium:planetariumdome-seat-map",
+                args=[response.data["id"]],
+            )
+        ).data
+        self.assertEqual(seat_map["seat_map"], ["S.S", "WW."])
+
+        response = self.client.post(
+            DOME_URL, {"name": "Bad", "seat_map": ["SX"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(DOME_URL, {"name": "Bad"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_malformed_layouts_are_rejected(self):
+        """Test stored layouts must compile: positive rows, one category
+        mask per row and category seats that exist"""
+        for layout, message in (
+            ({"rows": []}, "non-empty list of rows"),
+            ({"rows": [3, "7"]}, "Row 2 must be a positive integer"),
+            ({"rows": [3, 0]}, "Row 2 must be a positive integer"),
+            (
+                {"rows": [3, 7], "categories": {"wheelchair": [1]}},
+                "one mask for each of the 2 rows",
+            ),
+            (
+                {"rows": [3, 7], "categories": {"wheelchair": [4, 0]}},
+                "marks seats row 1 does not have",
+            ),
+            (
+                {"rows": [3], "categories": {"vip": [1]}},
+                "Unknown seat category 'vip'",
+            ),
+        ):
+            self.dome.layout = layout
+            with self.assertRaisesMessage(ValidationError, message):
+                self.dome.full_clean()
+            with self.assertRaisesMessage(ValidationError, message):
+                self.dome.save()
+
+    def test_changes_may_not_drop_seats_with_upcoming_tickets(self):
+        """Test removing a seat booked for an upcoming session is refused
+        and the seat is reported"""
+        Ticket.objects.create(
+            row=3,
+            seat=4,
+            show_session=ShowSession.objects.create(
+                astronomy_show=self.session.astronomy_show,
+                planetarium_dome=self.dome,
+                show_time=timezone.now() + timedelta(days=1),
+            ),
+            reservation=Reservation.objects.create(
+                created_at=timezone.now(),
+                user=User.objects.create_user("user@test.com", "pass12345"),
+            ),
+        )
+
+        self.dome.layout = parse_seat_map(["SS.SS", "WC.SS", ".SS.."])
+        with self.assertRaisesMessage(ValidationError, "row 3 seat 4"):
+            self.dome.full_clean()
+        self.dome.layout = parse_seat_map(["SSSSS", "SSSSS", ".SSSS"])
+        self.dome.full_clean()
+
+    def test_dome_dimensions_are_bounded(self):
+        """Test negative or huge dimensions are refused before a layout
+        is compiled"""
+        for fields in (
+            {"rows": 2, "seats_in_row": -1},
+            {"rows": 0, "seats_in_row": 5},
+            {"rows": 2, "seats_in_row": 10 ** 10},
+            {"seat_map": ["S" * (MAX_SEATS_IN_ROW + 1)]},
+        ):
+            response = self.client.post(
+                DOME_URL, {"name": "Bad", **fields}, format="json"
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+        with self.assertRaisesMessage(ValidationError, "between 1 and"):
+            PlanetariumDome.objects.create(
+                name="Bad", rows=2, seats_in_row=-1
+            )
+        self.assertFalse(PlanetariumDome.objects.filter(name="Bad").exists())
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import slow_queries
+from planetarium.models import AstronomyShow, PlanetariumDome, ShowSession
+from user.models import User
+
+SLOW_QUERIES_URL = reverse("planetarium:slow-queries")
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+
+
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        slow_queries.log.clear()
+        self.client = APIClient()
+        ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description=""
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=2, seats_in_row=5
+            ),
+            show_time=timezone.now(),
+        )
+        self.admin = User.objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_statements_are_recorded_with_view_and_plan(self):
+        """Test statements over the threshold keep their view and EXPLAIN"""
+        self.client.get(SHOW_SESSION_URL)
+
+        self.client.force_authenticate(self.admin)
+        records = self.client.get(
+            SLOW_QUERIES_URL, {"view": "ShowSessionViewSet.list"}
+        ).data
+        record = next(
+            record for record in records
+            if "planetarium_showsession" in record["sql"]
+        )
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["path"], SHOW_SESSION_URL)
+        self.assertEqual(record["database"], "default")
+        self.assertTrue(record["plan"])
+        self.assertNotIn("EXPLAIN failed", record["plan"])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_BUFFER_SIZE=2)
+    def test_buffer_is_bounded(self):
+        """Test only the newest records are kept"""
+        for _ in range(3):
+            self.client.get(SHOW_SESSION_URL)
+        self.assertEqual(len(slow_queries.log.records()), 2)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_streamed_bodies_are_captured(self):
+        """Test statements run while a streamed response is consumed are
+        still recorded against the view"""
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            reverse("planetarium:ticket-export", args=["csv"]),
+            {"start": "2024-03-01", "end": "2024-03-02"},
+        )
+        slow_queries.log.clear()
+        b"".join(response.streaming_content)
+
+        self.assertIn(
+            "TicketExportView.get",
+            [record["view"] for record in slow_queries.log.records()],
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_params_are_redacted_or_truncated(self):
+        """Test parameters are logged by type unless enabled, and then
+        cut to the configured length"""
+        title = "x" * 50
+        with slow_queries.capture():
+            list(AstronomyShow.objects.filter(title=title))
+        self.assertEqual(slow_queries.log.records()[0]["params"], ["<str>"])
+
+        with override_settings(
+            SLOW_QUERY_LOG_PARAMS=True, SLOW_QUERY_PARAM_MAX_LENGTH=10
+        ), slow_queries.capture():
+            list(AstronomyShow.objects.filter(title=title))
+        self.assertEqual(
+            slow_queries.log.records()[0]["params"], ["'xxxxxxxxx..."]
+        )
+
+    def test_recorder_is_off_without_threshold(self):
+        """Test nothing is captured unless a threshold is configured"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=None):
+            self.client.get(SHOW_SESSION_URL)
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=60000):
+            self.client.get(SHOW_SESSION_URL)
+        self.assertEqual(slow_queries.log.records(), [])
+
+    def test_endpoint_is_admin_only(self):
+        """Test non-staff users cannot read or clear the buffer"""
+        self.client.force_authenticate(
+            User.objects.create_user("user@test.com", "pass12345")
+        )
+        response = self.client.get(SLOW_QUERIES_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.delete(SLOW_QUERIES_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+)
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+
+
+def data_queries(queries):
+    return [
+        query["sql"] for query in queries
+        if "planetarium_changemarker" not in query["sql"]
+    ]
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = AstronomyShow.objects.create(
+            title="Mars", description="A long description"
+        )
+        self.show.show_theme.add(ShowTheme.objects.create(name="Planets"))
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+
+    def test_fields_trim_output_and_query(self):
+        """Test ?fields= drops unused joins and the availability count"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                SHOW_SESSION_URL, {"fields": "id,astronomy_show"}
+            )
+
+        self.assertEqual(
+            response.data, [{"id": self.session.id, "astronomy_show": "Mars"}]
+        )
+        (sql,) = data_queries(queries)
+        self.assertNotIn("planetarium_planetariumdome", sql)
+        self.assertNotIn("COUNT", sql)
+
+    def test_expand_nests_related_objects(self):
+        """Test ?expand= replaces a flat field with the nested object"""
+        response = self.client.get(
+            SHOW_SESSION_URL,
+            {"fields": "id,planetarium_dome", "expand": "planetarium_dome"},
+        )
+        self.assertEqual(
+            response.data[0]["planetarium_dome"],
+            {
+                "id": self.dome.id,
+                "name": "Main",
+                "seats_in_row": 5,
+                "rows": 2,
+                "capacity": 10,
+            },
+        )
+
+    def test_unrequested_columns_are_deferred(self):
+        """Test show descriptions are not read when not asked for"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("planetarium:astronomyshow-list"),
+                {"fields": "id,title"},
+            )
+
+        self.assertEqual(
+            response.data, [{"id": self.show.id, "title": "Mars"}]
+        )
+        (sql,) = data_queries(queries)
+        self.assertNotIn("description", sql)
+
+    def test_default_output_is_unchanged(self):
+        """Test responses without ?fields= keep every field"""
+        response = self.client.get(
+            reverse("planetarium:showsession-detail", args=[self.session.id])
+        )
+        self.assertEqual(
+            set(response.data),
+            {
+                "id",
+                "show_time",
+                "astronomy_show",
+                "planetarium_dome",
+                "taken_places",
+            },
+        )
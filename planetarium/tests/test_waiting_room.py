@@ -0,0 +1,165 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import waiting_room
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    WaitingRoom,
+)
+from user.models import User
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def waiting_room_url(show_session_id):
+    return reverse(
+        "planetarium:showsession-waiting-room", args=[show_session_id]
+    )
+
+
+# The test cache is process local; production refuses to run rooms on it
+@override_settings(
+    WAITING_ROOM_BURST=1, WAITING_ROOM_REQUIRE_SHARED_CACHE=False
+)
+class WaitingRoomTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=5, seats_in_row=5
+        )
+        self.session, self.open_session = [
+            ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=timezone.now() + timedelta(days=1),
+            )
+            for _ in range(2)
+        ]
+        self.room = WaitingRoom.objects.create(
+            show_session=self.session,
+            opens_at=timezone.now(),
+            admit_per_minute=1,
+        )
+        self.users = [
+            User.objects.create_user(f"user{number}@test.com", "pass12345")
+            for number in range(2)
+        ]
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(waiting_room_url(self.session.id)).data
+
+    def reserve(self, user, show_session, token=None):
+        self.client.force_authenticate(user)
+        headers = {"HTTP_X_QUEUE_TOKEN": token} if token else {}
+        return self.client.post(
+            RESERVATION_URL,
+            {
+                "created_at": timezone.now(),
+                "tickets": [
+                    {"row": 1, "seat": 1, "show_session": show_session.id}
+                ],
+            },
+            format="json",
+            **headers,
+        )
+
+    def test_positions_are_handed_out_in_join_order(self):
+        """Test joins get increasing positions and rejoining keeps one"""
+        first = self.join(self.users[0])
+        second = self.join(self.users[1])
+
+        self.assertEqual((first["position"], first["admitted"]), (1, True))
+        self.assertEqual((second["position"], second["admitted"]), (2, False))
+        self.assertGreater(second["retry_after"], 0)
+        self.assertEqual(self.join(self.users[1])["token"], second["token"])
+
+        self.client.force_authenticate(self.users[1])
+        response = self.client.get(
+            waiting_room_url(self.session.id),
+            HTTP_X_QUEUE_TOKEN=second["token"],
+        )
+        self.assertEqual(response.data["position"], 2)
+
+    def test_local_caches_are_refused(self):
+        """Test joining needs a cache shared by every worker"""
+        self.client.force_authenticate(self.users[0])
+        with override_settings(WAITING_ROOM_REQUIRE_SHARED_CACHE=True):
+            response = self.client.post(waiting_room_url(self.session.id))
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+        redis = {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+        with override_settings(CACHES={"default": redis}):
+            self.assertTrue(waiting_room.cache_is_shared())
+
+    def test_only_admitted_tokens_may_reserve(self):
+        """Test reservations need an admitted token for gated sessions"""
+        admitted = self.join(self.users[0])["token"]
+        waiting = self.join(self.users[1])["token"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reserve(self.users[1], self.session, waiting)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertIn("Retry-After", response)
+        self.assertEqual(len(queries), 0)
+
+        response = self.reserve(self.users[1], self.session)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.reserve(self.users[1], self.session, admitted)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Reservation.objects.exists())
+
+        response = self.reserve(self.users[0], self.session, admitted)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.reserve(self.users[1], self.open_session)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_rate_admits_later_positions_over_time(self):
+        """Test positions are admitted as the room's rate allows"""
+        self.join(self.users[0])
+        token = self.join(self.users[1])["token"]
+        later = self.room.opens_at.timestamp() + 61
+
+        with mock.patch.object(waiting_room.time, "time", return_value=later):
+            progress = self.client.get(
+                waiting_room_url(self.session.id), HTTP_X_QUEUE_TOKEN=token
+            ).data
+            response = self.reserve(self.users[1], self.session, token)
+        self.assertEqual(progress["admitted_through"], 2)
+        self.assertEqual(progress["admitted"], True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_changed_rooms_invalidate_old_tokens(self):
+        """Test moving the opening time requires rejoining"""
+        token = self.join(self.users[0])["token"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.opens_at -= timedelta(minutes=1)
+            self.room.save()
+
+        response = self.reserve(self.users[0], self.session, token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.join(self.users[0])["position"], 1)
+
+    def test_sessions_without_room_have_no_waiting_room(self):
+        """Test joining a session that is not gated returns 404"""
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(waiting_room_url(self.open_session.id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
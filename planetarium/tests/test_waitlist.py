@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.holds import release_expired_holds
+from planetarium.jobs import run_pending
+from planetarium.models import (
+    AstronomyShow,
+    Job,
+    PlanetariumDome,
+    Reservation,
+    SeatHold,
+    ShowSession,
+    Ticket,
+    WaitlistEntry,
+)
+from planetarium.waitlist import pick_seats
+from user.models import User
+
+WAITLIST_URL = reverse("planetarium:waitlistentry-list")
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        show = AstronomyShow.objects.create(title="Mars", description="")
+        dome = PlanetariumDome.objects.create(
+            name="Main", rows=1, seats_in_row=3
+        )
+        self.session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time="2024-03-30T10:00:00Z",
+        )
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(),
+            user=User.objects.create_user("buyer@test.com", "pass12345"),
+        )
+        self.tickets = [
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=self.session,
+                reservation=reservation,
+            )
+            for seat in range(1, 4)
+        ]
+        self.users = [
+            User.objects.create_user(f"user{index}@test.com", "pass12345")
+            for index in range(3)
+        ]
+
+    def join(self, user, party_size):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                WAITLIST_URL,
+                {"show_session": self.session.id, "party_size": party_size},
+            )
+        run_pending()
+        return response
+
+    def release(self, *tickets):
+        with self.captureOnCommitCallbacks(execute=True):
+            for ticket in tickets:
+                ticket.delete()
+        run_pending()
+
+    def held_seats(self, user):
+        return sorted(
+            SeatHold.objects.active()
+            .filter(user=user)
+            .values_list("row", "seat")
+        )
+
+    def test_released_seats_go_to_oldest_party_that_fits(self):
+        """Test matching is FIFO among parties the freed seats can seat"""
+        self.join(self.users[0], 2)
+        self.join(self.users[1], 1)
+        self.join(self.users[2], 1)
+
+        self.release(self.tickets[1])
+
+        self.assertEqual(self.held_seats(self.users[0]), [])
+        self.assertEqual(self.held_seats(self.users[1]), [(1, 2)])
+        self.assertEqual(self.held_seats(self.users[2]), [])
+        entry = WaitlistEntry.objects.get(user=self.users[1])
+        self.assertIsNotNone(entry.matched_at)
+        self.assertGreater(entry.claim_expires_at, timezone.now())
+
+        self.release(self.tickets[0], self.tickets[2])
+
+        self.assertEqual(self.held_seats(self.users[0]), [(1, 1), (1, 3)])
+        self.assertEqual(self.held_seats(self.users[2]), [])
+
+    def test_expired_claim_passes_to_next_in_line(self):
+        """Test an unused claim is offered to the next waiting party"""
+        self.join(self.users[0], 1)
+        self.join(self.users[1], 1)
+        self.release(self.tickets[0])
+        SeatHold.objects.filter(user=self.users[0]).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_holds()
+        run_pending()
+
+        self.assertEqual(self.held_seats(self.users[1]), [(1, 1)])
+
+    def test_joining_with_free_seats_claims_immediately(self):
+        """Test a party is matched at once when seats are already free"""
+        self.release(self.tickets[0])
+        response = self.join(self.users[0], 1)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.held_seats(self.users[0]), [(1, 1)])
+
+    def test_party_cannot_wait_twice_or_exceed_dome(self):
+        """Test duplicate entries and impossible parties are rejected"""
+        self.assertEqual(
+            self.join(self.users[0], 1).status_code, status.HTTP_201_CREATED
+        )
+        for party_size in (1, 4):
+            self.assertEqual(
+                self.join(self.users[0], party_size).status_code,
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+    def test_bulk_release_queues_one_matching_job(self):
+        """Test freeing many seats at once queues the matcher once"""
+        self.join(self.users[0], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(show_session=self.session).delete()
+
+        self.assertEqual(
+            Job.objects.filter(
+                name="planetarium.match_waitlist", status=Job.QUEUED
+            ).count(),
+            1,
+        )
+
+    def test_pick_seats_prefers_adjacent_seats(self):
+        """Test parties are seated together when a row allows it"""
+        free = [(1, 1), (1, 3), (2, 2), (2, 3)]
+        self.assertEqual(pick_seats(free, 2), [(2, 2), (2, 3)])
+        self.assertEqual(pick_seats(free, 3), [(1, 1), (1, 3), (2, 2)])
@@ -0,0 +1,95 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import warmup
+from planetarium.whats_on import FEED_CACHE_KEY
+
+READINESS_URL = reverse("planetarium:readiness")
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        warmup.reset()
+        self.client = APIClient()
+
+    def tearDown(self):
+        warmup.reset()
+
+    def test_readiness_warms_up_and_retries_failed_steps(self):
+        """Test the readiness endpoint warms the worker, answers 503 while
+        a step fails and retries only the failed steps"""
+        with mock.patch.object(
+            warmup, "prime_caches", side_effect=OSError("no cache")
+        ):
+            response = self.client.get(READINESS_URL)
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertFalse(response.data["ready"])
+        self.assertIn("caches", response.data["errors"])
+
+        with mock.patch.object(warmup, "compile_urls") as compile_urls:
+            response = self.client.get(READINESS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["errors"], {})
+        compile_urls.assert_not_called()
+        self.assertIsNotNone(cache.get(FEED_CACHE_KEY))
+
+    def test_forked_workers_warm_up_again(self):
+        """Test readiness inherited from a parent process does not count"""
+        warmup.warm()
+        self.assertTrue(warmup.is_ready())
+        with mock.patch.object(warmup.os, "getpid", return_value=-1):
+            self.assertFalse(warmup.is_ready())
+            with mock.patch.object(warmup, "prime_caches") as prime_caches:
+                warmup.warm()
+            prime_caches.assert_called_once_with()
+            self.assertTrue(warmup.is_ready())
+
+    def test_warm_up_runs_every_step_and_reports_ready(self):
+        """Test warm-up primes caches and reports step timings"""
+        out = StringIO()
+        call_command("warm_up", stdout=out)
+
+        self.assertIsNotNone(cache.get(FEED_CACHE_KEY))
+        self.assertIn("Warmed up", out.getvalue())
+        response = self.client.get(READINESS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.data["steps"]),
+            ["imports", "urls", "serializers", "database", "caches"],
+        )
+        self.assertIn("planetarium.views", response.data["imports"])
+
+    def test_failed_step_keeps_worker_unready(self):
+        """Test a failing warm-up step is reported and blocks readiness"""
+        with mock.patch.object(
+            warmup, "build_serializers", side_effect=OSError("broken")
+        ):
+            report = warmup.warm()
+        self.assertIn("serializers", report["errors"])
+        self.assertFalse(warmup.is_ready())
+
+    def test_warm_up_connects_every_database(self):
+        """Test warm-up opens a connection for every alias"""
+        patches = [
+            mock.patch.object(connections[alias], "ensure_connection")
+            for alias in connections
+        ]
+        ensure_connections = [patch.start() for patch in patches]
+        try:
+            warmup.open_connections()
+        finally:
+            for patch in patches:
+                patch.stop()
+        for ensure_connection in ensure_connections:
+            ensure_connection.assert_called_once_with()
@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from planetarium.checks import check_shared_cache
+from planetarium.jobs import run_pending
+from planetarium.models import (
+    AstronomyShow,
+    Job,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+    UpcomingSession,
+)
+from planetarium.whats_on import rebuild
+from user.models import User
+
+WHATS_ON_URL = reverse("planetarium:whats-on")
+
+
+class WhatsOnTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tomorrow = timezone.now().replace(
+            hour=12, minute=0, second=0, microsecond=0
+        ) + timedelta(days=1)
+        self.show = AstronomyShow.objects.create(title="Mars", description="")
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=2, seats_in_row=5
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sessions = [
+                ShowSession.objects.create(
+                    astronomy_show=self.show,
+                    planetarium_dome=self.dome,
+                    show_time=self.tomorrow + timedelta(hours=hours),
+                )
+                for hours in (0, 2, 24)
+            ]
+            ShowSession.objects.create(
+                astronomy_show=self.show,
+                planetarium_dome=self.dome,
+                show_time=timezone.now() - timedelta(days=1),
+            )
+        run_pending()
+
+    def test_feed_groups_upcoming_sessions_by_day_and_show(self):
+        """Test only future sessions are listed, grouped by day and show"""
+        feed = self.client.get(WHATS_ON_URL).data
+
+        self.assertEqual(len(feed), 2)
+        first_day, second_day = feed
+        self.assertEqual(
+            [session["id"] for session in first_day["shows"][0]["sessions"]],
+            [self.sessions[0].id, self.sessions[1].id],
+        )
+        self.assertEqual(first_day["shows"][0]["title"], "Mars")
+        self.assertEqual(
+            first_day["shows"][0]["sessions"][0],
+            {
+                "id": self.sessions[0].id,
+                "show_time": self.sessions[0].show_time,
+                "planetarium_dome": "Main",
+                "tickets_available": 10,
+            },
+        )
+        self.assertEqual(
+            second_day["shows"][0]["sessions"][0]["id"], self.sessions[2].id
+        )
+
+    def test_feed_is_a_single_cached_read(self):
+        """Test repeated feed requests never query the database"""
+        self.client.get(WHATS_ON_URL)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(WHATS_ON_URL)
+        self.assertEqual(len(queries), 0)
+
+    def test_changes_update_the_feed_incrementally(self):
+        """Test tickets and catalog edits reach the cached feed"""
+        self.client.get(WHATS_ON_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=1,
+                seat=1,
+                show_session=self.sessions[0],
+                reservation=Reservation.objects.create(
+                    created_at=timezone.now(),
+                    user=User.objects.create_user(
+                        "user@test.com", "pass12345"
+                    ),
+                ),
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.show.title = "Red Planet"
+            self.show.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sessions[1].delete()
+        run_pending()
+
+        show = self.client.get(WHATS_ON_URL).data[0]["shows"][0]
+        self.assertEqual(show["title"], "Red Planet")
+        self.assertEqual(
+            [
+                (session["id"], session["tickets_available"])
+                for session in show["sessions"]
+            ],
+            [(self.sessions[0].id, 9)],
+        )
+
+    def test_a_transaction_queues_one_refresh(self):
+        """Test many ticket changes in one transaction refresh once"""
+        user = User.objects.create_user("user@test.com", "pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            for session in self.sessions:
+                reservation = Reservation.objects.create(
+                    created_at=timezone.now(), user=user
+                )
+                for seat in (1, 2):
+                    Ticket.objects.create(
+                        row=1,
+                        seat=seat,
+                        show_session=session,
+                        reservation=reservation,
+                    )
+
+        refreshes = Job.objects.filter(
+            name="planetarium.refresh_whats_on", status=Job.QUEUED
+        )
+        self.assertEqual(
+            [job.payload for job in refreshes],
+            [
+                {
+                    "show_session_ids": [
+                        session.id for session in self.sessions
+                    ]
+                }
+            ],
+        )
+
+    def test_rebuild_restores_missing_rows(self):
+        """Test the rebuild command recreates the materialized rows"""
+        UpcomingSession.objects.all().delete()
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(UpcomingSession.objects.count(), 3)
+
+    def test_deploy_check_flags_process_local_caches(self):
+        """Test deploy checks warn while invalidations cannot be shared"""
+        local = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+        shared = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+        with override_settings(CACHES=local):
+            self.assertEqual(
+                [warning.id for warning in check_shared_cache(None)],
+                ["planetarium.W001"],
+            )
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import hmac
+import struct
+import uuid
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+from planetarium.models import Ticket, TicketCheckIn
+
+ADMITTED = "admitted"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+WRONG_SESSION = "wrong_session"
+
+# ticket id, show session id, row, seat; as wide as the id and integer
+# columns, so any stored ticket can be packed
+_PAYLOAD = struct.Struct(">QQII")
+_SIGNATURE_SIZE = 10
+_KEY_SALT = "planetarium.ticket_codes"
+
+
+class InvalidTicketCode(ValueError):
+    pass
+
+
+def _signature(payload):
+    """Truncated HMAC under a key derived for ticket codes alone, from
+    TICKET_CODE_SECRET when set and otherwise from SECRET_KEY"""
+    return salted_hmac(
+        _KEY_SALT,
+        payload,
+        secret=getattr(settings, "TICKET_CODE_SECRET", None) or None,
+        algorithm="sha256",
+    ).digest()[:_SIGNATURE_SIZE]
+
+
+def sign_ticket(ticket_id, show_session_id, row, seat):
+    """Packs the ticket into a short url-safe code that a scanner holding
+    TICKET_CODE_SECRET can verify without a database"""
+    payload = _PAYLOAD.pack(ticket_id, show_session_id, row, seat)
+    return (
+        base64.urlsafe_b64encode(payload + _signature(payload))
+        .rstrip(b"=")
+        .decode()
+    )
+
+
+def ticket_code(ticket):
+    return sign_ticket(
+        ticket.id, ticket.show_session_id, ticket.row, ticket.seat
+    )
+
+
+def verify_code(code):
+    try:
+        raw = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidTicketCode("Malformed ticket code")
+    if len(raw) != _PAYLOAD.size + _SIGNATURE_SIZE:
+        raise InvalidTicketCode("Malformed ticket code")
+
+    payload, signature = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise InvalidTicketCode("Invalid ticket signature")
+
+    ticket_id, show_session_id, row, seat = _PAYLOAD.unpack(payload)
+    return {
+        "ticket": ticket_id,
+        "show_session": show_session_id,
+        "row": row,
+        "seat": seat,
+    }
+
+
+def check_in(codes, show_session_id=None, scanner=""):
+    """Verifies codes in memory and records the whole batch with a fixed
+    number of queries; a ticket is admitted only by the batch whose row
+    won the unique constraint, so concurrent scanners cannot both admit
+    the same ticket"""
+    results = []
+    verified = {}
+    for code in codes:
+        try:
+            ticket = verify_code(code)
+        except InvalidTicketCode:
+            results.append({"code": code, "status": INVALID})
+            continue
+        result = {"code": code, **ticket}
+        if show_session_id and ticket["show_session"] != show_session_id:
+            result["status"] = WRONG_SESSION
+        elif ticket["ticket"] in verified:
+            result["status"] = DUPLICATE
+        else:
+            verified[ticket["ticket"]] = ticket
+        results.append(result)
+
+    issued = set(
+        Ticket.objects.filter(id__in=verified).values_list("id", flat=True)
+    )
+    batch = uuid.uuid4()
+    TicketCheckIn.objects.bulk_create(
+        [
+            TicketCheckIn(
+                ticket_id=ticket["ticket"],
+                show_session_id=ticket["show_session"],
+                row=ticket["row"],
+                seat=ticket["seat"],
+                scanner=scanner,
+                batch=batch,
+            )
+            for ticket_id, ticket in verified.items()
+            if ticket_id in issued
+        ],
+        ignore_conflicts=True,
+    )
+    check_ins = {
+        ticket_id: (check_in_batch, checked_in_at)
+        for ticket_id, check_in_batch, checked_in_at in (
+            TicketCheckIn.objects.filter(ticket_id__in=issued).values_list(
+                "ticket_id", "batch", "checked_in_at"
+            )
+        )
+    }
+
+    for result in results:
+        if "status" in result:
+            continue
+        if result["ticket"] not in issued:
+            result["status"] = UNKNOWN
+            continue
+        check_in_batch, checked_in_at = check_ins[result["ticket"]]
+        result["status"] = ADMITTED if check_in_batch == batch else DUPLICATE
+        result["checked_in_at"] = checked_in_at
+    return results
@@ -7,6 +7,19 @@ from planetarium.views import (
     ShowThemeViewSet,
     ShowSessionViewSet,
     AstronomyShowViewSet,
+    SalesAnalyticsViewSet,
+    SeatHoldViewSet,
+    WaitlistViewSet,
+    show_session_seat_events,
+    BatchView,
+    CheckInView,
+    WhatsOnView,
+    TicketExportView,
+    JobMetricsView,
+    AutocompleteView,
+    WaitingRoomView,
+    SlowQueryView,
+    ReadinessView,
 )
 
 router = routers.DefaultRouter()
@@ -15,8 +28,39 @@ router.register("reservations", ReservationViewSet)
 router.register("show_themes", ShowThemeViewSet)
 router.register("show_session", ShowSessionViewSet)
 router.register("astronomy_shows", AstronomyShowViewSet)
+router.register("seat_holds", SeatHoldViewSet)
+router.register("waitlist", WaitlistViewSet)
+router.register(
+    "analytics/sales", SalesAnalyticsViewSet, basename="sales-analytics"
+)
 
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path(
+        "show_session/<int:pk>/seats/stream/",
+        show_session_seat_events,
+        name="showsession-seat-events",
+    ),
+    path(
+        "show_session/<int:pk>/waiting_room/",
+        WaitingRoomView.as_view(),
+        name="showsession-waiting-room",
+    ),
+    path("whats_on/", WhatsOnView.as_view(), name="whats-on"),
+    path(
+        "autocomplete/", AutocompleteView.as_view(), name="autocomplete"
+    ),
+    path("batch/", BatchView.as_view(), name="batch"),
+    path("jobs/metrics/", JobMetricsView.as_view(), name="job-metrics"),
+    path("slow_queries/", SlowQueryView.as_view(), name="slow-queries"),
+    path("ready/", ReadinessView.as_view(), name="readiness"),
+    path(
+        "exports/tickets.<str:export_format>",
+        TicketExportView.as_view(),
+        name="ticket-export",
+    ),
+    path("check_in/", CheckInView.as_view(), name="check-in"),
+    path("", include(router.urls)),
+]
 
 app_name = "planetarium"
@@ -1,25 +1,67 @@
+import asyncio
+import copy
 from datetime import datetime
-
-from django.db.models import F, Count
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Prefetch, Value
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve, reverse
+from django.utils.datastructures import MultiValueDict
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
+from rest_framework_simplejwt.authentication import (
+    JWTStatelessUserAuthentication,
+)
 
+from planetarium import (
+    analytics,
+    exports,
+    slow_queries,
+    waiting_room,
+    warmup,
+    whats_on,
+)
+from planetarium.autocomplete import index as autocomplete_index
+from planetarium.conditional import ConditionalGetMixin, seat_markers
+from planetarium.db_router import ReplicaRoutingMixin
+from planetarium.holds import release_holds, tickets_available_expression
+from planetarium.seat_events import hub, start_relay
+from planetarium.ticket_codes import check_in
+from planetarium.waitlist import schedule_matching
+from planetarium.idempotency import IdempotentCreateMixin
+from planetarium.jobs import job_metrics
 from planetarium.models import (
     PlanetariumDome,
     ShowTheme,
     AstronomyShow,
     ShowSession,
-    Reservation
+    Reservation,
+    SeatHold,
+    ArchivedReservation,
+    WaitlistEntry,
+)
+from planetarium.permissions import (
+    HasWaitingRoomAdmission,
+    IsAdminOrIfAuthenticatedReadOnly,
 )
-from planetarium.permissions import IsAdminOrIfAuthenticatedReadOnly
 from planetarium.serializers import (
+    PlanetariumDomeLayoutSerializer,
     PlanetariumDomeSerializer,
+    ReservationHistorySerializer,
     ShowThemeSerializer,
     ShowSessionSerializer,
     AstronomyShowSerializer,
@@ -30,10 +72,74 @@ from planetarium.serializers import (
     ShowSessionListSerializer,
     ShowSessionDetailSerializer,
     ReservationListSerializer,
+    SalesSummarySerializer,
+    SalesPeriodSerializer,
+    SeatHoldSerializer,
+    SeatHoldCreateSerializer,
+    ArchivedReservationSerializer,
+    BatchRequestSerializer,
+    CheckInSerializer,
+    CheckInResultSerializer,
+    WaitlistEntrySerializer,
+    ExportRangeSerializer,
+    query_param_set,
 )
 
 
+def parse_date_param(value, param):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError({param: ["Use the YYYY-MM-DD format."]})
+
+
+class MultiGetMixin:
+    """Lets the list action return just the objects named in ?ids=1,2,3
+    with a single query"""
+
+    @staticmethod
+    def _params_to_ints(qs):
+        """Converts a list of string IDs to a list of integers"""
+        return [int(str_id) for str_id in qs.split(",")]
+
+    def filter_ids(self, queryset):
+        ids = self.request.query_params.get("ids")
+        if not ids or self.action != "list":
+            return queryset
+
+        try:
+            ids = self._params_to_ints(ids)
+        except ValueError:
+            raise ValidationError({"ids": "Must be comma-separated integers"})
+
+        max_ids = getattr(settings, "MULTI_GET_MAX_IDS", 100)
+        if len(ids) > max_ids:
+            raise ValidationError(
+                {"ids": f"At most {max_ids} ids are allowed"}
+            )
+
+        return queryset.filter(id__in=ids)
+
+
+class SparseFieldsetMixin:
+    """Reads ?fields= and ?expand= so get_queryset can skip the joins,
+    prefetches and columns of fields the client did not ask for"""
+
+    def requested_fields(self):
+        return query_param_set(self.request, "fields")
+
+    def expanded_fields(self):
+        return query_param_set(self.request, "expand")
+
+    def wants(self, *names):
+        requested = self.requested_fields()
+        return not requested or bool(requested.intersection(names))
+
+
 class PlanetariumDomeViewSet(
+    ConditionalGetMixin,
+    ReplicaRoutingMixin,
+    MultiGetMixin,
     GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin
@@ -42,8 +148,27 @@ class PlanetariumDomeViewSet(
     serializer_class = PlanetariumDomeSerializer
     permission_classes = []
 
+    def get_change_markers(self):
+        return ["planetariumdome"]
+
+    def get_queryset(self):
+        return self.filter_ids(self.queryset.all())
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="seat_map",
+        serializer_class=PlanetariumDomeLayoutSerializer,
+    )
+    def seat_map(self, request, pk=None):
+        """Seats of the dome row by row: S standard, W wheelchair,
+        C companion and . for a gap"""
+        return Response(self.get_serializer(self.get_object()).data)
+
 
 class ShowThemeViewSet(
+    ConditionalGetMixin,
+    ReplicaRoutingMixin,
     GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin
@@ -52,8 +177,15 @@ class ShowThemeViewSet(
     serializer_class = ShowThemeSerializer
     permission_classes = []
 
+    def get_change_markers(self):
+        return ["showtheme"]
+
 
 class AstronomyShowViewSet(
+    ConditionalGetMixin,
+    ReplicaRoutingMixin,
+    MultiGetMixin,
+    SparseFieldsetMixin,
     GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -63,10 +195,8 @@ class AstronomyShowViewSet(
     serializer_class = AstronomyShowSerializer
     permission_classes = []
 
-    @staticmethod
-    def _params_to_ints(qs):
-        """Converts a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+    def get_change_markers(self):
+        return ["astronomyshow", "showtheme"]
 
     def get_queryset(self):
         title = self.request.query_params.get('title')
@@ -74,13 +204,25 @@ class AstronomyShowViewSet(
 
         queryset = self.queryset
 
+        if self.action in ("list", "retrieve"):
+            queryset = AstronomyShow.objects.all()
+            if self.wants("show_theme"):
+                queryset = queryset.prefetch_related("show_theme")
+            deferred = [
+                field
+                for field in ("description", "image")
+                if not self.wants(field)
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+
         if title:
             queryset = queryset.filter(title__icontains=title)
 
         if show_themes:
             queryset = queryset.filter(show_themes__id__in=show_themes)
 
-        return queryset.distinct()
+        return self.filter_ids(queryset).distinct()
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -121,6 +263,11 @@ class AstronomyShowViewSet(
                 type={"type": "list", "items": {"type": "number"}},
                 description="Filter by title id (ex. ?title=?",
             ),
+            OpenApiParameter(
+                "ids",
+                type={"type": "list", "items": {"type": "number"}},
+                description="Fetch several shows by id (ex. ?ids=1,4,7)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -128,38 +275,77 @@ class AstronomyShowViewSet(
 
 
 class ShowSessionViewSet(
+    ConditionalGetMixin,
+    ReplicaRoutingMixin,
+    MultiGetMixin,
+    SparseFieldsetMixin,
     GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
 ):
-    queryset = (
-        ShowSession.objects
-        .select_related("astronomy_show", "planetarium_dome")
-        .annotate(
-            tickets_available=(
-                    F("planetarium_dome__rows") * F("planetarium_dome__seats_in_row")
-                    - Count("tickets")
-            )
-        )
-    )
+    queryset = ShowSession.objects.all()
+    tickets_available = tickets_available_expression()
 
     serializer_class = ShowSessionSerializer
     permission_classes = []
 
+    def get_change_markers(self):
+        markers = ["showsession", "astronomyshow", "planetariumdome"]
+        if self.action == "retrieve":
+            return markers + ["showtheme", *seat_markers(self.kwargs["pk"])]
+        return markers + ["seats"]
+
     def get_queryset(self):
         date = self.request.query_params.get("date")
         astronomy_show_id_str = self.request.query_params.get("astronomy_show")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
+            date = parse_date_param(date, "date")
             queryset = queryset.filter(show_time__date=date)
 
         if astronomy_show_id_str:
             queryset = queryset.filter(movie_id=int(astronomy_show_id_str))
 
+        queryset = self.filter_ids(queryset)
+
+        if self.action not in ("list", "retrieve"):
+            return queryset
+
+        related = []
+        if self.wants("astronomy_show", "astronomy_show_image"):
+            related.append("astronomy_show")
+        if self.wants(
+            "planetarium_dome",
+            "planetarium_dome_name",
+            "planetarium_dome_capacity",
+        ):
+            related.append("planetarium_dome")
+        if related:
+            queryset = queryset.select_related(*related)
+
+        if self.action == "list":
+            if "astronomy_show" in self.expanded_fields():
+                queryset = queryset.prefetch_related(
+                    "astronomy_show__show_theme"
+                )
+            if self.wants("tickets_available"):
+                queryset = queryset.annotate(
+                    tickets_available=self.tickets_available
+                )
+
+        if self.action == "retrieve" and self.wants("taken_places"):
+            queryset = queryset.prefetch_related(
+                "tickets",
+                Prefetch(
+                    "seat_holds",
+                    queryset=SeatHold.objects.active(),
+                    to_attr="active_holds",
+                ),
+            )
+
         return queryset
 
     def get_serializer_class(self):
@@ -176,7 +362,9 @@ class ShowSessionViewSet(
             OpenApiParameter(
                 "astronomy_show",
                 type=OpenApiTypes.INT,
-                description="Filter by astronomy_show id (ex. ?astronomy_show=2)",
+                description=(
+                    "Filter by astronomy_show id (ex. ?astronomy_show=2)"
+                ),
             ),
             OpenApiParameter(
                 "date",
@@ -186,32 +374,99 @@ class ShowSessionViewSet(
                     "(ex. ?date=2022-10-23)"
                 ),
             ),
+            OpenApiParameter(
+                "ids",
+                type={"type": "list", "items": {"type": "number"}},
+                description="Fetch several sessions by id (ex. ?ids=1,4,7)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
+class SeatEventsGateView(APIView):
+    """Authenticates and throttles a seat event stream like the session
+    endpoints and finds its session before any stream is opened"""
+
+    permission_classes = []
+
+    def get(self, request, pk):
+        get_object_or_404(ShowSession.objects.only("id"), pk=pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+seat_events_gate = SeatEventsGateView.as_view()
+
+
+async def show_session_seat_events(request, pk):
+    """Streams seat taken/released events of a show session as
+    server-sent events, including those of other processes when
+    SEAT_EVENTS_REDIS_URL is set; needs an ASGI server"""
+    gate = await sync_to_async(seat_events_gate)(request, pk=pk)
+    if gate.status_code != status.HTTP_204_NO_CONTENT:
+        return gate
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "Seat events are only streamed under ASGI",
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    heartbeat = getattr(settings, "SEAT_EVENTS_HEARTBEAT_SECONDS", 15)
+
+    async def stream():
+        start_relay()
+        subscriber = hub.subscribe(pk)
+        _, queue = subscriber
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            hub.unsubscribe(pk, subscriber)
+
+    response = StreamingHttpResponse(
+        stream(), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class ReservationPagination(PageNumberPagination):
     page_size = 10
     max_page_size = 100
 
 
 class ReservationViewSet(
+    ReplicaRoutingMixin,
+    IdempotentCreateMixin,
     GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin
 ):
-    queryset = Reservation.objects.prefetch_related(
-        "tickets__show_session__astronomy_show",
-        "tickets__show_session__astronomy_dome",
-    )
+    queryset = Reservation.objects.prefetch_related("tickets")
     serializer_class = ReservationSerializer
     pagination_class = ReservationPagination
-    permission_classes = [IsAuthenticated,]
+    permission_classes = [IsAuthenticated, HasWaitingRoomAdmission]
+    replica_actions = ()
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user)
+
+    def get_admission_session_ids(self, request):
+        tickets = request.data.get("tickets")
+        if not isinstance(tickets, list):
+            return set()
+        return waiting_room.session_ids(
+            ticket.get("show_session")
+            for ticket in tickets
+            if isinstance(ticket, dict)
+        )
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -221,3 +476,471 @@ class ReservationViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        serializer_class=ArchivedReservationSerializer,
+    )
+    def archived(self, request):
+        queryset = (
+            ArchivedReservation.objects
+            .filter(user=request.user)
+            .prefetch_related("tickets__show_session__astronomy_show")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        serializer_class=ReservationHistorySerializer,
+    )
+    def history(self, request):
+        """Hot and archived reservations of the user in one list, newest
+        first; only the page being returned is loaded from each table"""
+        entries = (
+            Reservation.objects
+            .filter(user=request.user)
+            .annotate(archived=Value(False, output_field=BooleanField()))
+            .values("id", "created_at", "archived")
+            .order_by()
+            .union(
+                ArchivedReservation.objects
+                .filter(user=request.user)
+                .annotate(archived=Value(True, output_field=BooleanField()))
+                .values("id", "created_at", "archived")
+                .order_by(),
+                all=True,
+            )
+            .order_by("-created_at", "-id")
+        )
+        page = self.paginate_queryset(entries)
+        loaded = {}
+        for archived, model in (
+            (False, Reservation),
+            (True, ArchivedReservation),
+        ):
+            ids = [
+                entry["id"] for entry in page if entry["archived"] == archived
+            ]
+            for reservation in model.objects.filter(
+                id__in=ids
+            ).prefetch_related("tickets__show_session__astronomy_show"):
+                reservation.archived = archived
+                loaded[archived, reservation.id] = reservation
+        serializer = self.get_serializer(
+            [loaded[entry["archived"], entry["id"]] for entry in page],
+            many=True,
+        )
+        return self.get_paginated_response(serializer.data)
+
+
+class SeatHoldViewSet(
+    ReplicaRoutingMixin,
+    GenericViewSet,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = [IsAuthenticated, HasWaitingRoomAdmission]
+    replica_actions = ()
+
+    def get_queryset(self):
+        return SeatHold.objects.active().filter(user=self.request.user)
+
+    def get_admission_session_ids(self, request):
+        return waiting_room.session_ids([request.data.get("show_session")])
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return SeatHoldCreateSerializer
+
+        return self.serializer_class
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save()
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance):
+        release_holds(
+            [{
+                "id": instance.id,
+                "show_session_id": instance.show_session_id,
+                "row": instance.row,
+                "seat": instance.seat,
+            }]
+        )
+
+
+class WaitlistViewSet(
+    ReplicaRoutingMixin,
+    GenericViewSet,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+):
+    """Queues customers for sold-out sessions; freed seats are offered
+    to them as holds instead of being found by polling"""
+
+    queryset = WaitlistEntry.objects.all()
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [IsAuthenticated]
+    replica_actions = ()
+
+    def get_queryset(self):
+        return WaitlistEntry.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                entry = serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError("You are already waiting for this session")
+        schedule_matching([entry.show_session_id])
+
+
+class SalesAnalyticsViewSet(GenericViewSet):
+    permission_classes = [IsAdminUser]
+    serializer_class = SalesSummarySerializer
+
+    def _date_range(self):
+        dates = []
+        for param in ("start", "end"):
+            value = self.request.query_params.get(param)
+            if value:
+                value = parse_date_param(value, param)
+            dates.append(value)
+        return dates
+
+    def _summary(self, rows):
+        serializer = SalesSummarySerializer(rows, many=True)
+        return Response(serializer.data)
+
+    def _periods(self, granularity):
+        start, end = self._date_range()
+        rows = analytics.sales_by_period(granularity, start, end)
+        serializer = SalesPeriodSerializer(rows, many=True)
+        return Response(serializer.data)
+
+    @action(methods=["GET"], detail=False)
+    def shows(self, request):
+        return self._summary(analytics.sales_by_show(*self._date_range()))
+
+    @action(methods=["GET"], detail=False)
+    def themes(self, request):
+        return self._summary(analytics.sales_by_theme(*self._date_range()))
+
+    @action(methods=["GET"], detail=False)
+    def domes(self, request):
+        return self._summary(analytics.sales_by_dome(*self._date_range()))
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        serializer_class=SalesPeriodSerializer,
+    )
+    def days(self, request):
+        return self._periods("day")
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        serializer_class=SalesPeriodSerializer,
+    )
+    def hours(self, request):
+        return self._periods("hour")
+
+    @action(methods=["POST"], detail=False)
+    def refresh(self, request):
+        return Response(analytics.refresh_sales_rollups())
+
+
+class AutocompleteView(APIView):
+    """Show title and theme suggestions answered from the in-process
+    prefix index; tokens are trusted without loading the user, and the
+    per-minute autocomplete rate is kept apart from the daily API quota"""
+
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = []
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "autocomplete"
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("q", type=OpenApiTypes.STR, required=True),
+            OpenApiParameter("limit", type=OpenApiTypes.INT),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def get(self, request):
+        max_results = getattr(settings, "AUTOCOMPLETE_MAX_RESULTS", 10)
+        try:
+            limit = int(request.query_params.get("limit", max_results))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        limit = max(1, min(limit, max_results))
+        return Response(
+            autocomplete_index.search(
+                request.query_params.get("q", ""), limit=limit
+            )
+        )
+
+
+class WhatsOnView(APIView):
+    """Upcoming sessions grouped by day and show, served from cache and
+    rebuilt from the materialized UpcomingSession rows"""
+
+    permission_classes = []
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(whats_on.get_feed())
+
+
+class TicketExportView(APIView):
+    """Streams tickets reserved in a date range as CSV or JSON lines;
+    rows are read in chunks, so memory stays flat for any range"""
+
+    permission_classes = [IsAdminUser]
+    content_types = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("start", type=OpenApiTypes.DATE, required=True),
+            OpenApiParameter("end", type=OpenApiTypes.DATE, required=True),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    )
+    def get(self, request, export_format):
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Unknown export format {export_format}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        serializer = ExportRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start = serializer.validated_data["start"]
+        end = serializer.validated_data["end"]
+
+        rows = exports.export_rows(
+            start,
+            end,
+            chunk_size=getattr(settings, "EXPORT_CHUNK_SIZE", 2000),
+        )
+        response = StreamingHttpResponse(
+            exports.render(rows, export_format),
+            content_type=self.content_types[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tickets-{start}-{end}.{export_format}"'
+        )
+        return response
+
+
+class WaitingRoomView(APIView):
+    """POST joins the waiting room of a session and returns a queue
+    token; GET with the token in X-Queue-Token reports its progress.
+    Both are answered from the cache, so polling is cheap."""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = []
+
+    def get_room(self, pk):
+        room = waiting_room.active_rooms().get(pk)
+        if room is None:
+            raise NotFound("This session has no waiting room")
+        return room
+
+    @extend_schema(request=None, responses=OpenApiTypes.OBJECT)
+    def post(self, request, pk):
+        room = self.get_room(pk)
+        token = waiting_room.join(pk, room, request.user.id)
+        position = waiting_room.read_token(token, pk, room, request.user.id)
+        return Response(
+            {"token": token, **waiting_room.queue_status(room, position)},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request, pk):
+        room = self.get_room(pk)
+        positions = [
+            position
+            for position in (
+                waiting_room.read_token(token, pk, room, request.user.id)
+                for token in waiting_room.request_tokens(request)
+            )
+            if position is not None
+        ]
+        if not positions:
+            raise ValidationError("Send a queue token in X-Queue-Token")
+        return Response(waiting_room.queue_status(room, min(positions)))
+
+
+class ReadinessView(APIView):
+    """Warms this worker up on first use, retrying failed steps on later
+    calls, and answers 503 until that has succeeded, with the time each
+    warm-up step and module import took"""
+
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        if not warmup.is_ready():
+            warmup.warm()
+        is_ready = warmup.is_ready()
+        return Response(
+            {"ready": is_ready, **warmup.report},
+            status=(
+                status.HTTP_200_OK
+                if is_ready
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )
+
+
+class SlowQueryView(APIView):
+    """Recent statements above SLOW_QUERY_THRESHOLD_MS with the view
+    that ran them and their EXPLAIN output, newest first; DELETE empties
+    the buffer. Records are kept per worker process."""
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        records = slow_queries.log.records()
+        view = request.query_params.get("view")
+        if view:
+            records = [record for record in records if record["view"] == view]
+        return Response(records)
+
+    def delete(self, request):
+        slow_queries.log.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class JobMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(job_metrics())
+
+
+class BatchView(APIView):
+    """Runs several read requests against the planetarium API in one
+    HTTP call; every sub-request goes through its own view, permissions
+    and throttles as the calling user"""
+
+    permission_classes = []
+
+    @extend_schema(request=BatchRequestSerializer)
+    def post(self, request):
+        serializer = BatchRequestSerializer(
+            data=request.data,
+            context={
+                "max_requests": getattr(settings, "BATCH_MAX_REQUESTS", 20)
+            },
+        )
+        serializer.is_valid(raise_exception=True)
+
+        responses = [
+            self._run(request, sub_request["path"])
+            for sub_request in serializer.validated_data["requests"]
+        ]
+        return Response({"responses": responses})
+
+    def _run(self, request, path):
+        prefix = reverse("planetarium:api-root")
+        route = path.split("?", 1)[0]
+        if not route.startswith(prefix) or route == request.path:
+            return {
+                "path": path,
+                "status": status.HTTP_400_BAD_REQUEST,
+                "body": {"detail": f"Path must be under {prefix}"},
+            }
+
+        try:
+            match = resolve(route)
+        except Resolver404:
+            match = None
+        if match is None or not hasattr(match.func, "cls"):
+            return {
+                "path": path,
+                "status": status.HTTP_404_NOT_FOUND,
+                "body": {"detail": "Not found."},
+            }
+
+        sub_request = self._sub_request(request, path)
+        sub_request.resolver_match = match
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        return {
+            "path": path,
+            "status": response.status_code,
+            "body": getattr(response, "data", None),
+        }
+
+    @staticmethod
+    def _sub_request(request, path):
+        """Copy of the incoming request that only differs in method, path
+        and query string, so its host, client address and Authorization
+        header reach the sub-view, which authenticates it on its own"""
+        route, _, query_string = path.partition("?")
+        sub_request = copy.copy(request._request)
+        sub_request.__dict__.pop("headers", None)
+        sub_request.method = "GET"
+        sub_request.path = sub_request.path_info = route
+        sub_request.META = {
+            key: value
+            for key, value in request._request.META.items()
+            if key not in ("CONTENT_LENGTH", "CONTENT_TYPE")
+        }
+        sub_request.META.update(
+            REQUEST_METHOD="GET", PATH_INFO=route, QUERY_STRING=query_string
+        )
+        sub_request.GET = QueryDict(query_string)
+        sub_request._post = QueryDict()
+        sub_request._files = MultiValueDict()
+        sub_request._body = b""
+        sub_request._stream = BytesIO()
+        return sub_request
+
+
+class CheckInView(APIView):
+    """Admits a batch of scanned ticket codes; signatures are verified in
+    memory and the batch is recorded in a fixed number of queries"""
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=CheckInSerializer,
+        responses=CheckInResultSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = CheckInSerializer(
+            data=request.data,
+            context={
+                "max_codes": getattr(settings, "CHECK_IN_MAX_CODES", 500)
+            },
+        )
+        serializer.is_valid(raise_exception=True)
+
+        results = check_in(
+            serializer.validated_data["codes"],
+            show_session_id=serializer.validated_data.get("show_session"),
+            scanner=serializer.validated_data.get("scanner", ""),
+        )
+        return Response(
+            {"results": CheckInResultSerializer(results, many=True).data}
+        )
@@ -0,0 +1,202 @@
+import math
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    PermissionDenied,
+    Throttled,
+)
+
+from planetarium.checks import cache_is_shared
+from planetarium.models import WaitingRoom
+
+ROOMS_CACHE_KEY = "planetarium:waiting_rooms"
+TOKEN_SALT = "planetarium.waiting_room"
+TOKEN_HEADER = "HTTP_X_QUEUE_TOKEN"
+
+
+class WaitingRoomUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Waiting rooms need a cache shared by every worker."
+    default_code = "waiting_room_unavailable"
+
+
+def active_rooms():
+    """Gated sessions as {session id: (opens_at timestamp, admissions per
+    second)}; cached, so requests for other sessions never query"""
+    rooms = cache.get(ROOMS_CACHE_KEY)
+    if rooms is None:
+        rooms = {
+            show_session_id: (opens_at.timestamp(), per_minute / 60)
+            for show_session_id, opens_at, per_minute in (
+                WaitingRoom.objects
+                .filter(is_active=True)
+                .values_list(
+                    "show_session_id", "opens_at", "admit_per_minute"
+                )
+            )
+        }
+        cache.set(
+            ROOMS_CACHE_KEY,
+            rooms,
+            getattr(settings, "WAITING_ROOM_CONFIG_SECONDS", 30),
+        )
+    return rooms
+
+
+def invalidate():
+    cache.delete(ROOMS_CACHE_KEY)
+
+
+def admitted_through(room, now):
+    """Highest admitted position; a burst is let in at opening and the
+    rest at the room's rate, so admission needs no shared state"""
+    opens_at, rate = room
+    return getattr(settings, "WAITING_ROOM_BURST", 50) + math.floor(
+        max(0, now - opens_at) * rate
+    )
+
+
+def admission_at(room, position):
+    opens_at, rate = room
+    burst = getattr(settings, "WAITING_ROOM_BURST", 50)
+    return opens_at + max(0, position - burst) / rate
+
+
+def admission_expired(room, position, now):
+    window = getattr(settings, "WAITING_ROOM_ADMISSION_SECONDS", 900)
+    return now > admission_at(room, position) + window
+
+
+def _key(show_session_id, room, suffix):
+    return f"planetarium:waiting_room:{show_session_id}:{room[0]}:{suffix}"
+
+
+def read_token(token, show_session_id, room, user_id):
+    """Position carried by a queue token, which is only valid for the
+    session, room opening and user it was issued for"""
+    try:
+        payload = signing.loads(
+            token,
+            salt=TOKEN_SALT,
+            max_age=getattr(settings, "WAITING_ROOM_TOKEN_MAX_AGE", 86400),
+        )
+    except signing.BadSignature:
+        return None
+    if (
+        payload.get("session") != show_session_id
+        or payload.get("opens_at") != room[0]
+        or payload.get("user") != user_id
+    ):
+        return None
+    return payload["position"]
+
+
+def join(show_session_id, room, user_id):
+    """Hands out the next position with an atomic increment on the shared
+    cache, so the burst never reaches the database; rejoining returns the
+    user's token until its admission has expired"""
+    if getattr(
+        settings, "WAITING_ROOM_REQUIRE_SHARED_CACHE", True
+    ) and not cache_is_shared():
+        raise WaitingRoomUnavailable()
+    timeout = getattr(settings, "WAITING_ROOM_TOKEN_MAX_AGE", 86400)
+    user_key = _key(show_session_id, room, f"user:{user_id}")
+    token = cache.get(user_key)
+    if token is not None:
+        position = read_token(token, show_session_id, room, user_id)
+        if position is not None and not admission_expired(
+            room, position, time.time()
+        ):
+            return token
+
+    counter = _key(show_session_id, room, "joined")
+    cache.add(counter, 0, timeout)
+    token = signing.dumps(
+        {
+            "session": show_session_id,
+            "opens_at": room[0],
+            "user": user_id,
+            "position": cache.incr(counter),
+        },
+        salt=TOKEN_SALT,
+    )
+    cache.set(user_key, token, timeout)
+    return token
+
+
+def queue_status(room, position, now=None):
+    now = time.time() if now is None else now
+    wait = admission_at(room, position) - now
+    return {
+        "position": position,
+        "admitted_through": admitted_through(room, now),
+        "admitted": wait <= 0,
+        "expired": admission_expired(room, position, now),
+        "retry_after": max(0, math.ceil(wait)),
+    }
+
+
+def request_tokens(request):
+    return [
+        token.strip()
+        for token in request.META.get(TOKEN_HEADER, "").split(",")
+        if token.strip()
+    ]
+
+
+def check_admission(request, show_session_ids):
+    """Raises unless the request carries an admitted token for every
+    gated session it writes to; runs before any serializer or query"""
+    rooms = active_rooms()
+    gated = {
+        show_session_id
+        for show_session_id in show_session_ids
+        if show_session_id in rooms
+    }
+    if not gated:
+        return
+
+    tokens = request_tokens(request)
+    now = time.time()
+    for show_session_id in sorted(gated):
+        room = rooms[show_session_id]
+        positions = [
+            position
+            for position in (
+                read_token(token, show_session_id, room, request.user.id)
+                for token in tokens
+            )
+            if position is not None
+        ]
+        if not positions:
+            raise PermissionDenied(
+                f"Session {show_session_id} is behind a waiting room, "
+                f"join it and send the queue token in X-Queue-Token"
+            )
+        position = min(positions)
+        wait = admission_at(room, position) - now
+        if wait > 0:
+            raise Throttled(
+                wait=wait,
+                detail=f"Position {position} in the waiting room is "
+                f"not admitted yet",
+            )
+        if admission_expired(room, position, now):
+            raise PermissionDenied(
+                "Your admission has expired, rejoin the waiting room"
+            )
+
+
+def session_ids(values):
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
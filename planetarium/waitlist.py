@@ -0,0 +1,106 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from planetarium.holds import hold_seats
+from planetarium.jobs import enqueue, on_commit_batched, task
+from planetarium.models import SeatHold, ShowSession, Ticket, WaitlistEntry
+
+
+def claim_expiry():
+    ttl = getattr(settings, "WAITLIST_CLAIM_TTL_SECONDS", 300)
+    return timezone.now() + timedelta(seconds=ttl)
+
+
+def free_seats(show_session):
+    dome = show_session.planetarium_dome
+    taken = set(
+        Ticket.objects
+        .filter(show_session=show_session)
+        .values_list("row", "seat")
+    )
+    taken.update(
+        SeatHold.objects.active()
+        .filter(show_session=show_session)
+        .values_list("row", "seat")
+    )
+    return [
+        (row, seat)
+        for row, seat in dome.seat_layout.seats()
+        if (row, seat) not in taken
+    ]
+
+
+def pick_seats(free, party_size):
+    """Prefers adjacent seats in one row and falls back to the first
+    free seats when no row has a long enough gap"""
+    for _, row_seats in groupby(free, key=lambda seat: seat[0]):
+        row_seats = list(row_seats)
+        for start in range(len(row_seats) - party_size + 1):
+            run = row_seats[start:start + party_size]
+            if run[-1][1] - run[0][1] == party_size - 1:
+                return run
+    return free[:party_size]
+
+
+@task("planetarium.match_waitlist")
+def match_waitlist(show_session_id):
+    """Hands freed seats to waiting parties that fit, oldest first, as
+    time-limited holds; the session row lock keeps matchers serial"""
+    matched = []
+    with transaction.atomic():
+        show_session = (
+            ShowSession.objects
+            .select_for_update(of=("self",))
+            .select_related("planetarium_dome")
+            .filter(id=show_session_id)
+            .first()
+        )
+        if show_session is None:
+            return matched
+
+        free = free_seats(show_session)
+        while free:
+            entry = (
+                WaitlistEntry.objects.waiting()
+                .filter(show_session=show_session, party_size__lte=len(free))
+                .select_related("user")
+                .order_by("created_at", "id")
+                .first()
+            )
+            if entry is None:
+                break
+
+            seats = pick_seats(free, entry.party_size)
+            entry.claim_expires_at = claim_expiry()
+            hold_seats(
+                entry.user,
+                show_session,
+                seats,
+                expires_at=entry.claim_expires_at,
+            )
+            entry.matched_at = timezone.now()
+            entry.save(update_fields=["matched_at", "claim_expires_at"])
+            free = [seat for seat in free if seat not in seats]
+            matched.append(entry)
+    return matched
+
+
+def _enqueue_matching(show_session_ids):
+    for show_session_id in sorted(show_session_ids):
+        enqueue(
+            "planetarium.match_waitlist",
+            {"show_session_id": show_session_id},
+            unique=True,
+        )
+
+
+def schedule_matching(show_session_ids):
+    """Queues one matcher run per session after the transaction commits,
+    however many of the session's seats it freed"""
+    on_commit_batched(
+        "planetarium.match_waitlist", show_session_ids, _enqueue_matching
+    )
@@ -0,0 +1,174 @@
+import importlib
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+WARM_MODULES = (
+    "rest_framework.views",
+    "rest_framework.viewsets",
+    "rest_framework_simplejwt.authentication",
+    "drf_spectacular.openapi",
+    "planetarium.serializers",
+    "planetarium.views",
+    "planetarium.urls",
+    "user.serializers",
+    "user.views",
+)
+
+ready = threading.Event()
+report = {"imports": {}, "steps": {}, "errors": {}}
+_lock = threading.Lock()
+_done = set()
+_pid = None
+
+
+@contextmanager
+def step(name):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        report["errors"][name] = repr(error)
+        logger.exception("Warm-up step %s failed", name)
+    finally:
+        report["steps"][name] = round(
+            (time.perf_counter() - started) * 1000, 3
+        )
+
+
+def import_modules():
+    """Imports the heavy modules up front and records how long each
+    first import took; modules that were already loaded report None"""
+    for name in getattr(settings, "WARMUP_MODULES", WARM_MODULES):
+        if name in report["imports"]:
+            continue
+        if name in sys.modules:
+            report["imports"][name] = None
+            continue
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.exception("Warm-up import of %s failed", name)
+            continue
+        report["imports"][name] = round(
+            (time.perf_counter() - started) * 1000, 3
+        )
+
+
+def compile_urls():
+    resolver = get_resolver()
+    pending = [resolver]
+    while pending:
+        resolver = pending.pop()
+        resolver.reverse_dict
+        pending.extend(
+            namespace_resolver
+            for _, namespace_resolver in resolver.namespace_dict.values()
+        )
+
+
+def build_serializers():
+    """Constructs every serializer's fields once, which fills the model
+    _meta caches the first real request would otherwise pay for"""
+    for module_name in ("planetarium.serializers", "user.serializers"):
+        module = importlib.import_module(module_name)
+        for _, serializer_class in inspect.getmembers(
+            module, inspect.isclass
+        ):
+            if (
+                not issubclass(serializer_class, BaseSerializer)
+                or serializer_class.__module__ != module_name
+            ):
+                continue
+            try:
+                serializer_class().fields
+            except Exception:
+                logger.debug(
+                    "Could not prebuild %s", serializer_class.__name__
+                )
+
+
+def open_connections():
+    """Connects every database alias, replicas included; connections are
+    per thread, and the readiness request runs on the thread a sync worker
+    serves its later requests from"""
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def prime_caches():
+    from planetarium import schema, waiting_room, whats_on
+    from planetarium.autocomplete import index
+
+    index.build()
+    whats_on.get_feed()
+    waiting_room.active_rooms()
+    for schema_format in schema.SCHEMA_FORMATS:
+        if schema.artifact_path(schema_format).exists():
+            schema.load_schema(schema_format)
+
+
+def steps():
+    return (
+        ("imports", import_modules),
+        ("urls", compile_urls),
+        ("serializers", build_serializers),
+        ("database", open_connections),
+        ("caches", prime_caches),
+    )
+
+
+def reset():
+    """Forgets the warm-up of the process this one was forked from; its
+    imports are inherited, everything else is redone"""
+    global _pid
+    _pid = os.getpid()
+    ready.clear()
+    _done.clear()
+    report["steps"].clear()
+    report["errors"].clear()
+
+
+def is_ready():
+    return ready.is_set() and _pid == os.getpid()
+
+
+def warm():
+    """Runs the warm-up steps that have not succeeded in this process yet
+    and marks it ready once all have; the readiness endpoint calls this,
+    so each worker warms itself after forking and retries failed steps"""
+    with _lock:
+        if _pid != os.getpid():
+            reset()
+        if ready.is_set():
+            return report
+        started = time.perf_counter()
+        report["errors"].clear()
+        for name, function in steps():
+            if name in _done:
+                continue
+            with step(name):
+                function()
+            if name not in report["errors"]:
+                _done.add(name)
+        report["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        if not report["errors"]:
+            ready.set()
+        logger.info(
+            "Warm-up finished in %s ms: %s",
+            report["total_ms"],
+            report["steps"],
+        )
+    return report
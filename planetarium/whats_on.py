@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from planetarium.holds import tickets_available_expression
+from planetarium.jobs import enqueue, on_commit_batched, task
+from planetarium.models import ShowSession, UpcomingSession
+
+FEED_CACHE_KEY = "planetarium:whats_on"
+
+_FIELDS = (
+    "astronomy_show",
+    "planetarium_dome",
+    "day",
+    "show_time",
+    "show_title",
+    "show_image",
+    "dome_name",
+    "tickets_available",
+)
+
+
+def invalidate():
+    cache.delete(FEED_CACHE_KEY)
+
+
+@task("planetarium.refresh_whats_on")
+def refresh_sessions(show_session_ids):
+    """Rewrites the feed rows of the given sessions from the live tables
+    and drops the rows of sessions that are gone or already started"""
+    show_session_ids = set(show_session_ids)
+    if not show_session_ids:
+        return
+    sessions = (
+        ShowSession.objects
+        .filter(id__in=show_session_ids, show_time__gte=timezone.now())
+        .select_related("astronomy_show", "planetarium_dome")
+        .annotate(
+            tickets_available=tickets_available_expression()
+        )
+    )
+    rows = [
+        UpcomingSession(
+            show_session=session,
+            astronomy_show=session.astronomy_show,
+            planetarium_dome=session.planetarium_dome,
+            day=timezone.localdate(session.show_time),
+            show_time=session.show_time,
+            show_title=session.astronomy_show.title,
+            show_image=(
+                session.astronomy_show.image.url
+                if session.astronomy_show.image
+                else ""
+            ),
+            dome_name=session.planetarium_dome.name,
+            tickets_available=session.tickets_available,
+        )
+        for session in sessions
+    ]
+    with transaction.atomic():
+        UpcomingSession.objects.filter(
+            show_session_id__in=show_session_ids - {
+                row.show_session_id for row in rows
+            }
+        ).delete()
+        UpcomingSession.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["show_session"],
+            update_fields=_FIELDS,
+        )
+    invalidate()
+
+
+def _enqueue_refresh(show_session_ids):
+    if show_session_ids:
+        enqueue(
+            "planetarium.refresh_whats_on",
+            {"show_session_ids": sorted(show_session_ids)},
+            unique=True,
+        )
+
+
+def schedule_refresh(show_session_ids):
+    """Queues a single refresh of every session the transaction touched
+    once it commits"""
+    on_commit_batched(
+        "planetarium.refresh_whats_on", show_session_ids, _enqueue_refresh
+    )
+
+
+def upcoming_session_ids(**filters):
+    return ShowSession.objects.filter(
+        show_time__gte=timezone.now(), **filters
+    ).values_list("id", flat=True)
+
+
+def rebuild(batch_size=500):
+    UpcomingSession.objects.filter(show_time__lt=timezone.now()).delete()
+    ids = list(upcoming_session_ids())
+    for start in range(0, len(ids), batch_size):
+        refresh_sessions(ids[start:start + batch_size])
+    invalidate()
+    return len(ids)
+
+
+def build_feed():
+    now = timezone.now()
+    days = getattr(settings, "WHATS_ON_DAYS", 14)
+    feed = []
+    shows = {}
+    for row in (
+        UpcomingSession.objects
+        .filter(show_time__gte=now, show_time__lt=now + timedelta(days=days))
+        .order_by("show_time", "id")
+        .values(*_FIELDS, "show_session_id")
+    ):
+        if not feed or feed[-1]["date"] != row["day"]:
+            feed.append({"date": row["day"], "shows": []})
+            shows = {}
+        show = shows.get(row["astronomy_show"])
+        if show is None:
+            show = shows[row["astronomy_show"]] = {
+                "id": row["astronomy_show"],
+                "title": row["show_title"],
+                "image": row["show_image"] or None,
+                "sessions": [],
+            }
+            feed[-1]["shows"].append(show)
+        show["sessions"].append(
+            {
+                "id": row["show_session_id"],
+                "show_time": row["show_time"],
+                "planetarium_dome": row["dome_name"],
+                "tickets_available": row["tickets_available"],
+            }
+        )
+    return feed
+
+
+def get_feed():
+    feed = cache.get(FEED_CACHE_KEY)
+    if feed is None:
+        feed = build_feed()
+        cache.set(
+            FEED_CACHE_KEY,
+            feed,
+            getattr(settings, "WHATS_ON_CACHE_SECONDS", 60),
+        )
+    return feed